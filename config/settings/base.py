@@ -702,11 +702,26 @@ IRODS_ENV_CLIENT = env.dict('IRODS_ENV_CLIENT', default={})
 # Optional iRODS certificate path on server
 IRODS_CERT_PATH = env.str('IRODS_CERT_PATH', None)
 
+# Reuse backend iRODS sessions from a process-wide session pool
+IRODS_SESSION_POOL_ENABLE = env.bool('IRODS_SESSION_POOL_ENABLE', True)
+# Maximum number of pooled sessions per iRODS user and process
+IRODS_SESSION_POOL_SIZE = env.int('IRODS_SESSION_POOL_SIZE', 10)
+# Timeout in seconds for waiting for a free pooled session
+IRODS_SESSION_POOL_TIMEOUT = env.int('IRODS_SESSION_POOL_TIMEOUT', 30)
+# Time in seconds after which idle pooled sessions are closed
+IRODS_SESSION_POOL_IDLE_TIMEOUT = env.int(
+    'IRODS_SESSION_POOL_IDLE_TIMEOUT', 300
+)
+# Maximum age of a pooled session in seconds before it is recycled
+IRODS_SESSION_POOL_MAX_AGE = env.int('IRODS_SESSION_POOL_MAX_AGE', 3600)
+
 
 # Taskflow backend settings
 TASKFLOW_LOCK_RETRY_COUNT = env.int('TASKFLOW_LOCK_RETRY_COUNT', 2)
 TASKFLOW_LOCK_RETRY_INTERVAL = env.int('TASKFLOW_LOCK_RETRY_INTERVAL', 3)
 TASKFLOW_LOCK_ENABLED = True
+# Maximum number of concurrent iRODS sessions used by batch tasks
+TASKFLOW_IRODS_CONCURRENCY = env.int('TASKFLOW_IRODS_CONCURRENCY', 4)
 TASKFLOW_TEST_MODE = False  # Important to protect iRODS data
 
 # Samplesheets and Landingzones link settings
@@ -730,10 +745,21 @@ IRODS_QUERY_BATCH_SIZE = env.int('IRODS_QUERY_BATCH_SIZE', 24)
 # Samplesheets settings
 # Allow critical altamISA warnings on import
 SHEETS_ALLOW_CRITICAL = env.bool('SHEETS_ALLOW_CRITICAL', False)
+# Maximum number of forked worker processes for parsing ISA-Tab files on
+# import, only enable in single-threaded server and worker processes
+SHEETS_IMPORT_PROCESSES = env.int('SHEETS_IMPORT_PROCESSES', 1)
 # Temporary, see issue #556
 SHEETS_ENABLE_CACHE = True
+# Enable caching of rendered study tables
+SHEETS_TABLE_CACHE_ENABLE = env.bool('SHEETS_TABLE_CACHE_ENABLE', True)
+# Rendered study table cache timeout in seconds
+SHEETS_TABLE_CACHE_TIMEOUT = env.int('SHEETS_TABLE_CACHE_TIMEOUT', 86400)
+# Maximum number of concurrent iRODS sessions in project and assay cache updates
+SHEETS_CACHE_CONCURRENCY = env.int('SHEETS_CACHE_CONCURRENCY', 4)
 # iRODS file query limit
 SHEETS_IRODS_LIMIT = env.int('SHEETS_IRODS_LIMIT', 50)
+# Maximum number of checksums in batch file existence API queries
+SHEETS_API_FILE_EXISTS_LIMIT = env.int('SHEETS_API_FILE_EXISTS_LIMIT', 10000)
 # Study/assay table height
 SHEETS_TABLE_HEIGHT = env.int('SHEETS_TABLE_HEIGHT', 400)
 # Minimum edit config version
@@ -743,6 +769,8 @@ SHEETS_MIN_COLUMN_WIDTH = env.int('SHEETS_MIN_COLUMN_WIDTH', 100)
 # Max default column width
 SHEETS_MAX_COLUMN_WIDTH = env.int('SHEETS_MAX_COLUMN_WIDTH', 300)
 SHEETS_VERSION_PAGINATION = env.int('SHEETS_VERSION_PAGINATION', 15)
+# Diff rows per page in sheet version comparison
+SHEETS_VERSION_DIFF_PAGINATION = env.int('SHEETS_VERSION_DIFF_PAGINATION', 500)
 SHEETS_IRODS_TICKET_PAGINATION = env.int('SHEETS_IRODS_TICKET_PAGINATION', 15)
 SHEETS_IRODS_REQUEST_PAGINATION = env.int('SHEETS_IRODS_REQUEST_PAGINATION', 15)
 SHEETS_ONTOLOGY_URL_TEMPLATE = env.str(
@@ -779,6 +807,8 @@ SHEETS_ENABLED_TEMPLATES = [
 
 # Remote sample sheet sync interval in minutes
 SHEETS_SYNC_INTERVAL = env.int('SHEETS_SYNC_INTERVAL', 5)
+# Maximum number of concurrent source requests in remote sample sheet sync
+SHEETS_SYNC_CONCURRENCY = env.int('SHEETS_SYNC_CONCURRENCY', 4)
 
 
 # Landingzones app settings
@@ -98,6 +98,7 @@ PROJECTROLES_ALLOW_LOCAL_USERS = True
 
 # Samplesheets app settings
 SHEETS_ENABLE_CACHE = False  # Temporarily disabled to fix CI, see issue #556
+SHEETS_TABLE_CACHE_ENABLE = False  # Enabled in specific tests
 SHEETS_EXTERNAL_LINK_PATH = os.path.join(
     ROOT_DIR, 'samplesheets/tests/config/ext_links.json'
 )
@@ -2,6 +2,8 @@
 
 import re
 
+from uuid import UUID
+
 from django.core.management.base import BaseCommand
 from django.db.models import Q
 from django.template.defaultfilters import filesizeformat
@@ -22,54 +24,101 @@ from samplesheets.views import TRACK_HUBS_COLL, RESULTS_COLL, MISC_FILES_COLL
 
 logger = ManagementCommandLogger(__name__)
 
+THREADS_DEFAULT = 4
+
 
 def get_assay_collections(assays, irods_backend):
     """Return a list of all assay collection names."""
     return [irods_backend.get_path(a) for a in assays]
 
 
+def get_cached_row_paths(assay, assay_plugin, cache_backend):
+    """
+    Return assay row paths from the assay plugin row cache, or None if the
+    cache is not available or older than the sample sheets.
+    """
+    if not cache_backend:
+        return None
+    cache_item = cache_backend.get_cache_item(
+        name='irods/rows/{}'.format(assay.sodar_uuid),
+        app_name=assay_plugin.app_name,
+        project=assay.get_project(),
+    )
+    if (
+        not cache_item
+        or 'paths' not in cache_item.data
+        or cache_item.date_modified < assay.study.investigation.date_modified
+    ):
+        return None
+    return list(cache_item.data['paths'].keys())
+
+
 def get_assay_subcollections(studies, irods_backend):
-    """Return a list of all assay row colletion names."""
+    """
+    Return a list of all assay row colletion names. Row paths are read from the
+    assay plugin row cache where up to date, study tables are only built for
+    studies with missing cache items.
+    """
     tb = SampleSheetTableBuilder()
+    cache_backend = get_backend_api('sodar_cache')
     collections = []
+    seen = set()
+
+    def _add(path):
+        if path and path not in seen:
+            seen.add(path)
+            collections.append(path)
 
     for study in studies:
-        try:
-            study_tables = tb.build_study_tables(study, ui=False)
-        except Exception as ex:
-            logger.error(
-                'Study table building exception for "{}" '
-                'in project "{}" ({}): {}'.format(
-                    study.get_display_name(),
-                    study.investigation.project.title,
-                    study.investigation.project.sodar_uuid,
-                    ex,
+        assays = [
+            (a, a.get_plugin(), irods_backend.get_path(a))
+            for a in study.assays.all()
+        ]
+        row_paths = {
+            a.sodar_uuid: get_cached_row_paths(a, plugin, cache_backend)
+            for a, plugin, _ in assays
+            if plugin
+        }
+        study_tables = None
+        if any(v is None for v in row_paths.values()):
+            try:
+                study_tables = tb.build_study_tables(study, ui=False)
+            except Exception as ex:
+                logger.error(
+                    'Study table building exception for "{}" '
+                    'in project "{}" ({}): {}'.format(
+                        study.get_display_name(),
+                        study.investigation.project.title,
+                        study.investigation.project.sodar_uuid,
+                        ex,
+                    )
                 )
-            )
-            continue
-
-        for assay in study.assays.all():
-            assay_table = study_tables['assays'][str(assay.sodar_uuid)]
-            assay_plugin = assay.get_plugin()
-            assay_path = irods_backend.get_path(assay)
-
-            if assay_plugin:
+                continue
+
+        for assay, assay_plugin, assay_path in assays:
+            if not assay_plugin:
+                continue
+            if row_paths[assay.sodar_uuid] is not None:
+                for row_path in row_paths[assay.sodar_uuid]:
+                    _add(row_path)
+            else:
+                assay_table = study_tables['assays'][str(assay.sodar_uuid)]
                 for row in assay_table['table_data']:
-                    row_path = assay_plugin.get_row_path(
-                        row, assay_table, assay, assay_path
+                    _add(
+                        assay_plugin.get_row_path(
+                            row, assay_table, assay, assay_path
+                        )
                     )
-                    if row_path not in collections:
-                        collections.append(row_path)
 
-                shortcuts = assay_plugin.get_shortcuts(assay)
-                if shortcuts:
-                    for shortcut in shortcuts:
-                        collections.append(shortcut['path'])
+            shortcuts = assay_plugin.get_shortcuts(assay)
+            if shortcuts:
+                for shortcut in shortcuts:
+                    _add(shortcut['path'])
 
-                # Add default expected subcollections of assay collection
-                collections.append(assay_path + '/' + TRACK_HUBS_COLL)
-                collections.append(assay_path + '/' + RESULTS_COLL)
-                collections.append(assay_path + '/' + MISC_FILES_COLL)
+            # Add default expected subcollections of assay collection
+            _add(assay_path + '/' + TRACK_HUBS_COLL)
+            _add(assay_path + '/' + RESULTS_COLL)
+            _add(assay_path + '/' + MISC_FILES_COLL)
 
     return collections
 
@@ -132,9 +181,15 @@ def is_project(collection):
 def get_orphans(session, irods_backend, expected, assays):
     """
     Return a list of orphans in a given irods session that are not in a given
-    list of expected collections.
+    list of expected collections. All collections are retrieved with a single
+    query.
     """
     orphans = []
+    assay_orphans = []
+    expected = set(expected)
+    assay_paths = set(
+        irods_backend.get_path(a) for a in assays if a.get_plugin()
+    )
     collections = session.collections.get('/{}/projects'.format(session.zone))
 
     for collection in irods_backend.get_colls_recursively(collections):
@@ -142,35 +197,68 @@ def get_orphans(session, irods_backend, expected, assays):
             is_zone(collection)
             or is_assay_or_study(collection)
             or is_project(collection)
+        ) and collection.path not in expected:
+            orphans.append(collection.path)
+        if (
+            collection.path.rsplit('/', 1)[0] in assay_paths
+            and collection.path not in expected
         ):
-            if collection.path not in expected:
-                orphans.append(collection.path)
-
-    for assay in assays:
-        if not assay.get_plugin():
-            continue
-        for collection in irods_backend.get_child_colls_by_path(
-            irods_backend.get_path(assay)
-        ):
-            if collection.path not in expected:
-                orphans.append(collection.path)
+            assay_orphans.append(collection.path)
 
-    return orphans
+    return orphans + assay_orphans
 
 
-def get_output(orphans, irods_backend):
+def get_orphan_stats(orphans, irods_backend, threads=1):
+    """
+    Return file count and total size for orphan collections. Stats are queried
+    in bulk for each project, running up to the given number of project
+    queries concurrently on pooled iRODS sessions.
+
+    :param orphans: List of orphan collection paths
+    :param irods_backend: IrodsAPI object
+    :param threads: Maximum number of concurrent queries (int)
+    :return: Dict of stats by path
+    """
+    if not orphans:
+        return {}
+    groups = {}
+    for orphan in orphans:
+        m = re.search(r'^.*/projects/([^/]{2})/\1[^/]+', orphan)
+        groups.setdefault(m.group(0) if m else orphan, []).append(orphan)
+    ret = {}
+    for stats in irods_backend.run_jobs(
+        lambda backend, paths: backend.get_object_stats_bulk(paths),
+        list(groups.values()),
+        threads,
+    ):
+        ret.update(stats)
+    return ret
+
+
+def get_output(orphans, irods_backend, threads=1):
     lines = []
+    stats = get_orphan_stats(orphans, irods_backend, threads)
+    orphan_uuids = {}
     for orphan in orphans:
-        stats = irods_backend.get_object_stats(orphan)
         m = re.search(r'/projects/([^/]{2})/(\1[^/]+)', orphan)
+        orphan_uuids[orphan] = m.group(2) if m else None
+    uuids = set()
+    for uuid in orphan_uuids.values():
+        try:
+            uuids.add(str(UUID(uuid)))
+        except (TypeError, ValueError):
+            pass
+    titles = {
+        str(p.sodar_uuid): p.full_title
+        for p in Project.objects.filter(sodar_uuid__in=uuids)
+    }
 
-        if m:
-            uuid = m.group(2)
-            try:
-                project = Project.objects.get(sodar_uuid=uuid)
-                title = project.full_title
-            except Project.DoesNotExist:
-                title = '<DELETED>'
+    for orphan in orphans:
+        o_stats = stats.get(orphan) or {'file_count': 0, 'total_size': 0}
+        uuid = orphan_uuids[orphan]
+
+        if uuid:
+            title = titles.get(uuid, '<DELETED>')
         else:
             uuid = '<ERROR>'
             title = '<ERROR>'
@@ -181,8 +269,8 @@ def get_output(orphans, irods_backend):
                     uuid,
                     title,
                     orphan,
-                    str(stats['file_count']),
-                    filesizeformat(stats['total_size']).replace(u'\xa0', ' '),
+                    str(o_stats['file_count']),
+                    filesizeformat(o_stats['total_size']).replace(u'\xa0', ' '),
                 ]
             )
         )
@@ -194,11 +282,25 @@ class Command(BaseCommand):
 
     help = 'Find orphans in iRODS project collections.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-t',
+            '--threads',
+            dest='threads',
+            type=int,
+            default=THREADS_DEFAULT,
+            required=False,
+            help='Maximum number of concurrent iRODS queries for orphan '
+            'statistics (default: {})'.format(THREADS_DEFAULT),
+        )
+
     def handle(self, *args, **options):
         irods_backend = get_backend_api('omics_irods')
         session = irods_backend.get_session()
-        studies = list(Study.objects.all())
-        assays = list(Assay.objects.all())
+        studies = list(
+            Study.objects.all().select_related('investigation__project')
+        )
+        assays = list(Assay.objects.all().select_related('study'))
         expected = (
             *get_assay_collections(assays, irods_backend),
             *get_study_collections(studies, irods_backend),
@@ -208,6 +310,8 @@ class Command(BaseCommand):
         )
 
         orphans = get_orphans(session, irods_backend, expected, assays)
-        output = get_output(orphans, irods_backend)
+        output = get_output(
+            orphans, irods_backend, max(options.get('threads') or 1, 1)
+        )
         if output:
             self.stdout.write('\n'.join(output))
@@ -158,6 +158,54 @@ class TestIrodsOrphans(
             ],
         )
 
+    def test_get_assay_subcollections_cache(self):
+        """Test get_assay_subcollections() with assay row cache"""
+        assay_path = self.irods_backend.get_path(self.assay)
+        cache_backend = get_backend_api('sodar_cache')
+        cache_backend.set_cache_item(
+            name='irods/rows/{}'.format(self.assay.sodar_uuid),
+            app_name=self.assay.get_plugin().app_name,
+            user=self.user,
+            data={'paths': {assay_path + '/0815-N1-DNA1-cached': None}},
+            project=self.project,
+        )
+        self.assertListEqual(
+            irodsorphans.get_assay_subcollections(
+                [self.study], self.irods_backend
+            ),
+            [
+                assay_path + '/0815-N1-DNA1-cached',
+                assay_path + '/TrackHubs',
+                assay_path + '/ResultsReports',
+                assay_path + '/MiscFiles',
+            ],
+        )
+
+    def test_get_assay_subcollections_cache_outdated(self):
+        """Test get_assay_subcollections() with outdated assay row cache"""
+        assay_path = self.irods_backend.get_path(self.assay)
+        cache_backend = get_backend_api('sodar_cache')
+        cache_backend.set_cache_item(
+            name='irods/rows/{}'.format(self.assay.sodar_uuid),
+            app_name=self.assay.get_plugin().app_name,
+            user=self.user,
+            data={'paths': {assay_path + '/0815-N1-DNA1-cached': None}},
+            project=self.project,
+        )
+        self.investigation.save()  # Update date_modified
+        self.assertListEqual(
+            irodsorphans.get_assay_subcollections(
+                [self.study], self.irods_backend
+            ),
+            [
+                assay_path + '/0815-N1-DNA1',
+                assay_path + '/0815-T1-DNA1',
+                assay_path + '/TrackHubs',
+                assay_path + '/ResultsReports',
+                assay_path + '/MiscFiles',
+            ],
+        )
+
     def test_is_zone(self):
         """Test is_zone()"""
         collection = self.irods.collections.get(
@@ -324,6 +372,40 @@ class TestIrodsOrphans(
             ],
         )
 
+    def test_get_output_threads(self):
+        """Test get_output() with orphans in multiple projects and threads"""
+        orphan_path = '{}/assay_{}'.format(
+            self.irods_backend.get_path(self.study), str(uuid.uuid4())
+        )
+        self.irods.collections.create(orphan_path)
+        self.irods.collections.create(orphan_path + '/subcoll')
+        project_uuid = 'aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa'
+        orphan_path2 = '{}/aa/{}'.format(
+            os.path.dirname(
+                os.path.dirname(self.irods_backend.get_path(self.project))
+            ),
+            project_uuid,
+        )
+        self.irods.collections.create(orphan_path2)
+        obj_path = orphan_path + '/subcoll/test.txt'
+        self.irods.data_objects.create(obj_path)
+        with self.irods.data_objects.open(obj_path, 'w') as f:
+            f.write(b'test')
+
+        self.assertListEqual(
+            irodsorphans.get_output(
+                [orphan_path, orphan_path2], self.irods_backend, threads=2
+            ),
+            [
+                '{};{};{};1;4 bytes'.format(
+                    str(self.project.sodar_uuid),
+                    self.project.full_title,
+                    orphan_path,
+                ),
+                '{};<DELETED>;{};0;0 bytes'.format(project_uuid, orphan_path2),
+            ],
+        )
+
     def test_get_output_deleted_project(self):
         """Test get_output() with a deleted project"""
         project_uuid = 'aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa'
@@ -1,14 +1,22 @@
 """iRODS backend API for SODAR Django apps"""
 
+import functools
+import hashlib
 import logging
 import math
+import os
+import queue
 import random
 import re
 import string
+import threading
+import time
 import uuid
 
 import pytz
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from irods.api_number import api_number
 from irods.collection import iRODSCollection
 from irods.column import Criterion
@@ -53,12 +61,182 @@ ENV_INT_PARAMS = [
 USER_GROUP_PREFIX = 'omics_project_'
 
 
+class IrodsSessionPool:
+    """
+    Process-wide pool of reusable iRODS sessions, keyed by user and connection
+    parameters. Sessions are checked out exclusively and returned to the pool
+    on release.
+    """
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._pid = os.getpid()
+        self._idle = {}  # Idle sessions by key: [(session, created, used)]
+        self._in_use = {}  # Checked out sessions by id: (key, created)
+        self._counts = {}  # Total sessions by key
+        self._inherited = []  # Sessions inherited from a parent process
+
+    def _check_pid(self):
+        """Reset pool if the process has been forked (call with lock held)"""
+        if os.getpid() == self._pid:
+            return
+        # Keep references to the parent's sessions: cleaning them up or letting
+        # them be garbage collected would disconnect the parent's sockets
+        for entries in self._idle.values():
+            self._inherited += [e[0] for e in entries]
+        self._pid = os.getpid()
+        self._idle = {}
+        self._in_use = {}
+        self._counts = {}
+
+    def _reap(self, now):
+        """
+        Remove expired idle sessions from the pool (call with lock held).
+
+        :param now: Current time (float)
+        :return: List of removed iRODSSession objects
+        """
+        ret = []
+        idle_timeout = settings.IRODS_SESSION_POOL_IDLE_TIMEOUT
+        max_age = settings.IRODS_SESSION_POOL_MAX_AGE
+        for key, entries in self._idle.items():
+            keep = []
+            for e in entries:
+                if now - e[2] > idle_timeout or now - e[1] > max_age:
+                    ret.append(e[0])
+                    self._counts[key] -= 1
+                else:
+                    keep.append(e)
+            self._idle[key] = keep
+        if ret:
+            self._lock.notify_all()
+        return ret
+
+    @classmethod
+    def _cleanup(cls, sessions):
+        """Clean up discarded sessions, ignoring errors"""
+        for session in sessions:
+            try:
+                session.cleanup()
+            except Exception as ex:
+                logger.debug(
+                    'Exception in iRODS session cleanup: {}'.format(ex)
+                )
+
+    def _discard(self, key):
+        """Decrease session count for key (call with lock held)"""
+        self._counts[key] -= 1
+        self._lock.notify_all()
+
+    def acquire(self, key, create, check):
+        """
+        Check out an iRODS session from the pool, creating a new session if no
+        healthy idle session is available.
+
+        :param key: Pool key (hashable)
+        :param create: Callable for creating a new session
+        :param check: Callable for health checking an idle session
+        :return: iRODSSession object
+        :raise: Exception if no session is available within the pool timeout
+        """
+        deadline = time.time() + settings.IRODS_SESSION_POOL_TIMEOUT
+        while True:
+            session = None
+            with self._lock:
+                self._check_pid()
+                expired = self._reap(time.time())
+                while (
+                    not self._idle.get(key)
+                    and self._counts.get(key, 0)
+                    >= settings.IRODS_SESSION_POOL_SIZE
+                ):
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self._cleanup(expired)
+                        raise Exception(
+                            'No pooled iRODS session available within timeout'
+                        )
+                    self._lock.wait(remaining)
+                if self._idle.get(key):
+                    session, created, _ = self._idle[key].pop()
+                else:
+                    self._counts[key] = self._counts.get(key, 0) + 1
+                    created = time.time()
+            self._cleanup(expired)
+
+            if session:  # Reuse idle session if healthy
+                try:
+                    check(session)
+                except Exception as ex:
+                    logger.debug(
+                        'Discarding unhealthy iRODS session: {}'.format(ex)
+                    )
+                    self._cleanup([session])
+                    with self._lock:
+                        self._discard(key)
+                    continue
+            else:
+                try:
+                    session = create()
+                except Exception:
+                    with self._lock:
+                        self._discard(key)
+                    raise
+            with self._lock:
+                self._in_use[id(session)] = (key, created)
+            return session
+
+    def release(self, session):
+        """
+        Return a checked out iRODS session to the pool.
+
+        :param session: iRODSSession object
+        """
+        expired = []
+        with self._lock:
+            entry = self._in_use.pop(id(session), None)
+            if not entry:  # Not from this pool or process
+                return
+            key, created = entry
+            now = time.time()
+            if now - created > settings.IRODS_SESSION_POOL_MAX_AGE:
+                expired.append(session)
+                self._discard(key)
+            else:
+                self._idle.setdefault(key, []).append((session, created, now))
+                self._lock.notify_all()
+            expired += self._reap(now)
+        self._cleanup(expired)
+
+    def clear(self):
+        """Clean up all idle sessions in the pool"""
+        with self._lock:
+            self._check_pid()
+            expired = []
+            for key, entries in self._idle.items():
+                expired += [e[0] for e in entries]
+                self._counts[key] -= len(entries)
+            self._idle = {}
+            self._lock.notify_all()
+        self._cleanup(expired)
+
+
+#: Process-wide iRODS session pool
+session_pool = IrodsSessionPool()
+
+
 class IrodsAPI:
     """iRODS API to be used by Django apps"""
 
     #: iRODS session or None if not initialized
     irods = None
 
+    #: Whether the session has been checked out from the session pool
+    pooled = False
+
+    #: Connection arguments for creating worker API objects in run_jobs()
+    _conn_kwargs = None
+
     class IrodsQueryException(Exception):
         """iRODS query exception"""
 
@@ -69,6 +247,7 @@ class IrodsAPI:
             user_name = settings.IRODS_USER
         if not user_pass:
             user_pass = settings.IRODS_PASS
+        self._conn_kwargs = {'user_name': user_name, 'user_pass': user_pass}
 
         # Set up additional iRODS environment variables
         irods_env = dict(settings.IRODS_ENV_DEFAULT)
@@ -82,18 +261,15 @@ class IrodsAPI:
         # logger.debug('iRODS environment: {}'.format(irods_env))
 
         try:
-            self.irods = iRODSSession(
-                host=settings.IRODS_HOST,
-                port=settings.IRODS_PORT,
-                user=user_name,
-                password=user_pass,
-                zone=settings.IRODS_ZONE,
-                **irods_env,
-            )
-            # Ensure we have a connection
-            self.irods.collections.exists(
-                '/{}/home/{}'.format(settings.IRODS_ZONE, user_name)
-            )
+            if settings.IRODS_SESSION_POOL_ENABLE:
+                self.irods = session_pool.acquire(
+                    self._get_pool_key(user_name, user_pass, irods_env),
+                    lambda: self._init_session(user_name, user_pass, irods_env),
+                    lambda s: self._check_session(s, user_name),
+                )
+                self.pooled = True
+            else:
+                self.irods = self._init_session(user_name, user_pass, irods_env)
         except Exception as ex:
             logger.error(
                 'Unable to connect to iRODS (host={}, port={}): {} ({})'.format(
@@ -106,8 +282,7 @@ class IrodsAPI:
             raise ex
 
     def __del__(self):
-        if self.irods:
-            self.irods.cleanup()
+        self.release()
 
     # Internal functions -------------------------------------------------------
 
@@ -121,6 +296,66 @@ class IrodsAPI:
         dt = dt.astimezone(timezone.get_default_timezone())
         return dt.strftime('%Y-%m-%d %H:%M')
 
+    @classmethod
+    def _get_pool_key(cls, user_name, user_pass, irods_env):
+        """
+        Return session pool key for connection parameters. The password and
+        environment are hashed to avoid storing them in the key.
+
+        :param user_name: iRODS user name (string)
+        :param user_pass: iRODS password (string)
+        :param irods_env: iRODS environment (dict)
+        :return: Tuple
+        """
+        digest = hashlib.sha256(
+            '{}:{}'.format(user_pass, sorted(irods_env.items())).encode()
+        ).hexdigest()
+        return (
+            settings.IRODS_HOST,
+            settings.IRODS_PORT,
+            settings.IRODS_ZONE,
+            user_name,
+            digest,
+        )
+
+    @classmethod
+    def _init_session(cls, user_name, user_pass, irods_env):
+        """
+        Initialize a new iRODS session and ensure it is connected.
+
+        :param user_name: iRODS user name (string)
+        :param user_pass: iRODS password (string)
+        :param irods_env: iRODS environment (dict)
+        :return: iRODSSession object
+        """
+        session = iRODSSession(
+            host=settings.IRODS_HOST,
+            port=settings.IRODS_PORT,
+            user=user_name,
+            password=user_pass,
+            zone=settings.IRODS_ZONE,
+            **irods_env,
+        )
+        try:
+            cls._check_session(session, user_name)
+        except Exception:
+            session.cleanup()
+            raise
+        return session
+
+    @classmethod
+    def _check_session(cls, session, user_name):
+        """
+        Ensure we have a working connection in an iRODS session.
+
+        :param session: iRODSSession object
+        :param user_name: iRODS user name (string)
+        :raise: Exception if the connection check fails
+        """
+        session.collections.exists(
+            '/{}/home/{}'.format(settings.IRODS_ZONE, user_name)
+        )
+
     @classmethod
     def _get_query_alias(cls):
         """Return a random iCAT SQL query alias"""
@@ -148,6 +383,20 @@ class IrodsAPI:
                 path = path[:-1]
         return path
 
+    def _get_worker_api(self):
+        """
+        Return a new API object with its own iRODS session for a concurrent
+        worker, connected as the same user as this object.
+
+        :return: IrodsAPI object or None if connecting fails
+        """
+        if not self._conn_kwargs:
+            return None
+        try:
+            return self.__class__(**self._conn_kwargs)
+        except Exception:
+            return None  # Exception logged in constructor
+
     def _send_request(self, api_id, *args):
         """
         Temporary function for sending a raw API request using
@@ -200,6 +449,21 @@ class IrodsAPI:
                 env[k] = int(env[k])
         return env
 
+    @classmethod
+    def get_sql_paths(cls, path):
+        """
+        Return collection path escaped for iCAT SQL queries, along with a
+        version escaped for LIKE patterns to avoid matching other collections.
+
+        :param path: iRODS collection path (string)
+        :return: Escaped path (string), escaped LIKE path (string)
+        """
+        path = path.replace('\'', '\'\'')
+        like_path = (
+            path.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        )
+        return path, like_path
+
     @classmethod
     def get_sub_path(cls, obj, landing_zone=False, include_parent=True):
         """
@@ -436,6 +700,20 @@ class IrodsAPI:
 
     # iRODS Operations ---------------------------------------------------------
 
+    def release(self):
+        """
+        Release the iRODS session of this API object. Pooled sessions are
+        returned to the session pool, others are cleaned up. The API object
+        can not be used for iRODS operations after calling this.
+        """
+        if not self.irods:
+            return
+        if self.pooled:
+            session_pool.release(self.irods)
+        else:
+            self.irods.cleanup()
+        self.irods = None
+
     def get_session(self):
         """
         Return the iRODS session object for direct API access.
@@ -444,6 +722,84 @@ class IrodsAPI:
         """
         return self.irods
 
+    def run_jobs(self, func, items, max_workers, callback=None):
+        """
+        Call func(irods_backend, item) for each item in a list, running up to
+        max_workers calls concurrently in threads with their own pooled iRODS
+        sessions. This object is used by one of the workers, additional API
+        objects are created in the calling thread and released once done. The
+        function must not access the database.
+
+        If a callback is given, it is called in the calling thread as each call
+        completes, with the item and a function returning the result or
+        raising the exception of the call. Otherwise the results are returned
+        in item order. On failure, calls not yet started are skipped and the
+        first exception is raised once the running calls have finished.
+
+        :param func: Function taking an IrodsAPI object and an item
+        :param items: List
+        :param max_workers: Maximum number of concurrent calls (int)
+        :param callback: Function called with an item and a result getter
+                         (optional)
+        :return: List of results if callback is not set, else None
+        :raise: Exception raised by func if callback is not set
+        """
+        ret = [None] * len(items)
+        errors = []
+        backends = queue.Queue()
+        backends.put(self)
+        worker_backends = []
+        for i in range(min(max_workers, len(items)) - 1):
+            backend = self._get_worker_api()
+            if not backend:
+                break
+            worker_backends.append(backend)
+            backends.put(backend)
+
+        def _work(item):
+            backend = backends.get()
+            try:
+                return func(backend, item)
+            finally:
+                backends.put(backend)
+
+        def _set_result(idx, get_result):
+            if callback:
+                return callback(items[idx], get_result)
+            try:
+                ret[idx] = get_result()
+            except Exception as ex:
+                errors.append(ex)
+
+        try:
+            if not worker_backends:
+                for idx, item in enumerate(items):
+                    _set_result(idx, functools.partial(_work, item))
+                    if errors:
+                        break
+            else:
+                with ThreadPoolExecutor(
+                    max_workers=len(worker_backends) + 1
+                ) as executor:
+                    futures = {
+                        executor.submit(_work, item): idx
+                        for idx, item in enumerate(items)
+                    }
+                    for future in as_completed(futures):
+                        if future.cancelled():
+                            continue
+                        _set_result(futures[future], future.result)
+                        if errors:
+                            for f in futures:
+                                f.cancel()
+        finally:
+            for b in worker_backends:
+                b.release()
+        if errors:
+            raise errors[0]
+        if not callback:
+            return ret
+
     def get_info(self):
         """
         Return iRODS server info.
@@ -509,6 +865,82 @@ class IrodsAPI:
 
         return ret
 
+    def get_object_stats_bulk(self, paths):
+        """
+        Return file count and total file size for all files within multiple
+        paths. Statistics are queried with a single registered query, executed
+        once for each distinct parent collection of the paths.
+
+        :param paths: List of full paths to iRODS collections
+        :return: Dict of stats by path, value is None if collection not found
+        :raise: Exception if an iRODS query fails
+        """
+        path_map = {p: self._sanitize_coll_path(p) for p in paths}
+        paths = list(set(path_map.values()))
+        if not paths:
+            return {}
+
+        # Get distinct parent collections not contained in each other
+        roots = []
+        for parent in sorted(set(p.rsplit('/', 1)[0] for p in paths)):
+            if not any(
+                parent == r or parent.startswith(r + '/') for r in roots
+            ):
+                roots.append(parent)
+
+        sql = (
+            'SELECT coll_name, COUNT(data_id) as file_count, '
+            'SUM(data_size) as total_size '
+            'FROM (SELECT DISTINCT coll_name, data_id, data_size '
+            'FROM r_coll_main LEFT JOIN r_data_main '
+            'ON r_data_main.coll_id = r_coll_main.coll_id '
+            'AND data_name NOT LIKE \'%.md5\' '
+            'WHERE coll_name = ? OR coll_name LIKE ?) AS sub_query '
+            'GROUP BY coll_name'
+        )
+        # Register query once and execute it with arguments for each root
+        alias = self._get_query_alias()
+        query = SpecificQuery(self.irods, sql, alias)
+        query.register()
+        coll_stats = {}
+
+        try:
+            for root in roots:
+                root_query = SpecificQuery(
+                    self.irods, alias=alias, args=[root, root + '/%']
+                )
+                try:
+                    for row in root_query.get_results():
+                        coll_stats[row[0]] = (
+                            int(row[1]) if row[1] else 0,
+                            int(row[2]) if row[2] else 0,
+                        )
+                except CAT_NO_ROWS_FOUND:
+                    pass
+                except Exception as ex:
+                    logger.error(
+                        'iRODS exception in get_object_stats_bulk(): {}; '
+                        'root = "{}"'.format(ex.__class__.__name__, root)
+                    )
+                    raise ex
+        finally:
+            query.remove()
+
+        # Sum up stats for each path from its subcollections
+        path_stats = {
+            p: {'file_count': 0, 'total_size': 0}
+            for p in paths
+            if p in coll_stats
+        }
+        for coll_name, stats in coll_stats.items():
+            path = coll_name
+            while path:
+                if path in path_stats:
+                    path_stats[path]['file_count'] += stats[0]
+                    path_stats[path]['total_size'] += stats[1]
+                path = path.rsplit('/', 1)[0]
+        return {k: path_stats.get(v) for k, v in path_map.items()}
+
     def collection_exists(self, path):
         """
         Return True/False depending if the collection defined in path exists
@@ -624,6 +1056,142 @@ class IrodsAPI:
             _do_query(name_like)
         return sorted(ret, key=lambda x: x['path'])
 
+    def get_paths_recursively(self, coll):
+        """
+        Return paths to all data objects and subcollections below a collection
+        recursively with a single query. Unlike get_objs_recursively(), .md5
+        files are included.
+
+        :param coll: Collection object
+        :return: Tuple of data object paths (list) and collection paths (list)
+        """
+        obj_paths = []
+        coll_paths = set()
+        coll_path, like_path = self.get_sql_paths(coll.path)
+        sql = (
+            'SELECT DISTINCT coll_name, data_name '
+            'FROM r_coll_main LEFT JOIN r_data_main USING (coll_id) '
+            'WHERE coll_name = \'{coll_path}\' '
+            'OR coll_name LIKE \'{like_path}/%\''.format(
+                coll_path=coll_path, like_path=like_path
+            )
+        )
+        query = self.get_query(sql)
+
+        try:
+            for row in query.get_results():
+                if row[0] != coll.path:
+                    coll_paths.add(row[0])
+                if row[1]:
+                    obj_paths.append(row[0] + '/' + row[1])
+        except CAT_NO_ROWS_FOUND:
+            pass
+        except Exception as ex:
+            logger.error(
+                'iRODS exception in get_paths_recursively(): {}'.format(
+                    ex.__class__.__name__
+                )
+            )
+            raise ex
+        finally:
+            query.remove()
+        return sorted(obj_paths), sorted(coll_paths)
+
+    def get_paths_by_name(self, name, coll_path):
+        """
+        Return paths to all data objects with a specific name under a
+        collection recursively with a single query.
+
+        :param name: Data object name (string)
+        :param coll_path: Root collection path (string)
+        :return: List of data object paths
+        """
+        ret = []
+        coll_path, like_path = self.get_sql_paths(coll_path)
+        sql = (
+            'SELECT DISTINCT coll_name '
+            'FROM r_data_main JOIN r_coll_main USING (coll_id) '
+            'WHERE data_name = \'{name}\' '
+            'AND (coll_name = \'{coll_path}\' '
+            'OR coll_name LIKE \'{like_path}/%\')'.format(
+                name=name.replace('\'', '\'\''),
+                coll_path=coll_path,
+                like_path=like_path,
+            )
+        )
+        query = self.get_query(sql)
+
+        try:
+            for row in query.get_results():
+                ret.append(row[0] + '/' + name)
+        except CAT_NO_ROWS_FOUND:
+            pass
+        except Exception as ex:
+            logger.error(
+                'iRODS exception in get_paths_by_name(): {}'.format(
+                    ex.__class__.__name__
+                )
+            )
+            raise ex
+        finally:
+            query.remove()
+        return sorted(ret)
+
+    def get_paths_by_checksum(self, checksums, coll_name=None, chunk=1000):
+        """
+        Return paths to all data objects matching any of the given checksums.
+        Objects are queried with a single registered query, executed once for
+        each chunk of checksums.
+
+        :param checksums: List of checksums (strings)
+        :param coll_name: Only include objects under collections of this name
+                          (string, optional)
+        :param chunk: Number of checksums per query execution (int)
+        :return: Dict of sorted data object path lists by checksum
+        :raise: Exception if an iRODS query fails
+        """
+        checksums = sorted(set(checksums))
+        ret = {c: [] for c in checksums}
+        if not checksums:
+            return ret
+        sql = (
+            'SELECT DISTINCT data_checksum, coll_name, data_name '
+            'FROM r_data_main JOIN r_coll_main USING (coll_id) '
+            'WHERE data_checksum = ANY(string_to_array(?, \',\'))'
+        )
+        coll_args = []
+        if coll_name:
+            sql += ' AND (coll_name LIKE ? OR coll_name LIKE ?)'
+            like_name = self.get_sql_paths(coll_name)[1]
+            coll_args = ['%/' + like_name, '%/' + like_name + '/%']
+        # Register query once and execute it with arguments for each chunk
+        alias = self._get_query_alias()
+        query = SpecificQuery(self.irods, sql, alias)
+        query.register()
+
+        try:
+            for i in range(0, len(checksums), chunk):
+                chunk_query = SpecificQuery(
+                    self.irods,
+                    alias=alias,
+                    args=[','.join(checksums[i : i + chunk])] + coll_args,
+                )
+                try:
+                    for row in chunk_query.get_results():
+                        if row[0] in ret:
+                            ret[row[0]].append(row[1] + '/' + row[2])
+                except CAT_NO_ROWS_FOUND:
+                    pass
+                except Exception as ex:
+                    logger.error(
+                        'iRODS exception in get_paths_by_checksum(): '
+                        '{}'.format(ex.__class__.__name__)
+                    )
+                    raise ex
+        finally:
+            query.remove()
+        return {k: sorted(v) for k, v in ret.items()}
+
     def get_objects(
         self,
         path,
@@ -20,6 +20,11 @@ IRODS_INFO_SETTINGS = [
     'IRODS_QUERY_BATCH_SIZE',
     'IRODS_ROOT_PATH',
     'IRODS_SAMPLE_COLL',
+    'IRODS_SESSION_POOL_ENABLE',
+    'IRODS_SESSION_POOL_IDLE_TIMEOUT',
+    'IRODS_SESSION_POOL_MAX_AGE',
+    'IRODS_SESSION_POOL_SIZE',
+    'IRODS_SESSION_POOL_TIMEOUT',
     'IRODS_SODAR_AUTH',
     'IRODS_USER',
     'IRODS_WEBDAV_ENABLED',
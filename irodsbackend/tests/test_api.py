@@ -1,5 +1,7 @@
 """Tests for the API in the irodsbackend app"""
 
+from unittest import mock
+
 from django.conf import settings
 from django.test import override_settings
 
@@ -15,7 +17,7 @@ from samplesheets.tests.test_io import SampleSheetIOMixin, SHEET_DIR
 # Landingzones dependency
 from landingzones.tests.test_models import LandingZoneMixin
 
-from irodsbackend.api import IrodsAPI, USER_GROUP_PREFIX
+from irodsbackend.api import IrodsAPI, USER_GROUP_PREFIX, session_pool
 
 
 # Global constants
@@ -71,6 +73,157 @@ class TestIrodsbackendAPIInit(
         self.assertEqual(irods_backend.irods, None)
 
 
+class TestIrodsbackendAPISessionPool(TestCase):
+    """Tests for iRODS session pooling in IrodsAPI"""
+
+    def setUp(self):
+        session_pool.clear()
+
+    def tearDown(self):
+        session_pool.clear()
+
+    def test_init_pooled(self):
+        """Test reusing pooled session"""
+        irods_backend = IrodsAPI()
+        self.assertTrue(irods_backend.pooled)
+        session = irods_backend.get_session()
+        irods_backend.release()
+        self.assertIsNone(irods_backend.irods)
+        irods_backend = IrodsAPI()
+        self.assertEqual(irods_backend.get_session(), session)
+
+    def test_init_pooled_concurrent(self):
+        """Test pooled sessions checked out concurrently"""
+        irods_backend = IrodsAPI()
+        irods_backend2 = IrodsAPI()
+        self.assertNotEqual(
+            irods_backend.get_session(), irods_backend2.get_session()
+        )
+
+    def test_init_pooled_del(self):
+        """Test returning pooled session on object deletion"""
+        irods_backend = IrodsAPI()
+        session = irods_backend.get_session()
+        del irods_backend
+        self.assertEqual(IrodsAPI().get_session(), session)
+
+    def test_init_pooled_user(self):
+        """Test pooling sessions per user"""
+        irods_backend = IrodsAPI()
+        session = irods_backend.get_session()
+        irods_backend.release()
+        with self.assertRaises(Exception):
+            IrodsAPI(user_pass='Iequ4QueOchai2ro')
+        self.assertEqual(IrodsAPI().get_session(), session)
+
+    @override_settings(IRODS_SESSION_POOL_SIZE=1, IRODS_SESSION_POOL_TIMEOUT=0)
+    def test_init_pooled_limit(self):
+        """Test pool size limit"""
+        irods_backend = IrodsAPI()
+        with self.assertRaises(Exception):
+            IrodsAPI()
+        irods_backend.release()
+        self.assertIsInstance(IrodsAPI(), IrodsAPI)
+
+    @override_settings(IRODS_SESSION_POOL_MAX_AGE=0)
+    def test_init_pooled_max_age(self):
+        """Test recycling session after max age"""
+        irods_backend = IrodsAPI()
+        session = irods_backend.get_session()
+        irods_backend.release()
+        self.assertNotEqual(IrodsAPI().get_session(), session)
+
+    @override_settings(IRODS_SESSION_POOL_IDLE_TIMEOUT=0)
+    def test_init_pooled_idle(self):
+        """Test reaping idle session"""
+        irods_backend = IrodsAPI()
+        session = irods_backend.get_session()
+        irods_backend.release()
+        self.assertNotEqual(IrodsAPI().get_session(), session)
+
+    @override_settings(IRODS_SESSION_POOL_ENABLE=False)
+    def test_init_not_pooled(self):
+        """Test initialization with session pool disabled"""
+        irods_backend = IrodsAPI()
+        self.assertFalse(irods_backend.pooled)
+        session = irods_backend.get_session()
+        irods_backend.release()
+        self.assertNotEqual(IrodsAPI().get_session(), session)
+
+
+class TestIrodsbackendAPIRunJobs(TestCase):
+    """Tests for IrodsAPI.run_jobs()"""
+
+    def setUp(self):
+        self.irods_backend = IrodsAPI(conn=False)
+        self.worker_backend = mock.MagicMock()
+        self.results = {}
+
+    def _callback(self, item, get_result):
+        try:
+            self.results[item] = get_result()
+        except Exception as ex:
+            self.results[item] = ex
+
+    @classmethod
+    def _job(cls, irods_backend, value):
+        if value < 0:
+            raise ValueError('Invalid value')
+        return value * 2
+
+    def test_run(self):
+        """Test running jobs concurrently"""
+        with mock.patch.object(
+            IrodsAPI, '_get_worker_api', return_value=self.worker_backend
+        ) as mock_get:
+            ret = self.irods_backend.run_jobs(self._job, [0, 1, 2, 3], 2)
+        self.assertEqual(ret, [0, 2, 4, 6])
+        mock_get.assert_called_once_with()
+        self.worker_backend.release.assert_called_once()
+
+    def test_run_callback(self):
+        """Test running jobs concurrently with callback"""
+        with mock.patch.object(
+            IrodsAPI, '_get_worker_api', return_value=self.worker_backend
+        ):
+            ret = self.irods_backend.run_jobs(
+                self._job, [1, -1, 2], 2, callback=self._callback
+            )
+        self.assertIsNone(ret)
+        self.assertEqual(self.results[1], 2)
+        self.assertIsInstance(self.results[-1], ValueError)
+        self.assertEqual(self.results[2], 4)
+        self.worker_backend.release.assert_called_once()
+
+    def test_run_error(self):
+        """Test running jobs with a failing job"""
+        with mock.patch.object(
+            IrodsAPI, '_get_worker_api', return_value=self.worker_backend
+        ):
+            with self.assertRaises(ValueError):
+                self.irods_backend.run_jobs(self._job, [1, -1, 2], 2)
+        self.worker_backend.release.assert_called_once()
+
+    def test_run_no_workers(self):
+        """Test running jobs without worker API objects"""
+        with mock.patch.object(IrodsAPI, '_get_worker_api') as mock_get:
+            ret = self.irods_backend.run_jobs(self._job, [0, 1, 2], 1)
+        self.assertEqual(ret, [0, 2, 4])
+        mock_get.assert_not_called()
+
+    def test_run_no_workers_error(self):
+        """Test running jobs without worker API objects with a failing job"""
+        items = []
+
+        def _job(irods_backend, value):
+            items.append(value)
+            return self._job(irods_backend, value)
+
+        with self.assertRaises(ValueError):
+            self.irods_backend.run_jobs(_job, [1, -1, 2], 1)
+        self.assertEqual(items, [1, -1])
+
+
 class TestIrodsbackendAPI(
     ProjectMixin,
     RoleAssignmentMixin,
@@ -143,6 +296,13 @@ class TestIrodsbackendAPI(
         self.assertEqual(env['irods_encryption_salt_size'], 8)
         self.assertEqual(env['irods_port'], 1247)
 
+    def test_get_sql_paths(self):
+        """Test get_sql_paths()"""
+        self.assertEqual(
+            self.irods_backend.get_sql_paths("/sodarZone/o'coll_1%"),
+            ("/sodarZone/o''coll_1%", "/sodarZone/o''coll\\_1\\%"),
+        )
+
     def test_get_path_project(self):
         """Test get_irods_path() with a Project object"""
         expected = '/{zone}/projects/{uuid_prefix}/{uuid}'.format(
@@ -1,8 +1,10 @@
 """Tests for the API in the irodsbackend app with Taskflow and iRODS"""
 
+import os
 import random
 import string
 
+from irods.keywords import REG_CHKSUM_KW
 from irods.ticket import Ticket
 
 from django.conf import settings
@@ -44,6 +46,15 @@ ZONE_DESC = 'description'
 TEST_FILE_NAME = 'test1'
 TEST_FILE_NAME2 = 'test2'
 TICKET_STR = 'Ahn1kah9Lai2hies'
+IRODS_FILE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'samplesheets',
+    'tests',
+    'irods',
+    'test1.txt',
+)
+IRODS_FILE_MD5 = '0b26e313ed4a7ca6904b0e9369e5b957'
+IRODS_FILE_MD5_NONE = 'aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa'
 
 
 class TestIrodsBackendAPITaskflow(
@@ -249,6 +260,128 @@ class TestIrodsBackendAPITaskflow(
         self.assertIsNotNone(obj_list)
         self.assertEqual(len(obj_list['irods_data']), 1)  # Limited to 1
 
+    def test_get_paths_recursively(self):
+        """Test get_paths_recursively()"""
+        self.make_irods_colls(self.investigation)
+        path = self.irods_backend.get_path(self.assay)
+        irods = self.irods_backend.get_session()
+        irods.data_objects.create(path + '/' + TEST_FILE_NAME)
+        irods.data_objects.create(path + '/{}.md5'.format(TEST_FILE_NAME))
+        sub_path = path + '/sub'
+        empty_path = path + '/empty'
+        irods.collections.create(sub_path)
+        irods.collections.create(empty_path)
+        irods.data_objects.create(sub_path + '/' + TEST_FILE_NAME2)
+        # Sibling collection matching an unescaped LIKE should not be included
+        sibling_path = path.replace('/assay_', '/assayx')
+        irods.collections.create(sibling_path)
+        irods.data_objects.create(sibling_path + '/' + TEST_FILE_NAME)
+
+        obj_paths, coll_paths = self.irods_backend.get_paths_recursively(
+            irods.collections.get(path)
+        )
+        expected = [
+            path + '/' + TEST_FILE_NAME,
+            path + '/{}.md5'.format(TEST_FILE_NAME),
+            sub_path + '/' + TEST_FILE_NAME2,
+        ]
+        self.assertEqual(obj_paths, sorted(expected))
+        self.assertEqual(coll_paths, [empty_path, sub_path])
+
+    def test_get_paths_by_name(self):
+        """Test get_paths_by_name()"""
+        self.make_irods_colls(self.investigation)
+        path = self.irods_backend.get_path(self.assay)
+        irods = self.irods_backend.get_session()
+        irods.data_objects.create(path + '/' + TEST_FILE_NAME)
+        irods.data_objects.create(path + '/' + TEST_FILE_NAME2)
+        sub_path = path + '/sub'
+        irods.collections.create(sub_path)
+        irods.data_objects.create(sub_path + '/' + TEST_FILE_NAME)
+        sibling_path = path.replace('/assay_', '/assayx')
+        irods.collections.create(sibling_path)
+        irods.data_objects.create(sibling_path + '/' + TEST_FILE_NAME)
+
+        paths = self.irods_backend.get_paths_by_name(TEST_FILE_NAME, path)
+        expected = [
+            path + '/' + TEST_FILE_NAME,
+            sub_path + '/' + TEST_FILE_NAME,
+        ]
+        self.assertEqual(paths, sorted(expected))
+
+    def test_get_paths_by_name_not_found(self):
+        """Test get_paths_by_name() with no matching objects"""
+        self.make_irods_colls(self.investigation)
+        path = self.irods_backend.get_path(self.assay)
+        self.assertEqual(
+            self.irods_backend.get_paths_by_name(TEST_FILE_NAME, path), []
+        )
+
+    def test_get_paths_by_checksum(self):
+        """Test get_paths_by_checksum()"""
+        self.make_irods_colls(self.investigation)
+        path = self.irods_backend.get_path(self.assay)
+        other_path = self.irods_backend.get_path(self.project) + '/other'
+        irods = self.irods_backend.get_session()
+        irods.collections.create(other_path)
+        irods.data_objects.put(
+            IRODS_FILE_PATH, path + '/', **{REG_CHKSUM_KW: ''}
+        )
+        irods.data_objects.put(
+            IRODS_FILE_PATH, other_path + '/', **{REG_CHKSUM_KW: ''}
+        )
+        file_name = os.path.basename(IRODS_FILE_PATH)
+
+        paths = self.irods_backend.get_paths_by_checksum(
+            [IRODS_FILE_MD5, IRODS_FILE_MD5_NONE], chunk=1
+        )
+        expected = {
+            IRODS_FILE_MD5: sorted(
+                [path + '/' + file_name, other_path + '/' + file_name]
+            ),
+            IRODS_FILE_MD5_NONE: [],
+        }
+        self.assertEqual(paths, expected)
+        paths = self.irods_backend.get_paths_by_checksum(
+            [IRODS_FILE_MD5], coll_name=SAMPLE_COLL
+        )
+        self.assertEqual(paths, {IRODS_FILE_MD5: [path + '/' + file_name]})
+
+    def test_get_object_stats_bulk(self):
+        """Test get_object_stats_bulk()"""
+        self.make_irods_colls(self.investigation)
+        study_path = self.irods_backend.get_path(self.study)
+        assay_path = self.irods_backend.get_path(self.assay)
+        irods = self.irods_backend.get_session()
+        irods.data_objects.create(assay_path + '/' + TEST_FILE_NAME)
+        irods.data_objects.create(assay_path + '/{}.md5'.format(TEST_FILE_NAME))
+        sub_path = assay_path + '/sub'
+        irods.collections.create(sub_path)
+        irods.data_objects.create(sub_path + '/' + TEST_FILE_NAME2)
+        fail_path = assay_path + '/fail'
+        stats = self.irods_backend.get_object_stats_bulk(
+            [study_path, assay_path, sub_path, fail_path]
+        )
+        expected = {
+            study_path: {'file_count': 2, 'total_size': 0},
+            assay_path: {'file_count': 2, 'total_size': 0},
+            sub_path: {'file_count': 1, 'total_size': 0},
+            fail_path: None,
+        }
+        self.assertEqual(stats, expected)
+
+    def test_get_object_stats_bulk_empty(self):
+        """Test get_object_stats_bulk() with empty collections"""
+        self.make_irods_colls(self.investigation)
+        study_path = self.irods_backend.get_path(self.study)
+        assay_path = self.irods_backend.get_path(self.assay)
+        stats = self.irods_backend.get_object_stats_bulk(
+            [study_path, assay_path]
+        )
+        self.assertEqual(stats[study_path], {'file_count': 0, 'total_size': 0})
+        self.assertEqual(stats[assay_path], {'file_count': 0, 'total_size': 0})
+        self.assertEqual(self.irods_backend.get_object_stats_bulk([]), {})
+
     def test_issue_ticket(self):
         """Test issue_ticket()"""
         self.make_irods_colls(self.investigation)
@@ -43,6 +43,7 @@ class BaseIrodsAjaxView(SODARBaseProjectAjaxView):
         super().__init__(*args, **kwargs)
         self.project = None
         self.path = None
+        self.irods_backend = None
 
     @staticmethod
     def _get_detail(msg):
@@ -133,6 +134,8 @@ class BaseIrodsAjaxView(SODARBaseProjectAjaxView):
                 return JsonResponse(self._get_detail(ERROR_NO_AUTH), status=403)
 
         self.path = path
+        # Reuse backend and its session in request handling
+        self.irods_backend = irods_backend
         return super().dispatch(request, *args, **kwargs)
 
 
@@ -141,16 +144,16 @@ class IrodsStatisticsAjaxView(BaseIrodsAjaxView):
 
     def get(self, *args, **kwargs):
         try:
-            irods_backend = get_backend_api('omics_irods')
-            stats = irods_backend.get_object_stats(self.path)
+            stats = self.irods_backend.get_object_stats(self.path)
             return Response(stats, status=200)
         except Exception as ex:
             return Response(self._get_detail(ex), status=500)
 
     def post(self, request, *args, **kwargs):
-        irods_backend = get_backend_api('omics_irods')
+        irods_backend = self.irods_backend
         data = {'coll_objects': []}
         q_dict = request.POST
+        stats_paths = []
 
         for path in q_dict.getlist('paths'):
             if irods_backend.get_path(self.project) not in path:
@@ -165,21 +168,24 @@ class IrodsStatisticsAjaxView(BaseIrodsAjaxView):
                     {'path': path, 'status': '403', 'stats': {}}
                 )
                 break
+            data['coll_objects'].append({'path': path})
+            stats_paths.append(path)
 
-            try:
-                if not irods_backend.collection_exists(path):
-                    data['coll_objects'].append(
-                        {'path': path, 'status': '404', 'stats': {}}
-                    )
-                else:
-                    ret_data = irods_backend.get_object_stats(path)
-                    data['coll_objects'].append(
-                        {'path': path, 'status': '200', 'stats': ret_data}
-                    )
-            except Exception:
-                data['coll_objects'].append(
-                    {'path': path, 'status': '500', 'stats': {}}
-                )
+        # Query stats for all accepted paths at once
+        try:
+            stats = irods_backend.get_object_stats_bulk(stats_paths)
+        except Exception:
+            stats = {}
+        for obj in data['coll_objects']:
+            if 'status' in obj:
+                continue
+            path = obj['path']
+            if path not in stats:
+                obj.update({'status': '500', 'stats': {}})
+            elif stats[path] is None:
+                obj.update({'status': '404', 'stats': {}})
+            else:
+                obj.update({'status': '200', 'stats': stats[path]})
 
         return Response(data, status=200)
 
@@ -190,17 +196,12 @@ class IrodsObjectListAjaxView(BaseIrodsAjaxView):
     permission_required = 'irodsbackend.view_files'
 
     def get(self, request, *args, **kwargs):
-        try:
-            irods_backend = get_backend_api('omics_irods')
-        except Exception as ex:
-            return Response(self._get_detail(ex), status=500)
-
         md5 = request.GET.get('md5')
         colls = request.GET.get('colls')
 
         # Get files
         try:
-            ret_data = irods_backend.get_objects(
+            ret_data = self.irods_backend.get_objects(
                 self.path,
                 check_md5=bool(int(md5)),
                 include_colls=bool(int(colls)),
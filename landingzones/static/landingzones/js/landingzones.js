@@ -1,92 +1,109 @@
 /*****************************
  Zone status updating function
  *****************************/
-var updateZoneStatus = function() {
-    $('.sodar-lz-zone-tr-existing').each(function() {
-        var trId = $(this).attr('id');
-        var zoneTr = $('#' + trId);
-        var zoneUuid = $(this).attr('data-zone-uuid');
-        var sampleUrl = $(this).attr('data-sample-url');
-        var statusTd = zoneTr.find('td#sodar-lz-zone-status-' + zoneUuid);
-
-        if (statusTd.text() !== 'MOVED' && statusTd.text() !== 'DELETED') {
-            $.ajax({
-                url: $(this).attr('data-status-url'),
-                method: 'GET',
-                dataType: 'json'
-            }).done(function (data) {
-                // console.log(trId + ': ' + data['status']);  // DEBUG
-                var statusInfoSpan = zoneTr.find('span#sodar-lz-zone-status-info-' + zoneUuid);
-                // TODO: Should somehow get these from STATUS_STYLES instead
-                var statusStyles = {
-                    'CREATING': 'bg-warning',
-                    'NOT CREATED': 'bg-danger',
-                    'ACTIVE': 'bg-info',
-                    'PREPARING': 'bg-warning',
-                    'VALIDATING': 'bg-warning',
-                    'MOVING': 'bg-warning',
-                    'MOVED': 'bg-success',
-                    'FAILED': 'bg-danger',
-                    'DELETING': 'bg-warning',
-                    'DELETED': 'bg-secondary'
-                };
+var updateZoneRow = function(zoneTr, zoneUuid, data) {
+    var sampleUrl = zoneTr.attr('data-sample-url');
+    var statusTd = zoneTr.find('td#sodar-lz-zone-status-' + zoneUuid);
+    var statusInfoSpan = zoneTr.find('span#sodar-lz-zone-status-info-' + zoneUuid);
+    // TODO: Should somehow get these from STATUS_STYLES instead
+    var statusStyles = {
+        'CREATING': 'bg-warning',
+        'NOT CREATED': 'bg-danger',
+        'ACTIVE': 'bg-info',
+        'PREPARING': 'bg-warning',
+        'VALIDATING': 'bg-warning',
+        'MOVING': 'bg-warning',
+        'MOVED': 'bg-success',
+        'FAILED': 'bg-danger',
+        'DELETING': 'bg-warning',
+        'DELETED': 'bg-secondary'
+    };
 
-                if (statusTd.text() !== data['status'] ||
-                        statusInfoSpan.text() !== data['status_info']) {
-                    statusTd.text(data['status']);
-                    statusTd.removeClass();
-                    statusTd.addClass(statusStyles[data['status']] + ' text-white');
-                    statusInfoSpan.text(data['status_info']);
-                    if (['PREPARING', 'VALIDATING', 'MOVING'].includes(data['status'])) {
-                        statusTd.append(
-                            '<span class="pull-right"><i class="iconify" data-icon="mdi:lock"></i></span>')
-                    }
+    if (statusTd.text() !== data['status'] ||
+            statusInfoSpan.text() !== data['status_info']) {
+        statusTd.text(data['status']);
+        statusTd.removeClass();
+        statusTd.addClass(statusStyles[data['status']] + ' text-white');
+        statusInfoSpan.text(data['status_info']);
+        if (['PREPARING', 'VALIDATING', 'MOVING'].includes(data['status'])) {
+            statusTd.append(
+                '<span class="pull-right"><i class="iconify" data-icon="mdi:lock"></i></span>')
+        }
 
-                    if (['CREATING', 'NOT CREATED', 'MOVED', 'DELETED'].includes(data['status'])) {
-                        zoneTr.find('p#sodar-lz-zone-stats-container-' + zoneUuid).hide();
+        if (['CREATING', 'NOT CREATED', 'MOVED', 'DELETED'].includes(data['status'])) {
+            zoneTr.find('p#sodar-lz-zone-stats-container-' + zoneUuid).hide();
 
-                        if (data['status'] === 'MOVED') {
-                            var statusMovedSpan = zoneTr.find(
-                                'span#sodar-lz-zone-status-moved-' + zoneUuid);
-                            statusMovedSpan.html(
-                                '<p class="mb-0"><a href="' + sampleUrl + '">' +
-                                '<i class="iconify" data-icon="mdi:arrow-right-circle"></i> ' +
-                                'Browse files in sample sheet</a></p>');
-                        }
-                    }
+            if (data['status'] === 'MOVED') {
+                var statusMovedSpan = zoneTr.find(
+                    'span#sodar-lz-zone-status-moved-' + zoneUuid);
+                statusMovedSpan.html(
+                    '<p class="mb-0"><a href="' + sampleUrl + '">' +
+                    '<i class="iconify" data-icon="mdi:arrow-right-circle"></i> ' +
+                    'Browse files in sample sheet</a></p>');
+            }
+        }
 
-                    // Button modification
-                    if (data['status'] !== 'ACTIVE' && data['status'] !== 'FAILED') {
-                        zoneTr.find('td.sodar-lz-zone-title').addClass('text-muted');
-                        zoneTr.find('td.sodar-lz-zone-assay').addClass('text-muted');
-                        zoneTr.find('td.sodar-lz-zone-status-info').addClass('text-muted');
-                        zoneTr.find('.btn').each(function() {
-                           if ($(this).is('button')) {
-                               $(this).attr('disabled', 'disabled');
-                           }
-                           else if ($(this).is('a')) {
-                               $(this).addClass('disabled');
-                           }
-                           $(this).tooltip('disable');
-                        });
-                        zoneTr.find('.sodar-list-dropdown').addClass('disabled');
-                    }
-                    else {
-                        zoneTr.find('td.sodar-lz-zone-title').removeClass('text-muted');
-                        zoneTr.find('td.sodar-lz-zone-assay').removeClass('text-muted');
-                        zoneTr.find('td.sodar-lz-zone-status-info').removeClass('text-muted');
-                        zoneTr.find('p#sodar-lz-zone-stats-container-' + zoneUuid).show();
-                        zoneTr.find('.btn').each(function() {
-                            if ($(this).is('button')) {
-                                $(this).removeAttr('disabled');
-                            }
-                            $(this).removeClass('disabled');
-                            $(this).tooltip('enable');
-                        });
-                        zoneTr.find('.sodar-list-dropdown').removeClass('disabled');
-                    }
+        // Button modification
+        if (data['status'] !== 'ACTIVE' && data['status'] !== 'FAILED') {
+            zoneTr.find('td.sodar-lz-zone-title').addClass('text-muted');
+            zoneTr.find('td.sodar-lz-zone-assay').addClass('text-muted');
+            zoneTr.find('td.sodar-lz-zone-status-info').addClass('text-muted');
+            zoneTr.find('.btn').each(function() {
+               if ($(this).is('button')) {
+                   $(this).attr('disabled', 'disabled');
+               }
+               else if ($(this).is('a')) {
+                   $(this).addClass('disabled');
+               }
+               $(this).tooltip('disable');
+            });
+            zoneTr.find('.sodar-list-dropdown').addClass('disabled');
+        }
+        else {
+            zoneTr.find('td.sodar-lz-zone-title').removeClass('text-muted');
+            zoneTr.find('td.sodar-lz-zone-assay').removeClass('text-muted');
+            zoneTr.find('td.sodar-lz-zone-status-info').removeClass('text-muted');
+            zoneTr.find('p#sodar-lz-zone-stats-container-' + zoneUuid).show();
+            zoneTr.find('.btn').each(function() {
+                if ($(this).is('button')) {
+                    $(this).removeAttr('disabled');
                 }
+                $(this).removeClass('disabled');
+                $(this).tooltip('enable');
             });
+            zoneTr.find('.sodar-list-dropdown').removeClass('disabled');
+        }
+    }
+};
+
+var updateZoneStatus = function() {
+    var zoneUuids = [];
+    $('.sodar-lz-zone-tr-existing').each(function() {
+        var zoneUuid = $(this).attr('data-zone-uuid');
+        var statusTd = $(this).find('td#sodar-lz-zone-status-' + zoneUuid);
+        if (statusTd.text() !== 'MOVED' && statusTd.text() !== 'DELETED') {
+            zoneUuids.push(zoneUuid);
+        }
+    });
+    if (zoneUuids.length === 0) {
+        return;
+    }
+
+    // Query all zones at once, unchanged statuses return 304 via ETag
+    $.ajax({
+        url: window.zoneStatusUrl,
+        method: 'GET',
+        dataType: 'json',
+        data: {zone: zoneUuids},
+        traditional: true,
+        ifModified: true
+    }).done(function (data, textStatus) {
+        if (textStatus === 'notmodified' || !data) {
+            return;
+        }
+        for (var zoneUuid in data) {
+            var zoneTr = $('tr[data-zone-uuid="' + zoneUuid + '"]');
+            updateZoneRow(zoneTr, zoneUuid, data[zoneUuid]);
         }
     });
 };
@@ -1,5 +1,6 @@
 """Celery tasks for the landingzones app"""
 import logging
+import os
 
 from django.conf import settings
 from django.db.models import Count
@@ -10,7 +11,11 @@ from config.celery import app
 from projectroles.models import Project
 from projectroles.plugins import get_backend_api
 
-from landingzones.models import STATUS_ALLOW_UPDATE, STATUS_LOCKING
+from landingzones.models import (
+    LandingZone,
+    STATUS_ALLOW_UPDATE,
+    STATUS_LOCKING,
+)
 from landingzones.views import ZoneMoveMixin
 
 logger = logging.getLogger(__name__)
@@ -37,6 +42,15 @@ def trigger_zone_move():
 
 
 class TriggerZoneMoveTask(ZoneMoveMixin):
+    @classmethod
+    def _get_zone_log(cls, zone):
+        return '{}:{} in project "{}" ({})'.format(
+            zone.user.username,
+            zone.title,
+            zone.project.title,
+            zone.project.sodar_uuid,
+        )
+
     def run(self, request=None):
         try:
             irods_backend = get_backend_api('omics_irods')
@@ -56,51 +70,71 @@ class TriggerZoneMoveTask(ZoneMoveMixin):
             .exclude(zone_count=0)
             .exclude(landing_zones__status__in=STATUS_LOCKING)
         )
+        zones = (
+            LandingZone.objects.filter(
+                project__in=projects, status__in=STATUS_ALLOW_UPDATE
+            )
+            .select_related('project', 'user', 'assay', 'assay__study')
+            .order_by('project', 'pk')
+        )
+        zone_paths = {irods_backend.get_path(z): z for z in zones}
+        if not zone_paths:
+            irods_backend.release()
+            return
 
-        for project in projects:
-            for zone in project.landing_zones.filter(
-                status__in=STATUS_ALLOW_UPDATE
-            ):
-                trigger_path = (
-                    irods_backend.get_path(zone)
-                    + '/'
-                    + settings.LANDINGZONES_TRIGGER_FILE
+        # Find trigger files in all zones with a single query
+        logger.debug(
+            'Searching for trigger file "{}" in {} zone{}'.format(
+                settings.LANDINGZONES_TRIGGER_FILE,
+                len(zone_paths),
+                's' if len(zone_paths) != 1 else '',
+            )
+        )
+        try:
+            trigger_paths = irods_backend.get_paths_by_name(
+                settings.LANDINGZONES_TRIGGER_FILE,
+                os.path.commonpath(list(zone_paths.keys())),
+            )
+        except Exception as ex:
+            logger.error('Trigger file query failed: {}'.format(ex))
+            irods_backend.release()
+            return
+        trigger_zones = sorted(
+            [
+                (zone_paths[os.path.dirname(p)], p)
+                for p in trigger_paths
+                if os.path.dirname(p) in zone_paths
+            ],
+            key=lambda x: (x[0].project.pk, x[0].pk),
+        )
+        triggered_projects = set()
+
+        for zone, trigger_path in trigger_zones:
+            z_log = self._get_zone_log(zone)
+            logger.info('Trigger file found for zone {}'.format(z_log))
+            # Skip the rest of the zones in this project
+            if zone.project.pk in triggered_projects:
+                logger.debug(
+                    'Skipping zone {}, project already triggered'.format(z_log)
                 )
-                z_log = '{}:{} in project "{}" ({})'.format(
-                    zone.user.username,
-                    zone.title,
-                    zone.project.title,
-                    zone.project.sodar_uuid,
+                continue
+            try:
+                irods.data_objects.unlink(trigger_path, force=True)
+                logger.debug('Trigger file deleted')
+
+                # Submit request to Taskflow
+                self._submit_validate_move(
+                    zone, validate_only=False, request=request
                 )
-                logger.debug(
-                    'Searching for trigger file "{}" for zone {}'.format(
-                        trigger_path, z_log
-                    )
+                logger.info(
+                    'Initiated landing zone validation and moving for '
+                    'zone {}'.format(z_log)
+                )
+                triggered_projects.add(zone.project.pk)
+            except Exception as ex:
+                logger.error(
+                    'Triggering automated moving failed in zone '
+                    '{}: {}'.format(z_log, ex)
                 )
 
-                if irods.data_objects.exists(trigger_path):
-                    logger.info('Trigger file found for zone {}'.format(z_log))
-                    try:
-                        irods.data_objects.unlink(trigger_path, force=True)
-                        logger.debug('Trigger file deleted')
-
-                        # Submit request to Taskflow
-                        self._submit_validate_move(
-                            zone, validate_only=False, request=request
-                        )
-                        logger.info(
-                            'Initiated landing zone validation and moving for '
-                            'zone {}'.format(z_log)
-                        )
-                        break  # Skip the rest of the zones in this project
-                    except Exception as ex:
-                        logger.error(
-                            'Triggering automated moving failed in zone '
-                            '{}: {}'.format(z_log, ex)
-                        )
-                else:
-                    logger.debug(
-                        'Trigger file not found for zone {}'.format(z_log)
-                    )
-
-        irods.cleanup()
+        irods_backend.release()
@@ -123,3 +123,17 @@ class TestTriggerZoneMoveTask(
         # Run task and assert results
         self.task.run()
         self.assert_zone_status(self.landing_zone, 'ACTIVE')
+
+    def test_trigger_subcoll(self):
+        """Test triggering with file in a subcollection (should not trigger)"""
+        sub_coll = self.irods.collections.create(
+            self.zone_coll.path + '/subcoll'
+        )
+        self.make_object(sub_coll, settings.LANDINGZONES_TRIGGER_FILE)
+        self.task.run()
+        self.assert_zone_status(self.landing_zone, 'ACTIVE')
+        self.assertTrue(
+            self.irods.data_objects.exists(
+                sub_coll.path + '/' + settings.LANDINGZONES_TRIGGER_FILE
+            )
+        )
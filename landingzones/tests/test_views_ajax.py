@@ -24,3 +24,78 @@ class TestLandingZoneStatusGetAjaxView(TestViewsBase):
             'status_info': self.landing_zone.status_info,
         }
         self.assertEquals(response.data, expected)
+
+
+class TestLandingZoneStatusListAjaxView(TestViewsBase):
+    """Tests for the landing zone status list Ajax view"""
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse(
+            'landingzones:ajax_status_list',
+            kwargs={'project': self.project.sodar_uuid},
+        )
+
+    def test_get(self):
+        """Test GET request for listing zone statuses"""
+        with self.login(self.user):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        expected = {
+            str(self.landing_zone.sodar_uuid): {
+                'status': self.landing_zone.status,
+                'status_info': self.landing_zone.status_info,
+            }
+        }
+        self.assertEqual(response.data, expected)
+        self.assertIsNotNone(response.get('ETag'))
+
+    def test_get_not_modified(self):
+        """Test GET request with matching If-None-Match"""
+        with self.login(self.user):
+            response = self.client.get(self.url)
+            etag = response['ETag']
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_get_modified(self):
+        """Test GET request with If-None-Match after status change"""
+        with self.login(self.user):
+            response = self.client.get(self.url)
+            etag = response['ETag']
+            self.landing_zone.set_status('MOVING')
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(
+            response.data[str(self.landing_zone.sodar_uuid)]['status'],
+            'MOVING',
+        )
+
+    def test_get_finished(self):
+        """Test GET request for finished zones"""
+        self.landing_zone.set_status('MOVED')
+        with self.login(self.user):
+            response = self.client.get(self.url)
+            self.assertEqual(response.data, {})
+            response = self.client.get(
+                self.url + '?zone={}'.format(self.landing_zone.sodar_uuid)
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data[str(self.landing_zone.sodar_uuid)]['status'], 'MOVED'
+        )
+
+    def test_get_own(self):
+        """Test GET request as user without access to other zones"""
+        with self.login(self.user_contrib):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {})
+
+    def test_get_invalid_uuid(self):
+        """Test GET request with invalid zone UUID"""
+        with self.login(self.user):
+            response = self.client.get(self.url + '?zone=invalid')
+        self.assertEqual(response.status_code, 400)
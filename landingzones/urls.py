@@ -78,7 +78,12 @@ urls_ajax = [
         regex=r'^ajax/status/retrieve/(?P<landingzone>[0-9a-f-]+)$',
         view=views_ajax.LandingZoneStatusRetrieveAjaxView.as_view(),
         name='ajax_status',
-    )
+    ),
+    url(
+        regex=r'^ajax/status/list/(?P<project>[0-9a-f-]+)$',
+        view=views_ajax.LandingZoneStatusListAjaxView.as_view(),
+        name='ajax_status_list',
+    ),
 ]
 
 urlpatterns = urls_ui + urls_api + urls_ajax
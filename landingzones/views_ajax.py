@@ -1,11 +1,17 @@
 """Ajax API views for the landingzones app"""
 
+import hashlib
+import json
+
+from django.core.exceptions import ValidationError
+from django.utils.http import parse_etags, quote_etag
+
 from rest_framework.response import Response
 
 # Projectroles dependency
 from projectroles.views_ajax import SODARBaseProjectAjaxView
 
-from landingzones.models import LandingZone
+from landingzones.models import LandingZone, STATUS_FINISHED
 
 
 class LandingZoneStatusRetrieveAjaxView(SODARBaseProjectAjaxView):
@@ -27,3 +33,56 @@ class LandingZoneStatusRetrieveAjaxView(SODARBaseProjectAjaxView):
         ).first()
         ret_data = {'status': zone.status, 'status_info': zone.status_info}
         return Response(ret_data, status=200)
+
+
+class LandingZoneStatusListAjaxView(SODARBaseProjectAjaxView):
+    """
+    Ajax API view for returning the status of multiple landing zones in a
+    project with a single request. Zones can be limited with one or more "zone"
+    query parameters containing zone UUIDs, otherwise all active zones viewable
+    by the user are returned. Supports conditional requests with ETag and
+    If-None-Match.
+    """
+
+    permission_required = 'landingzones.view_zones_own'
+
+    @classmethod
+    def _get_etag(cls, data):
+        """
+        Return ETag for zone status data.
+
+        :param data: Dict
+        :return: String
+        """
+        return quote_etag(
+            hashlib.sha1(
+                json.dumps(data, sort_keys=True).encode('utf-8')
+            ).hexdigest()
+        )
+
+    def get(self, request, *args, **kwargs):
+        project = self.get_project()
+        zones = LandingZone.objects.filter(project=project)
+        if not request.user.has_perm('landingzones.view_zones_all', project):
+            zones = zones.filter(user=request.user)
+        zone_uuids = request.GET.getlist('zone')
+        if zone_uuids:
+            try:
+                zones = zones.filter(sodar_uuid__in=zone_uuids)
+            except ValidationError:
+                return Response({'detail': 'Invalid zone UUID'}, status=400)
+        else:
+            zones = zones.exclude(status__in=STATUS_FINISHED)
+        ret_data = {
+            str(z['sodar_uuid']): {
+                'status': z['status'],
+                'status_info': z['status_info'],
+            }
+            for z in zones.values('sodar_uuid', 'status', 'status_info')
+        }
+        etag = self._get_etag(ret_data)
+        headers = {'ETag': etag}
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and etag in parse_etags(if_none_match):
+            return Response(status=304, headers=headers)
+        return Response(ret_data, status=200, headers=headers)
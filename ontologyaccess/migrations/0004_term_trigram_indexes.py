@@ -0,0 +1,48 @@
+# Generated by Django 3.2.16 on 2026-10-18 12:00
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# NOTE: Expression indexes match the SQL generated for icontains lookups
+# NOTE: array_to_string() is not immutable, so it is wrapped for indexing
+SQL_CREATE = [
+    '''
+    CREATE OR REPLACE FUNCTION ontologyaccess_array_to_text(varchar[])
+    RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT array_to_string($1, ' ') $$
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS ontologyaccess_term_name_trgm
+    ON ontologyaccess_oboformatontologyterm
+    USING gin (UPPER((name)::text) gin_trgm_ops)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS ontologyaccess_term_id_trgm
+    ON ontologyaccess_oboformatontologyterm
+    USING gin (UPPER((term_id)::text) gin_trgm_ops)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS ontologyaccess_term_synonyms_trgm
+    ON ontologyaccess_oboformatontologyterm
+    USING gin (UPPER(ontologyaccess_array_to_text(synonyms)) gin_trgm_ops)
+    ''',
+]
+SQL_DROP = [
+    'DROP INDEX IF EXISTS ontologyaccess_term_synonyms_trgm',
+    'DROP INDEX IF EXISTS ontologyaccess_term_id_trgm',
+    'DROP INDEX IF EXISTS ontologyaccess_term_name_trgm',
+    'DROP FUNCTION IF EXISTS ontologyaccess_array_to_text(varchar[])',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ontologyaccess', '0003_term_name_length'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunSQL(SQL_CREATE, reverse_sql=SQL_DROP),
+    ]
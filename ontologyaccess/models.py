@@ -3,12 +3,16 @@
 import uuid
 
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import TrigramSimilarity
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Case, Func, Q, TextField, When
 
 # Local constants
 DEFAULT_LENGTH = 255
 DEFAULT_TERM_URL = 'http://purl.obolibrary.org/obo/{id_space}_{local_id}'
+# Immutable SQL function for indexing synonyms, created in migration 0004
+SYNONYMS_TEXT_FUNC = 'ontologyaccess_array_to_text'
 TERM_URL_HELP = (
     'Format string for term accession URL. Supports {id_space} '
     'and {local_id}.'
@@ -152,6 +156,55 @@ class OBOFormatOntology(models.Model):
         ).first()
 
 
+class SynonymsText(Func):
+    """Term synonyms joined into a single string for trigram indexed search"""
+
+    function = SYNONYMS_TEXT_FUNC
+    output_field = TextField()
+
+
+class OBOFormatOntologyTermManager(models.Manager):
+    """Manager for custom table-level OBOFormatOntologyTerm queries"""
+
+    def find(self, query, ontologies=None, order_ontologies=False):
+        """
+        Return terms where name, term ID or synonyms contain the query string,
+        ranked by similarity of term name to the query. The lookups are
+        supported by pg_trgm GIN indexes.
+
+        :param query: Query string
+        :param ontologies: Limit search to ontologies by name (list, optional)
+        :param order_ontologies: Order by ontology list order if True (bool)
+        :return: QuerySet
+        """
+        objects = (
+            super()
+            .get_queryset()
+            .select_related('ontology')
+            .annotate(synonyms_text=SynonymsText('synonyms'))
+            .filter(
+                Q(name__icontains=query)
+                | Q(term_id__icontains=query)
+                | Q(synonyms_text__icontains=query)
+            )
+        )
+        if ontologies:
+            objects = objects.filter(ontology__name__in=ontologies)
+        order = []
+        if ontologies and order_ontologies:
+            order.append(
+                Case(
+                    *[
+                        When(ontology__name=name, then=pos)
+                        for pos, name in enumerate(ontologies)
+                    ]
+                )
+            )
+        objects = objects.annotate(similarity=TrigramSimilarity('name', query))
+        order += ['-similarity', 'name']
+        return objects.order_by(*order)
+
+
 class OBOFormatOntologyTerm(models.Model):
     """Ontology term belonging into an OBO ontology"""
 
@@ -239,6 +292,8 @@ class OBOFormatOntologyTerm(models.Model):
         default=uuid.uuid4, unique=True, help_text='SODAR UUID for the object'
     )
 
+    objects = OBOFormatOntologyTermManager()
+
     # Custom row-level functions
 
     def get_id_space(self):
@@ -2,11 +2,13 @@
 
 import json
 
+from django.test import override_settings
 from django.urls import reverse
 
 from ontologyaccess.tests.test_views import (
     TestOntologyAccessViewBase,
     OBO_TERM_NAME,
+    OBO_TERM_SYNONYMS,
 )
 
 
@@ -190,6 +192,52 @@ class TestOBOTermQueryAjaxView(TestOntologyAccessViewBase):
         }
         self.assertEqual(response_data['terms'][0], expected)
 
+    def test_query_synonym(self):
+        """Test querying for a term by synonym"""
+        query_data = {'s': OBO_TERM_SYNONYMS[0].split(' ')[0].lower()}
+        with self.login(self.superuser):
+            response = self.client.get(
+                reverse('ontologyaccess:ajax_obo_term_query'), data=query_data
+            )
+        self.assertEqual(response.status_code, 200)
+        response_data = json.loads(response.content)
+        self.assertEqual(len(response_data['terms']), 1)
+        self.assertEqual(
+            response_data['terms'][0]['term_id'], self.term.term_id
+        )
+
+    def test_query_similarity(self):
+        """Test querying with results ranked by name similarity"""
+        query_data = {'s': OBO_TERM_NAME_ALT}
+        self._make_obo_term(
+            ontology=self.ontology,
+            term_id='TST:9990010',
+            name='A term containing {}'.format(OBO_TERM_NAME_ALT),
+        )
+        with self.login(self.superuser):
+            response = self.client.get(
+                reverse('ontologyaccess:ajax_obo_term_query'), data=query_data
+            )
+        self.assertEqual(response.status_code, 200)
+        response_data = json.loads(response.content)
+        self.assertEqual(len(response_data['terms']), 2)
+        self.assertEqual(
+            response_data['terms'][0]['term_id'], self.term2.term_id
+        )
+
+    @override_settings(ONTOLOGYACCESS_QUERY_LIMIT=1)
+    def test_query_result_limit(self):
+        """Test querying with results exceeding query limit"""
+        query_data = {'s': 'term'}
+        with self.login(self.superuser):
+            response = self.client.get(
+                reverse('ontologyaccess:ajax_obo_term_query'), data=query_data
+            )
+        self.assertEqual(response.status_code, 200)
+        response_data = json.loads(response.content)
+        self.assertEqual(len(response_data['terms']), 1)
+        self.assertEqual(response_data['detail_type'], 'warning')
+
 
 class TestOBOTermListAjaxView(TestOntologyAccessViewBase):
     """Tests for OBOTermListAjaxView"""
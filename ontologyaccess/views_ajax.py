@@ -4,7 +4,7 @@ from functools import reduce
 import logging
 
 from django.conf import settings
-from django.db.models import Case, When, Q
+from django.db.models import Q
 
 from rest_framework.response import Response
 
@@ -69,44 +69,25 @@ class OBOTermQueryAjaxView(OBOOntologyTermMixin, SODARBasePermissionAjaxView):
             return Response({'detail': 'Incorrect query string'}, status=400)
 
         ret_data = {'terms': []}
-        filter_q = Q(name__icontains=request.GET['s']) | Q(
-            term_id__icontains=request.GET['s']
-        )
-        filter_kwargs = {}
         query_limit = settings.ONTOLOGYACCESS_QUERY_LIMIT
-        o_list = None
-
-        # Filter by specific ontologies
-        if request.GET.get('o'):
-            o_list = request.GET.getlist('o')
-            if len(o_list) == 1:
-                filter_kwargs['ontology__name'] = o_list[0]
-            else:
-                filter_kwargs['ontology__name__in'] = o_list
-
-        logger.debug('Term query: {} {}'.format(filter_q, filter_kwargs))
-
-        # Order by ontology list order if set
-        order = []
-
+        o_list = request.GET.getlist('o')
+        logger.debug(
+            'Term query: {} (ontologies={})'.format(request.GET['s'], o_list)
+        )
         if request.GET.get('order') and o_list:
-            order.append(
-                Case(
-                    *[
-                        When(ontology__name=name, then=pos)
-                        for pos, name in enumerate(o_list)
-                    ]
-                )
-            )
             logger.debug('Order by ontology: {}'.format(', '.join(o_list)))
 
-        order.append('name')
-        terms = OBOFormatOntologyTerm.objects.filter(
-            filter_q, **filter_kwargs
-        ).order_by(*order)
-        logger.debug('Term count: {}'.format(terms.count()))
+        # Get one extra term to detect exceeding the limit in a single query
+        terms = list(
+            OBOFormatOntologyTerm.objects.find(
+                request.GET['s'],
+                ontologies=o_list,
+                order_ontologies=bool(request.GET.get('order')),
+            )[: query_limit + 1]
+        )
+        logger.debug('Term count: {}'.format(len(terms)))
 
-        if terms.count() > query_limit:
+        if len(terms) > query_limit:
             ret_data['detail'] = (
                 'Query exceeds {} results. Please refine your search to see '
                 'all results.'.format(query_limit)
@@ -1,10 +1,13 @@
 """Import and export utilities for the samplesheets app"""
 
 import attr
+import functools
 import io
 import logging
+import multiprocessing
 import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from fnmatch import fnmatch
 from zipfile import ZipFile
 
@@ -23,6 +26,7 @@ from altamisa.isatab import (
     models as isa_models,
 )
 
+from django.conf import settings
 from django.db import transaction
 
 # Projectroles dependency
@@ -37,7 +41,10 @@ from samplesheets.models import (
     Process,
     ISATab,
 )
-from samplesheets.rendering import SampleSheetTableBuilder
+from samplesheets.rendering import (
+    SampleSheetTableBuilder,
+    SampleSheetRenderingException,
+)
 from samplesheets.utils import get_alt_names
 
 
@@ -51,6 +58,7 @@ ARCHIVE_TYPES = ['application/zip', 'application/x-zip-compressed']
 ISATAB_TYPES = ['text/plain', 'text/tab-separated-values']
 
 ALTAMISA_MATERIAL_TYPE_SAMPLE = 'Sample Name'
+ALTAMISA_MATERIAL_TYPE_SOURCE = 'Source Name'
 
 MATERIAL_TYPE_MAP = {
     'Source Name': 'SOURCE',
@@ -515,7 +523,212 @@ class SampleSheetIO:
             'Added {} arcs to "{}"'.format(len(arc_vals), db_parent.get_name())
         )
 
-    @transaction.atomic
+    @classmethod
+    def _get_warnings(cls, ws):
+        """
+        Return recorded warnings in a form which can be passed from a worker
+        process.
+
+        :param ws: List of WarningMessage objects
+        :return: List of WarningMessage objects
+        """
+        return [
+            warnings.WarningMessage(w.message, w.category, w.filename, w.lineno)
+            for w in ws
+        ]
+
+    @classmethod
+    def _parse_study(cls, isa_inv, isa_study, study_id, input_name, tsv):
+        """
+        Parse and validate an ISA-Tab study file. Can be run in a worker
+        process.
+
+        :param isa_inv: altamISA InvestigationInfo object
+        :param isa_study: altamISA StudyInfo object
+        :param study_id: Study ID for altamISA (string)
+        :param input_name: Study file name (string)
+        :param tsv: Study file contents (string)
+        :return: altamISA Study object, list of warnings
+        """
+        with warnings.catch_warnings(record=True) as ws:
+            s = StudyReader.from_stream(
+                study_id=study_id,
+                input_file=io.StringIO(tsv),
+                filename=input_name,
+            ).read()
+            StudyValidator(isa_inv, isa_study, s).validate()
+        return s, cls._get_warnings(ws)
+
+    @classmethod
+    def _parse_assay(
+        cls, isa_inv, isa_study, isa_assay, study_id, assay_id, input_name, tsv
+    ):
+        """
+        Parse and validate an ISA-Tab assay file. Can be run in a worker
+        process.
+
+        :param isa_inv: altamISA InvestigationInfo object
+        :param isa_study: altamISA StudyInfo object
+        :param isa_assay: altamISA AssayInfo object
+        :param study_id: Study ID for altamISA (string)
+        :param assay_id: Assay ID for altamISA (string)
+        :param input_name: Assay file name (string)
+        :param tsv: Assay file contents (string)
+        :return: altamISA Assay object, list of warnings
+        """
+        with warnings.catch_warnings(record=True) as ws:
+            a = AssayReader.from_stream(
+                study_id=study_id,
+                assay_id=assay_id,
+                input_file=io.StringIO(tsv),
+                filename=input_name,
+            ).read()
+            AssayValidator(isa_inv, isa_study, isa_assay, a).validate()
+        return a, cls._get_warnings(ws)
+
+    @classmethod
+    def _build_parsed_reference(cls, study_data):
+        """
+        Build reference table for a parsed study and its assays to ensure the
+        study can be rendered.
+
+        :param study_data: Dict of parsed study data from _parse_isa_files()
+        :raise: SampleSheetRenderingException if unable to build table
+        """
+        s = study_data['parsed']
+        nodes = list(s.materials.values()) + list(s.processes.values())
+        arcs = list(s.arcs)
+        for assay_data in study_data['assays']:
+            a = assay_data['parsed']
+            nodes += [
+                m
+                for m in a.materials.values()
+                if MATERIAL_TYPE_MAP[m.type] not in ['SOURCE', 'SAMPLE']
+            ]
+            nodes += list(a.processes.values())
+            arcs += a.arcs
+        SampleSheetTableBuilder.build_reference(
+            nodes,
+            arcs,
+            lambda v: getattr(v, 'type', None) == ALTAMISA_MATERIAL_TYPE_SOURCE,
+        )
+
+    def _parse_isa_files(self, isa_inv, isa_data, project):
+        """
+        Parse and validate ISA-Tab study and assay files for an investigation.
+        Files are parsed in concurrent forked worker processes if enabled by
+        SHEETS_IMPORT_PROCESSES, which is only safe in single-threaded server
+        and worker processes as locks held by other threads are not released
+        in the forked children. Reference tables for the parsed studies are
+        built to ensure they can be rendered.
+
+        :param isa_inv: altamISA InvestigationInfo object
+        :param isa_data: Dictionary of files for a single ISA-Tab investigation
+        :param project: Project object
+        :return: List of dicts
+        :raise: SampleSheetImportException if file is not found in isa_data
+        """
+        ret = []
+        jobs = []  # Tuples of (result dict, description, function, args)
+
+        for study_count, isa_study in enumerate(isa_inv.studies):
+            study_id = 'p{}-s{}'.format(project.pk, study_count)
+            input_name = str(isa_study.info.path)
+            if input_name not in isa_data['studies']:
+                raise SampleSheetImportException(
+                    'Study not found in import data: "{}"'.format(input_name)
+                )
+            study_data = {'isa_study': isa_study, 'assays': []}
+            jobs.append(
+                (
+                    study_data,
+                    'study "{}"'.format(isa_study.info.title),
+                    self._parse_study,
+                    (
+                        isa_inv,
+                        isa_study,
+                        study_id,
+                        input_name,
+                        isa_data['studies'][input_name]['tsv'],
+                    ),
+                )
+            )
+            assay_paths = sorted([a.path for a in isa_study.assays])
+
+            for assay_count, assay_path in enumerate(assay_paths):
+                isa_assay = next(
+                    (a_i for a_i in isa_study.assays if a_i.path == assay_path),
+                    None,
+                )
+                input_name = str(isa_assay.path)
+                if input_name not in isa_data['assays']:
+                    raise SampleSheetImportException(
+                        'Assay not found in import data: "{}"'.format(
+                            input_name
+                        )
+                    )
+                assay_data = {'isa_assay': isa_assay}
+                study_data['assays'].append(assay_data)
+                jobs.append(
+                    (
+                        assay_data,
+                        'assay "{}"'.format(isa_assay.path),
+                        self._parse_assay,
+                        (
+                            isa_inv,
+                            isa_study,
+                            isa_assay,
+                            study_id,
+                            'a{}'.format(assay_count),
+                            input_name,
+                            isa_data['assays'][input_name]['tsv'],
+                        ),
+                    )
+                )
+            ret.append(study_data)
+
+        def _set_result(data, desc, get_result):
+            """Set parsing result and warnings for a study or assay"""
+            try:
+                data['parsed'], data['warnings'] = get_result()
+            except Exception as ex:
+                ex_msg = 'altamISA exception in {}: {}'.format(desc, ex)
+                logger.error(ex_msg)
+                raise Exception(ex_msg)
+
+        # Forked workers inherit the parsed investigation and loaded modules
+        processes = min(settings.SHEETS_IMPORT_PROCESSES, len(jobs))
+        if processes > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            logger.debug(
+                'Parsing {} files in {} processes..'.format(
+                    len(jobs), processes
+                )
+            )
+            with ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context('fork'),
+            ) as executor:
+                futures = [executor.submit(j[2], *j[3]) for j in jobs]
+                for job, future in zip(jobs, futures):
+                    _set_result(job[0], job[1], future.result)
+        else:
+            for job in jobs:
+                _set_result(job[0], job[1], functools.partial(job[2], *job[3]))
+        logger.debug('altamISA parsing OK')
+
+        # Ensure we can build the table reference, raise later if not
+        logger.debug('Ensuring studies can be rendered..')
+        for study_data in ret:
+            study_data['ref_ex'] = None
+            # Empty tables are reported on import
+            if not study_data['parsed'].materials:
+                continue
+            try:
+                self._build_parsed_reference(study_data)
+            except SampleSheetRenderingException as ex:
+                study_data['ref_ex'] = ex
+        return ret
+
     def import_isa(
         self,
         isa_data,
@@ -528,7 +741,9 @@ class SampleSheetIO:
     ):
         """
         Import ISA investigation and its studies/assays from a dictionary of
-        ISA-Tab files into the SODAR database using the altamISA parser.
+        ISA-Tab files into the SODAR database using the altamISA parser. Files
+        are parsed and validated before writing into the database in a single
+        transaction.
 
         :param isa_data: Dictionary of files for a single ISA-Tab investigation
         :param project: Project object
@@ -554,40 +769,12 @@ class SampleSheetIO:
         input_file = io.StringIO(isa_data['investigation']['tsv'])
 
         # Parse and validate investigation
-        with warnings.catch_warnings(record=True) as ws:
+        with warnings.catch_warnings(record=True) as inv_ws:
             isa_inv = InvestigationReader.from_stream(
                 input_file=input_file, filename=input_name
             ).read()
             InvestigationValidator(isa_inv).validate()
 
-        # Create investigation
-        values = {
-            'project': project,
-            'identifier': isa_inv.info.identifier,
-            'title': isa_inv.info.title,
-            'description': isa_inv.info.description,
-            'file_name': isa_data['investigation']['path'],
-            'ontology_source_refs': self._import_tuple_list(
-                isa_inv.ontology_source_refs
-            ),
-            'publications': self._import_publications(isa_inv.publications),
-            'contacts': self._import_contacts(isa_inv.contacts),
-            'headers': isa_inv.info.headers,
-            'comments': self._import_comments(isa_inv.info.comments),
-            'submission_date': isa_inv.info.submission_date,
-            'public_release_date': isa_inv.info.public_release_date,
-            'parser_version': altamisa.__version__,
-            'archive_name': archive_name,
-        }
-        db_investigation = Investigation.objects.create(**values)
-        # Handle parser warnings for investigation
-        self._handle_warnings(ws, db_investigation)
-        logger.info(
-            'Imported investigation "{}"'.format(db_investigation.title)
-        )
-        study_count = 0
-        db_studies = []
-
         # Make sure identifiers are unique (avoid issue #483 repeating)
         # TODO: TBD: Do we still need this with altamISA v0.1?
         study_ids = [s_i.info.identifier for s_i in isa_inv.studies]
@@ -601,234 +788,207 @@ class SampleSheetIO:
             logger.error(error_msg)
             raise ValueError(error_msg)
 
-        # Create studies
-        for isa_study in isa_inv.studies:
-            logger.info('Importing study "{}"..'.format(isa_study.info.title))
-            obj_lookup = {}  # Lookup dict for study materials and processes
-            study_id = 'p{}-s{}'.format(project.pk, study_count)
-            input_name = str(isa_study.info.path)
-            if input_name not in isa_data['studies']:
-                raise SampleSheetImportException(
-                    'Study not found in import data: "{}"'.format(input_name)
-                )
-            input_file = io.StringIO(isa_data['studies'][input_name]['tsv'])
-
-            # Parse and validate study file
-            with warnings.catch_warnings(record=True) as ws:
-                try:
-                    s = StudyReader.from_stream(
-                        study_id=study_id,
-                        input_file=input_file,
-                        filename=input_name,
-                    ).read()
-                    StudyValidator(isa_inv, isa_study, s).validate()
-                except Exception as ex:
-                    ex_msg = 'altamISA exception in study "{}": {}'.format(
-                        isa_study.info.title, ex
-                    )
-                    logger.error(ex_msg)
-                    raise Exception(ex_msg)
+        # Parse and validate studies and assays
+        parsed_studies = self._parse_isa_files(isa_inv, isa_data, project)
 
+        with transaction.atomic():
+            # Create investigation
             values = {
-                'identifier': isa_study.info.identifier,
-                'file_name': isa_study.info.path,
-                'investigation': db_investigation,
-                'title': isa_study.info.title,
-                'description': isa_study.info.description,
-                'study_design': [attr.asdict(x) for x in isa_study.designs],
-                'publications': self._import_publications(
-                    isa_study.publications
+                'project': project,
+                'identifier': isa_inv.info.identifier,
+                'title': isa_inv.info.title,
+                'description': isa_inv.info.description,
+                'file_name': isa_data['investigation']['path'],
+                'ontology_source_refs': self._import_tuple_list(
+                    isa_inv.ontology_source_refs
                 ),
-                'contacts': self._import_contacts(isa_study.contacts),
-                'factors': {
-                    k: attr.asdict(v) for k, v in isa_study.factors.items()
-                },
-                'comments': self._import_comments(isa_study.info.comments),
-                'submission_date': isa_study.info.submission_date,
-                'public_release_date': isa_study.info.public_release_date,
-                'headers': isa_study.info.headers,
+                'publications': self._import_publications(isa_inv.publications),
+                'contacts': self._import_contacts(isa_inv.contacts),
+                'headers': isa_inv.info.headers,
+                'comments': self._import_comments(isa_inv.info.comments),
+                'submission_date': isa_inv.info.submission_date,
+                'public_release_date': isa_inv.info.public_release_date,
+                'parser_version': altamisa.__version__,
+                'archive_name': archive_name,
             }
-            db_study = Study.objects.create(**values)
-            db_studies.append(db_study)
-            # Handle parser warnings for study
-            self._handle_warnings(ws, db_study)
-            logger.info('Imported study "{}"'.format(db_study.title))
-
-            # Create protocols
-            protocol_vals = []
+            db_investigation = Investigation.objects.create(**values)
+            # Handle parser warnings for investigation
+            self._handle_warnings(inv_ws, db_investigation)
+            logger.info(
+                'Imported investigation "{}"'.format(db_investigation.title)
+            )
 
-            for isa_prot in isa_study.protocols.values():
-                protocol_vals.append(
-                    {
-                        'name': isa_prot.name.strip(),
-                        'study': db_study,
-                        'protocol_type': self._import_multi_val(isa_prot.type),
-                        'description': isa_prot.description,
-                        'uri': isa_prot.uri,
-                        'version': isa_prot.version,
-                        'parameters': self._import_tuple_list(
-                            isa_prot.parameters
-                        ),
-                        'components': self._import_tuple_list(
-                            isa_prot.components
-                        ),
-                        'comments': self._import_comments(isa_prot.comments),
-                        'headers': isa_prot.headers,
-                    }
+            # Create studies
+            for study_data in parsed_studies:
+                isa_study = study_data['isa_study']
+                s = study_data['parsed']
+                logger.info(
+                    'Importing study "{}"..'.format(isa_study.info.title)
                 )
+                obj_lookup = {}  # Lookup dict for study materials and processes
+                values = {
+                    'identifier': isa_study.info.identifier,
+                    'file_name': isa_study.info.path,
+                    'investigation': db_investigation,
+                    'title': isa_study.info.title,
+                    'description': isa_study.info.description,
+                    'study_design': [attr.asdict(x) for x in isa_study.designs],
+                    'publications': self._import_publications(
+                        isa_study.publications
+                    ),
+                    'contacts': self._import_contacts(isa_study.contacts),
+                    'factors': {
+                        k: attr.asdict(v) for k, v in isa_study.factors.items()
+                    },
+                    'comments': self._import_comments(isa_study.info.comments),
+                    'submission_date': isa_study.info.submission_date,
+                    'public_release_date': isa_study.info.public_release_date,
+                    'headers': isa_study.info.headers,
+                }
+                db_study = Study.objects.create(**values)
+                # Handle parser warnings for study
+                self._handle_warnings(study_data['warnings'], db_study)
+                logger.info('Imported study "{}"'.format(db_study.title))
+
+                # Create protocols
+                protocol_vals = []
+
+                for isa_prot in isa_study.protocols.values():
+                    protocol_vals.append(
+                        {
+                            'name': isa_prot.name.strip(),
+                            'study': db_study,
+                            'protocol_type': self._import_multi_val(
+                                isa_prot.type
+                            ),
+                            'description': isa_prot.description,
+                            'uri': isa_prot.uri,
+                            'version': isa_prot.version,
+                            'parameters': self._import_tuple_list(
+                                isa_prot.parameters
+                            ),
+                            'components': self._import_tuple_list(
+                                isa_prot.components
+                            ),
+                            'comments': self._import_comments(
+                                isa_prot.comments
+                            ),
+                            'headers': isa_prot.headers,
+                        }
+                    )
 
-            protocols = Protocol.objects.bulk_create(
-                [Protocol(**v) for v in protocol_vals]
-            )
-            protocol_lookup = {
-                p.name: p for p in protocols
-            }  # Per study, no update
-            logger.debug(
-                'Added {} protocols in study "{}"'.format(
-                    len(protocols), db_study.title
+                protocols = Protocol.objects.bulk_create(
+                    [Protocol(**v) for v in protocol_vals]
+                )
+                protocol_lookup = {
+                    p.name: p for p in protocols
+                }  # Per study, no update
+                logger.debug(
+                    'Added {} protocols in study "{}"'.format(
+                        len(protocols), db_study.title
+                    )
                 )
-            )
-
-            # Create study materials
-            self._import_materials(s.materials, db_study, obj_lookup)
 
-            # Create study processes
-            self._import_processes(
-                s.processes, db_study, obj_lookup, protocol_lookup
-            )
+                # Create study materials
+                self._import_materials(s.materials, db_study, obj_lookup)
 
-            # Create study arcs
-            self._import_arcs(s.arcs, db_study)
+                # Create study processes
+                self._import_processes(
+                    s.processes, db_study, obj_lookup, protocol_lookup
+                )
 
-            assay_count = 0
-            assay_paths = sorted([a.path for a in isa_study.assays])
+                # Create study arcs
+                self._import_arcs(s.arcs, db_study)
 
-            for assay_path in assay_paths:
-                isa_assay = next(
-                    (a_i for a_i in isa_study.assays if a_i.path == assay_path),
-                    None,
-                )
-                logger.info('Importing assay "{}"..'.format(isa_assay.path))
-                assay_id = 'a{}'.format(assay_count)
-                # HACK to fake a file for altamISA
-                input_name = str(isa_assay.path)
-                if input_name not in isa_data['assays']:
-                    raise SampleSheetImportException(
-                        'Assay not found in import data: "{}"'.format(
-                            input_name
+                for assay_data in study_data['assays']:
+                    isa_assay = assay_data['isa_assay']
+                    a = assay_data['parsed']
+                    logger.info('Importing assay "{}"..'.format(isa_assay.path))
+                    values = {
+                        'file_name': isa_assay.path,
+                        'study': db_study,
+                        'measurement_type': self._import_multi_val(
+                            isa_assay.measurement_type
+                        ),
+                        'technology_type': self._import_multi_val(
+                            isa_assay.technology_type
+                        ),
+                        'technology_platform': isa_assay.platform,
+                        'comments': self._import_comments(isa_assay.comments),
+                        'headers': isa_assay.headers,
+                    }
+                    db_assay = Assay.objects.create(**values)
+                    # Handle parser warnings for assay
+                    self._handle_warnings(assay_data['warnings'], db_assay)
+                    logger.info(
+                        'Imported assay "{}" in study "{}"'.format(
+                            db_assay.file_name, db_study.title
                         )
                     )
-                input_file = io.StringIO(isa_data['assays'][input_name]['tsv'])
 
-                # Parse and validate assay file
-                with warnings.catch_warnings(record=True) as ws:
-                    try:
-                        a = AssayReader.from_stream(
-                            study_id=study_id,
-                            assay_id=assay_id,
-                            input_file=input_file,
-                            filename=input_name,
-                        ).read()
-                        AssayValidator(
-                            isa_inv, isa_study, isa_assay, a
-                        ).validate()
-                    except Exception as ex:
-                        ex_msg = 'altamISA exception in assay "{}": {}'.format(
-                            isa_assay.path, ex
-                        )
-                        logger.error(ex_msg)
-                        raise Exception(ex_msg)
-
-                logger.debug('altamISA assay import OK')
+                    # Create assay materials (excluding sources and samples)
+                    assay_materials = {
+                        k: a.materials[k]
+                        for k in a.materials
+                        if MATERIAL_TYPE_MAP[a.materials[k].type]
+                        not in ['SOURCE', 'SAMPLE']
+                    }
+                    self._import_materials(
+                        assay_materials, db_assay, obj_lookup
+                    )
 
-                values = {
-                    'file_name': isa_assay.path,
-                    'study': db_study,
-                    'measurement_type': self._import_multi_val(
-                        isa_assay.measurement_type
-                    ),
-                    'technology_type': self._import_multi_val(
-                        isa_assay.technology_type
-                    ),
-                    'technology_platform': isa_assay.platform,
-                    'comments': self._import_comments(isa_assay.comments),
-                    'headers': isa_assay.headers,
-                }
-                db_assay = Assay.objects.create(**values)
-                # Handle parser warnings for assay
-                self._handle_warnings(ws, db_assay)
-                logger.info(
-                    'Imported assay "{}" in study "{}"'.format(
-                        db_assay.file_name, db_study.title
+                    # Create assay processes
+                    self._import_processes(
+                        a.processes, db_assay, obj_lookup, protocol_lookup
                     )
-                )
 
-                # Create assay materials (excluding sources and samples)
-                assay_materials = {
-                    k: a.materials[k]
-                    for k in a.materials
-                    if MATERIAL_TYPE_MAP[a.materials[k].type]
-                    not in ['SOURCE', 'SAMPLE']
-                }
-                self._import_materials(assay_materials, db_assay, obj_lookup)
+                    # Create assay arcs
+                    self._import_arcs(a.arcs, db_assay)
 
-                # Create assay processes
-                self._import_processes(
-                    a.processes, db_assay, obj_lookup, protocol_lookup
+            # Raise exception if we got criticals and don't accept them
+            cc = self._warnings['critical_count']
+            if not self._allow_critical and cc > 0:
+                ex_msg = (
+                    '{} critical warning{} raised by altamISA, '
+                    'import failed'.format(cc, 's' if cc != 1 else '')
                 )
+                raise SampleSheetImportException(ex_msg, self._warnings)
 
-                # Create assay arcs
-                self._import_arcs(a.arcs, db_assay)
-                assay_count += 1
-
-            study_count += 1
+            # Fail if table reference could not be built for parsed studies
+            for study_data in parsed_studies:
+                if study_data['ref_ex']:
+                    raise study_data['ref_ex']
 
-        # Raise exception if we got criticals and don't accept them
-        cc = self._warnings['critical_count']
-        if not self._allow_critical and cc > 0:
-            ex_msg = (
-                '{} critical warning{} raised by altamISA, '
-                'import failed'.format(cc, 's' if cc != 1 else '')
-            )
-            raise SampleSheetImportException(ex_msg, self._warnings)
-
-        # Ensure we can build the table reference, if not then fail
-        logger.debug('Ensuring studies can be rendered..')
-        for study in db_studies:
-            # Throws an exception if we are unable to build this
-            SampleSheetTableBuilder.build_study_reference(study)
-        logger.debug('Rendering OK')
-
-        # Store parser warnings (only if warnings were raised)
-        if not self._warnings['all_ok']:
-            logger.debug(
-                'Warnings raised, storing in investigation.parser_warnings'
-            )
-            db_investigation.parser_warnings = self._warnings
-            db_investigation.save()
+            # Store parser warnings (only if warnings were raised)
+            if not self._warnings['all_ok']:
+                logger.debug(
+                    'Warnings raised, storing in investigation.parser_warnings'
+                )
+                db_investigation.parser_warnings = self._warnings
+                db_investigation.save()
 
-        logger.info(
-            'Import of investigation "{}" OK ({:.1f}s)'.format(
-                db_investigation.title, time.time() - t_start
+            logger.info(
+                'Import of investigation "{}" OK ({:.1f}s)'.format(
+                    db_investigation.title, time.time() - t_start
+                )
             )
-        )
 
-        # Save original ISA-Tab data
-        # TODO: TBD: Prevent saving if previous data matches current one?
-        if save_isa:
-            tags = ['IMPORT']
-            if replace:
-                tags.append('REPLACE')
-            self.save_isa(
-                project=project,
-                inv_uuid=replace_uuid
-                if replace and replace_uuid
-                else db_investigation.sodar_uuid,
-                isa_data=isa_data,
-                tags=tags,
-                user=user,
-                archive_name=archive_name,
-            )
+            # Save original ISA-Tab data
+            # TODO: TBD: Prevent saving if previous data matches current one?
+            if save_isa:
+                tags = ['IMPORT']
+                if replace:
+                    tags.append('REPLACE')
+                self.save_isa(
+                    project=project,
+                    inv_uuid=replace_uuid
+                    if replace and replace_uuid
+                    else db_investigation.sodar_uuid,
+                    isa_data=isa_data,
+                    tags=tags,
+                    user=user,
+                    archive_name=archive_name,
+                )
 
         return db_investigation
 
@@ -1179,13 +1339,14 @@ class SampleSheetIO:
             )
         return ret
 
-    def export_isa(self, investigation):
+    def get_isa_models(self, investigation):
         """
-        Import ISA investigation and its studies/assays from the SODAR database
-        model into an ISA-Tab archive.
+        Convert ISA investigation and its studies/assays from the SODAR
+        database model into altamISA models for export.
 
         :param investigation: Investigation object
-        :return: Dict
+        :return: InvestigationInfo, list of Study models, dict of Assay models
+                 by study and assay index
         """
         # Create StudyInfo objects for studies
         isa_study_infos = []
@@ -1320,12 +1481,25 @@ class SampleSheetIO:
         )
 
         logger.info('Models converted')
+        return inv_info, isa_studies, isa_assays
 
-        # Prepare return data
-        # (the ZIP file preparing and serving should happen in the view)
-        ret = {'investigation': {}, 'studies': {}, 'assays': {}}
-        inv_out = io.StringIO()
+    def write_isa(self, investigation, get_output, models=None):
+        """
+        Validate and write ISA-Tab investigation, study and assay files one at a
+        time. Each file is written into a text stream returned by get_output,
+        after which the file type, path and stream are yielded. The caller is
+        responsible for closing the stream.
 
+        :param investigation: Investigation object
+        :param get_output: Callable taking file type ("investigation",
+                           "studies" or "assays") and path, returning a text
+                           stream
+        :param models: Models from get_isa_models() (optional)
+        :yield: File type, path and text stream
+        """
+        if not models:
+            models = self.get_isa_models(investigation)
+        inv_info, isa_studies, isa_assays = models
         logger.info('Validating and exporting investigation..')
 
         # Write investigation
@@ -1335,6 +1509,7 @@ class SampleSheetIO:
         # Handle parser warnings for investigation
         self._handle_warnings(ws, investigation)
 
+        inv_out = get_output('investigation', inv_info.info.path)
         with warnings.catch_warnings(record=True) as ws:
             InvestigationWriter.from_stream(
                 inv_info, output_file=inv_out
@@ -1342,11 +1517,8 @@ class SampleSheetIO:
 
         # Handle parser warnings for investigation
         self._handle_warnings(ws, investigation)
-
-        ret['investigation']['path'] = inv_info.info.path
-        ret['investigation']['tsv'] = inv_out.getvalue()
-        inv_out.close()
         logger.info('Exported investigation')
+        yield 'investigation', inv_info.info.path, inv_out
 
         # Write studies
         for study_idx, study_info in enumerate(inv_info.studies):
@@ -1367,7 +1539,7 @@ class SampleSheetIO:
             # Handle parser warnings for study
             self._handle_warnings(ws, db_study)
 
-            study_out = io.StringIO()
+            study_out = get_output('studies', study_info.info.path)
             with warnings.catch_warnings(record=True) as ws:
                 StudyWriter.from_stream(
                     isa_studies[study_idx], study_out
@@ -1375,10 +1547,8 @@ class SampleSheetIO:
 
             # Handle parser warnings for study
             self._handle_warnings(ws, db_study)
-
-            ret['studies'][study_info.info.path] = {'tsv': study_out.getvalue()}
-            study_out.close()
             logger.info('Exported study "{}"'.format(db_study.file_name))
+            yield 'studies', study_info.info.path, study_out
 
             # Write assays
             for assay_idx, assay_info in enumerate(study_info.assays):
@@ -1403,7 +1573,7 @@ class SampleSheetIO:
                 # Handle parser warnings for assay
                 self._handle_warnings(ws, db_assay)
 
-                assay_out = io.StringIO()
+                assay_out = get_output('assays', assay_info.path)
                 with warnings.catch_warnings(record=True) as ws:
                     AssayWriter.from_stream(
                         isa_assays[study_idx][assay_idx], assay_out
@@ -1411,11 +1581,28 @@ class SampleSheetIO:
 
                 # Handle parser warnings for assay
                 self._handle_warnings(ws, db_assay)
-
-                ret['assays'][assay_info.path] = {'tsv': assay_out.getvalue()}
-                assay_out.close()
                 logger.info('Exported assay "{}"'.format(db_assay.file_name))
+                yield 'assays', assay_info.path, assay_out
 
+    def export_isa(self, investigation):
+        """
+        Import ISA investigation and its studies/assays from the SODAR database
+        model into an ISA-Tab archive.
+
+        :param investigation: Investigation object
+        :return: Dict
+        """
+        # Prepare return data
+        # (the ZIP file preparing and serving should happen in the view)
+        ret = {'investigation': {}, 'studies': {}, 'assays': {}}
+        for file_type, path, out in self.write_isa(
+            investigation, lambda t, p: io.StringIO()
+        ):
+            if file_type == 'investigation':
+                ret['investigation'] = {'path': path, 'tsv': out.getvalue()}
+            else:
+                ret[file_type][path] = {'tsv': out.getvalue()}
+            out.close()
         return ret
 
     @classmethod
@@ -0,0 +1,465 @@
+"""Benchsheets management command"""
+
+import copy
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+# Projectroles dependency
+from projectroles.management.logging import ManagementCommandLogger
+from projectroles.models import Project, SODAR_CONSTANTS
+
+# Irodsbackend dependency
+from irodsbackend.api import IrodsAPI
+
+import sodar
+from samplesheets.io import SampleSheetIO
+from samplesheets.plugins import get_irods_content
+from samplesheets.rendering import SampleSheetTableBuilder
+
+
+logger = ManagementCommandLogger(__name__)
+
+
+# SODAR constants
+PROJECT_TYPE_PROJECT = SODAR_CONSTANTS['PROJECT_TYPE_PROJECT']
+
+# Local constants
+BENCH_TITLE = 'SODAR Sheet Benchmark'
+BENCH_STUDY = 's_bench.txt'
+BENCH_ASSAY = 'a_bench_{}.txt'
+BENCH_PARAMS = ['rows', 'columns', 'assays', 'protocols']
+BENCH_RESULT_KEYS = ['time_min', 'time_median', 'queries', 'memory_peak']
+INV_HEADER = '''ONTOLOGY SOURCE REFERENCE
+Term Source Name\tOBI
+Term Source File\thttp://data.bioontology.org/ontologies/OBI
+Term Source Version\t31
+Term Source Description\tOntology for Biomedical Investigations
+INVESTIGATION
+Investigation Identifier\ti_bench
+Investigation Title
+Investigation Description
+Investigation Submission Date
+Investigation Public Release Date
+INVESTIGATION PUBLICATIONS
+Investigation PubMed ID
+Investigation Publication DOI
+Investigation Publication Author List
+Investigation Publication Title
+Investigation Publication Status
+Investigation Publication Status Term Accession Number
+Investigation Publication Status Term Source REF
+INVESTIGATION CONTACTS
+Investigation Person Last Name
+Investigation Person First Name
+Investigation Person Mid Initials
+Investigation Person Email
+Investigation Person Phone
+Investigation Person Fax
+Investigation Person Address
+Investigation Person Affiliation
+Investigation Person Roles
+Investigation Person Roles Term Accession Number
+Investigation Person Roles Term Source REF
+STUDY
+Study Identifier\ts_bench
+Study Title\t{title}
+Study Description
+Study Submission Date
+Study Public Release Date
+Study File Name\t{study_file}
+STUDY DESIGN DESCRIPTORS
+Study Design Type
+Study Design Type Term Accession Number
+Study Design Type Term Source REF
+STUDY PUBLICATIONS
+Study PubMed ID
+Study Publication DOI
+Study Publication Author List
+Study Publication Title
+Study Publication Status
+Study Publication Status Term Accession Number
+Study Publication Status Term Source REF
+STUDY FACTORS
+Study Factor Name
+Study Factor Type
+Study Factor Type Term Accession Number
+Study Factor Type Term Source REF
+'''
+INV_CONTACTS = '''STUDY CONTACTS
+Study Person Last Name
+Study Person First Name
+Study Person Mid Initials
+Study Person Email
+Study Person Phone
+Study Person Fax
+Study Person Address
+Study Person Affiliation
+Study Person Roles
+Study Person Roles Term Accession Number
+Study Person Roles Term Source REF
+'''
+
+
+def get_bench_isa(rows, columns, assays, protocols):
+    """
+    Return a synthetic ISA-Tab investigation of configurable size. Each assay
+    contains an extraction and a library construction protocol with materials,
+    followed by additional protocols with parameter values.
+
+    :param rows: Number of sources and samples in the study (int)
+    :param columns: Number of characteristics columns per material (int)
+    :param assays: Number of assays (int)
+    :param protocols: Number of protocols per assay, minimum 2 (int)
+    :return: Dict in the format of SampleSheetIO.get_isa_from_zip()
+    """
+    if protocols < 2:
+        raise ValueError('At least 2 protocols required')
+    extra_protocols = ['protocol {}'.format(i) for i in range(protocols - 2)]
+
+    def _tsv(lines):
+        return '\n'.join('\t'.join(line) for line in lines) + '\n'
+
+    def _char_header(prefix):
+        return [
+            'Characteristics[{} char {}]'.format(prefix, i)
+            for i in range(columns)
+        ]
+
+    def _char_values(name):
+        return ['{}-{}'.format(name, i) for i in range(columns)]
+
+    # Investigation
+    inv_lines = [
+        INV_HEADER.format(title=BENCH_TITLE, study_file=BENCH_STUDY).rstrip(
+            '\n'
+        )
+    ]
+    assay_names = [BENCH_ASSAY.format(i) for i in range(assays)]
+    inv_assays = [
+        ['Study Assay File Name'] + assay_names,
+        ['Study Assay Measurement Type'] + ['genome sequencing'] * assays,
+        ['Study Assay Measurement Type Term Accession Number'] + [''] * assays,
+        ['Study Assay Measurement Type Term Source REF'] + [''] * assays,
+        ['Study Assay Technology Type'] + ['nucleotide sequencing'] * assays,
+        ['Study Assay Technology Type Term Accession Number'] + [''] * assays,
+        ['Study Assay Technology Type Term Source REF'] + [''] * assays,
+        ['Study Assay Technology Platform'] + ['Illumina'] * assays,
+    ]
+    p_names = [
+        'sample collection',
+        'nucleic acid extraction',
+        'library construction',
+    ] + extra_protocols
+    p_params = ['', '', ''] + ['{} param'.format(p) for p in extra_protocols]
+    p_empty = [''] * len(p_names)
+    inv_protocols = [
+        ['Study Protocol Name'] + p_names,
+        ['Study Protocol Type'] + p_names,
+        ['Study Protocol Type Term Accession Number'] + p_empty,
+        ['Study Protocol Type Term Source REF'] + p_empty,
+        ['Study Protocol Description'] + p_empty,
+        ['Study Protocol URI'] + p_empty,
+        ['Study Protocol Version'] + p_empty,
+        ['Study Protocol Parameters Name'] + p_params,
+        ['Study Protocol Parameters Name Term Accession Number'] + p_empty,
+        ['Study Protocol Parameters Name Term Source REF'] + p_empty,
+        ['Study Protocol Components Name'] + p_empty,
+        ['Study Protocol Components Type'] + p_empty,
+        ['Study Protocol Components Type Term Accession Number'] + p_empty,
+        ['Study Protocol Components Type Term Source REF'] + p_empty,
+    ]
+    inv_tsv = (
+        '\n'.join(inv_lines)
+        + '\nSTUDY ASSAYS\n'
+        + _tsv(inv_assays)
+        + 'STUDY PROTOCOLS\n'
+        + _tsv(inv_protocols)
+        + INV_CONTACTS
+    )
+
+    # Study
+    study_lines = [
+        ['Source Name']
+        + _char_header('source')
+        + ['Protocol REF', 'Sample Name']
+        + _char_header('sample')
+    ]
+    for i in range(rows):
+        source = 'source{}'.format(i)
+        sample = 'sample{}'.format(i)
+        study_lines.append(
+            [source]
+            + _char_values(source)
+            + ['sample collection', sample]
+            + _char_values(sample)
+        )
+
+    # Assays
+    assay_header = (
+        ['Sample Name', 'Protocol REF', 'Extract Name']
+        + _char_header('extract')
+        + ['Protocol REF', 'Library Name']
+        + _char_header('library')
+    )
+    for p in extra_protocols:
+        assay_header += ['Protocol REF', 'Parameter Value[{} param]'.format(p)]
+    assay_header.append('Raw Data File')
+    ret = {
+        'investigation': {'path': 'i_bench.txt', 'tsv': inv_tsv},
+        'studies': {BENCH_STUDY: {'tsv': _tsv(study_lines)}},
+        'assays': {},
+    }
+    for a in range(assays):
+        assay_lines = [assay_header]
+        for i in range(rows):
+            extract = 'sample{}-a{}-extract'.format(i, a)
+            library = 'sample{}-a{}-library'.format(i, a)
+            line = (
+                ['sample{}'.format(i), 'nucleic acid extraction', extract]
+                + _char_values(extract)
+                + ['library construction', library]
+                + _char_values(library)
+            )
+            for p in extra_protocols:
+                line += [p, '{}-{}'.format(library, p)]
+            line.append('{}.fastq.gz'.format(library))
+            assay_lines.append(line)
+        ret['assays'][assay_names[a]] = {'tsv': _tsv(assay_lines)}
+    return ret
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks sample sheet import, export and rendering with a synthetic '
+        'ISA-Tab investigation. Database changes are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-r',
+            '--rows',
+            dest='rows',
+            type=int,
+            default=100,
+            help='Number of study rows (default=100)',
+        )
+        parser.add_argument(
+            '-c',
+            '--columns',
+            dest='columns',
+            type=int,
+            default=5,
+            help='Characteristics columns per material (default=5)',
+        )
+        parser.add_argument(
+            '-a',
+            '--assays',
+            dest='assays',
+            type=int,
+            default=1,
+            help='Number of assays (default=1)',
+        )
+        parser.add_argument(
+            '-p',
+            '--protocols',
+            dest='protocols',
+            type=int,
+            default=3,
+            help='Number of protocols per assay, minimum 2 (default=3)',
+        )
+        parser.add_argument(
+            '-n',
+            '--repeat',
+            dest='repeat',
+            type=int,
+            default=3,
+            help='Number of timed runs per benchmark (default=3)',
+        )
+        parser.add_argument(
+            '-o',
+            '--output',
+            dest='output',
+            help='Write results as JSON into file',
+        )
+        parser.add_argument(
+            '--compare',
+            dest='compare',
+            help='Compare results to a previously written JSON file',
+        )
+
+    @classmethod
+    def _run(cls, func, repeat, rollback=False, setup=None):
+        """
+        Run a benchmarked function and return its measurements.
+
+        :param func: Function without arguments
+        :param repeat: Number of timed runs (int)
+        :param rollback: Roll back database changes after each run (bool)
+        :param setup: Untimed function to call before each run (optional)
+        :return: Dict
+        """
+
+        def _call():
+            sid = transaction.savepoint() if rollback else None
+            try:
+                func()
+            finally:
+                if sid:
+                    transaction.savepoint_rollback(sid)
+
+        times = []
+        for i in range(repeat):
+            if setup:
+                setup()
+            t_start = time.perf_counter()
+            _call()
+            times.append(time.perf_counter() - t_start)
+        # Count queries and memory in a separate run to not skew timing
+        if setup:
+            setup()
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as ctx:
+            _call()
+        memory_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return {
+            'time_min': min(times),
+            'time_median': statistics.median(times),
+            'queries': len(ctx.captured_queries),
+            'memory_peak': memory_peak,
+        }
+
+    def _print_results(self, results, compare=None):
+        """Print results with optional comparison to earlier results"""
+        for name, result in results.items():
+            line = '{:<20}'.format(name)
+            for k in BENCH_RESULT_KEYS:
+                line += ' {}={}'.format(k, round(result[k], 4))
+                if compare and name in compare and compare[name].get(k):
+                    diff = (result[k] - compare[name][k]) / compare[name][k]
+                    line += ' ({:+.1%})'.format(diff)
+            self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        compare = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    compare = json.load(f)
+            except Exception as ex:
+                raise CommandError(
+                    'Unable to read comparison file: {}'.format(ex)
+                )
+            if compare.get('params') != {k: options[k] for k in BENCH_PARAMS}:
+                logger.warning('Comparing results with different parameters')
+        try:
+            isa_data = get_bench_isa(
+                options['rows'],
+                options['columns'],
+                options['assays'],
+                options['protocols'],
+            )
+        except ValueError as ex:
+            raise CommandError(ex)
+
+        sheet_io = SampleSheetIO(allow_critical=True)
+        # Connectionless backend, only used for iRODS path building
+        irods_backend = IrodsAPI(conn=False)
+        repeat = max(options['repeat'], 1)
+        results = {}
+        logger.info(
+            'Running benchmarks (rows={}, columns={}, assays={}, '
+            'protocols={}, repeat={})..'.format(
+                options['rows'],
+                options['columns'],
+                options['assays'],
+                options['protocols'],
+                repeat,
+            )
+        )
+
+        with transaction.atomic():
+            project = Project.objects.create(
+                title=BENCH_TITLE, type=PROJECT_TYPE_PROJECT
+            )
+
+            def _import():
+                return sheet_io.import_isa(isa_data, project)
+
+            results['import_isa'] = self._run(_import, repeat, rollback=True)
+            investigation = _import()
+            investigation.irods_status = True
+            investigation.save()
+            study = investigation.studies.first()
+
+            results['export_isa'] = self._run(
+                lambda: sheet_io.export_isa(investigation), repeat
+            )
+            # Use a fresh builder for each run to avoid builder level caching
+            results['build_study_tables'] = self._run(
+                lambda: SampleSheetTableBuilder().build_study_tables(
+                    study, use_cache=False
+                ),
+                repeat,
+            )
+            ret_data = {
+                'study': {'display_name': study.get_display_name()},
+                'tables': SampleSheetTableBuilder().build_study_tables(
+                    study, use_cache=False
+                ),
+            }
+
+            # Micro-benchmark UI column metrics for the last built table,
+            # restoring the table state before each run
+            tb = SampleSheetTableBuilder()
+            tb.build_study_tables(study, ui=False, use_cache=False)
+            table_state = {
+                k: getattr(tb, k)
+                for k in [
+                    '_top_header',
+                    '_field_header',
+                    '_field_configs',
+                    '_table_data',
+                ]
+            }
+
+            def _reset_table():
+                for k, v in table_state.items():
+                    setattr(tb, k, copy.deepcopy(v))
+
+            results['add_ui_table_data'] = self._run(
+                tb._add_ui_table_data, repeat, setup=_reset_table
+            )
+            results['get_irods_content'] = self._run(
+                lambda: get_irods_content(
+                    investigation, study, irods_backend, ret_data
+                ),
+                repeat,
+            )
+            transaction.set_rollback(True)
+
+        self._print_results(
+            results, compare.get('results') if compare else None
+        )
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(
+                    {
+                        'params': {k: options[k] for k in BENCH_PARAMS},
+                        'repeat': repeat,
+                        'version': sodar.__version__,
+                        'date': timezone.now().isoformat(),
+                        'results': results,
+                    },
+                    f,
+                    indent=2,
+                )
+            logger.info('Results written to {}'.format(options['output']))
+        logger.info('Benchmarks done')
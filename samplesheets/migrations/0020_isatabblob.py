@@ -0,0 +1,122 @@
+# Generated by Django 3.2.16 on 2026-10-18 12:00
+
+import hashlib
+import zlib
+
+from django.db import migrations, models
+
+
+COMPRESS_LEVEL = 6
+CHUNK_SIZE = 100
+
+
+def _map_files(data, func):
+    """Apply func to each investigation, study and assay file in data"""
+    ret = dict(data)
+    if data.get('investigation'):
+        ret['investigation'] = func(data['investigation'])
+    for k in ['studies', 'assays']:
+        if k in data:
+            ret[k] = {n: func(f) for n, f in data[k].items()}
+    return ret
+
+
+def compress_isatab_data(apps, schema_editor):
+    """Move ISA-Tab file contents from data into compressed blobs"""
+    ISATab = apps.get_model('samplesheets', 'ISATab')
+    ISATabBlob = apps.get_model('samplesheets', 'ISATabBlob')
+
+    for isatab in ISATab.objects.all().iterator(chunk_size=CHUNK_SIZE):
+        contents = {}
+
+        def _compact(f):
+            if 'tsv' not in f:
+                return f
+            f = dict(f)
+            b_content = f.pop('tsv').encode('utf-8')
+            f['blob'] = hashlib.sha256(b_content).hexdigest()
+            contents[f['blob']] = b_content
+            return f
+
+        isatab.stored_data = _map_files(isatab.stored_data, _compact)
+        existing = set(
+            ISATabBlob.objects.filter(digest__in=contents.keys()).values_list(
+                'digest', flat=True
+            )
+        )
+        ISATabBlob.objects.bulk_create(
+            [
+                ISATabBlob(
+                    digest=k,
+                    content=zlib.compress(v, COMPRESS_LEVEL),
+                    size=len(v),
+                )
+                for k, v in contents.items()
+                if k not in existing
+            ]
+        )
+        isatab.save()
+        isatab.blobs.set(
+            ISATabBlob.objects.filter(digest__in=contents.keys())
+        )
+
+
+def decompress_isatab_data(apps, schema_editor):
+    """Move ISA-Tab file contents from blobs back into data"""
+    ISATab = apps.get_model('samplesheets', 'ISATab')
+
+    for isatab in ISATab.objects.all().iterator(chunk_size=CHUNK_SIZE):
+        contents = {
+            b.digest: zlib.decompress(bytes(b.content)).decode('utf-8')
+            for b in isatab.blobs.all()
+        }
+
+        def _expand(f):
+            if 'blob' not in f:
+                return f
+            f = dict(f)
+            f['tsv'] = contents[f.pop('blob')]
+            return f
+
+        isatab.stored_data = _map_files(isatab.stored_data, _expand)
+        isatab.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('samplesheets', '0019_alter_isatab_date_created'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ISATabBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(help_text='SHA256 checksum of the uncompressed file content', max_length=64, unique=True)),
+                ('content', models.BinaryField(help_text='Compressed file content')),
+                ('size', models.BigIntegerField(help_text='Size of the uncompressed file content in bytes')),
+                ('date_created', models.DateTimeField(auto_now_add=True, help_text='DateTime of blob creation')),
+            ],
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name='isatab',
+                    old_name='data',
+                    new_name='stored_data',
+                ),
+                migrations.AlterField(
+                    model_name='isatab',
+                    name='stored_data',
+                    field=models.JSONField(db_column='data', default=dict, help_text='Data from ISAtab files as a dict, with file contents stored as blobs'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='isatab',
+            name='blobs',
+            field=models.ManyToManyField(blank=True, help_text='Blobs containing ISAtab file contents', related_name='isatabs', to='samplesheets.ISATabBlob'),
+        ),
+        migrations.RunPython(compress_isatab_data, decompress_isatab_data),
+    ]
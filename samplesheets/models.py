@@ -1,15 +1,17 @@
 """Models for the samplesheets app"""
 
+import hashlib
 import logging
 import os
 import uuid
+import zlib
 
 from altamisa.constants import table_headers as th
 
 from django.conf import settings
 from django.contrib.postgres.fields import ArrayField
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q
 from django.utils import timezone
 from django.utils.timezone import localtime
@@ -76,6 +78,11 @@ IRODS_DATA_REQUEST_STATUS_CHOICES = [
 # ISA-Tab SODAR metadata comment key for assay plugin override
 ISA_META_ASSAY_PLUGIN = 'SODAR Assay Plugin'
 
+# Compression level for ISA-Tab file content blobs
+ISATAB_BLOB_COMPRESS_LEVEL = 6
+# Attempts for creating blobs deleted as orphans in a concurrent transaction
+ISATAB_BLOB_CREATE_ATTEMPTS = 3
+
 
 # Abstract base class ----------------------------------------------------------
 
@@ -1003,6 +1010,168 @@ class Process(NodeMixin, BaseSampleSheet):
 # ISA-Tab File Saving ----------------------------------------------------------
 
 
+def map_isatab_files(data, func):
+    """
+    Return a copy of ISA-Tab data dict with func applied to each investigation,
+    study and assay file dict.
+
+    :param data: ISA-Tab data (dict)
+    :param func: Callable taking a file dict and returning a file dict
+    :return: dict
+    """
+    ret = dict(data)
+    if data.get('investigation'):
+        ret['investigation'] = func(data['investigation'])
+    for k in ['studies', 'assays']:
+        if k in data:
+            ret[k] = {n: func(f) for n, f in data[k].items()}
+    return ret
+
+
+class ISATabBlobManager(models.Manager):
+    """Manager for custom table-level ISATabBlob queries"""
+
+    def get_or_create_blobs(self, contents):
+        """
+        Return blobs for file contents, creating the ones which do not exist.
+        The blobs are locked until the end of the transaction, so they can not
+        be deleted by delete_orphans() before they are linked to an ISATab
+        object. Blobs deleted before they could be locked are created again.
+
+        :param contents: File contents as strings keyed by digest (dict)
+        :return: List of ISATabBlob objects
+        :raise: ISATabBlob.DoesNotExist if blobs can not be created
+        """
+        if not contents:
+            return []
+        with transaction.atomic():
+            for i in range(ISATAB_BLOB_CREATE_ATTEMPTS):
+                existing = set(
+                    self.filter(digest__in=contents.keys()).values_list(
+                        'digest', flat=True
+                    )
+                )
+                self.bulk_create(
+                    [
+                        self.model.from_content(v)
+                        for k, v in contents.items()
+                        if k not in existing
+                    ],
+                    ignore_conflicts=True,
+                )
+                blobs = list(
+                    self.select_for_update()
+                    .filter(digest__in=contents.keys())
+                    .order_by('pk')
+                )
+                if len(blobs) == len(contents):
+                    return blobs
+                logger.debug(
+                    'ISA-Tab blobs deleted before locking, retrying '
+                    '(attempt {})'.format(i + 1)
+                )
+        raise self.model.DoesNotExist('Unable to create ISA-Tab blobs')
+
+    def get_contents(self, digests):
+        """
+        Return uncompressed file contents for blobs.
+
+        :param digests: Blob digests (iterable)
+        :return: File contents as strings keyed by digest (dict)
+        :raise: ISATabBlob.DoesNotExist if a blob is not found
+        """
+        ret = {
+            b.digest: b.get_content() for b in self.filter(digest__in=digests)
+        }
+        missing = set(digests) - set(ret.keys())
+        if missing:
+            raise self.model.DoesNotExist(
+                'ISA-Tab blob(s) not found: {}'.format(
+                    ', '.join(sorted(missing))
+                )
+            )
+        return ret
+
+    def delete_orphans(self):
+        """
+        Delete blobs not referred to by any ISATab object. Orphan blobs are
+        locked and checked again before deleting, so blobs being linked to an
+        ISATab object in a concurrent transaction are not deleted.
+
+        :return: Number of deleted blobs (int)
+        """
+        with transaction.atomic():
+            pks = list(
+                self.select_for_update(of=('self',))
+                .filter(isatabs__isnull=True)
+                .order_by('pk')
+                .values_list('pk', flat=True)
+            )
+            if not pks:
+                return 0
+            # Links committed while waiting for the locks are only visible to
+            # a new query
+            return self.filter(pk__in=pks, isatabs__isnull=True).delete()[0]
+
+
+class ISATabBlob(models.Model):
+    """
+    Class for storing compressed content of a single ISA-Tab file. Blobs are
+    addressed by the checksum of their content and shared between ISATab
+    objects, so each distinct file is only stored once.
+    """
+
+    #: SHA256 checksum of the uncompressed file content
+    digest = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text='SHA256 checksum of the uncompressed file content',
+    )
+
+    #: Compressed file content
+    content = models.BinaryField(help_text='Compressed file content')
+
+    #: Size of the uncompressed file content in bytes
+    size = models.BigIntegerField(
+        help_text='Size of the uncompressed file content in bytes'
+    )
+
+    #: DateTime of blob creation
+    date_created = models.DateTimeField(
+        auto_now_add=True, help_text='DateTime of blob creation'
+    )
+
+    objects = ISATabBlobManager()
+
+    def __str__(self):
+        return '{} ({} bytes)'.format(self.digest, self.size)
+
+    def __repr__(self):
+        values = (self.digest, self.size)
+        return 'ISATabBlob({})'.format(', '.join(repr(v) for v in values))
+
+    # Custom row-level functions
+
+    @classmethod
+    def get_digest(cls, content):
+        """Return digest for file content string"""
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def from_content(cls, content):
+        """Return new unsaved blob for file content string"""
+        b_content = content.encode('utf-8')
+        return cls(
+            digest=hashlib.sha256(b_content).hexdigest(),
+            content=zlib.compress(b_content, ISATAB_BLOB_COMPRESS_LEVEL),
+            size=len(b_content),
+        )
+
+    def get_content(self):
+        """Return uncompressed file content as string"""
+        return zlib.decompress(bytes(self.content)).decode('utf-8')
+
+
 class ISATab(models.Model):
     """
     Class for storing ISA-Tab files for one investigation, including its
@@ -1036,9 +1205,21 @@ class ISATab(models.Model):
         help_text='File name of ISAtab archive (optional)',
     )
 
-    #: Data from ISA-Tab files as a dict
-    data = models.JSONField(
-        default=dict, help_text='Data from ISAtab files as a dict'
+    #: Data from ISA-Tab files as a dict, with file contents in ISATabBlob
+    #: objects (use the data property for access)
+    stored_data = models.JSONField(
+        default=dict,
+        db_column='data',
+        help_text='Data from ISAtab files as a dict, with file contents '
+        'stored as blobs',
+    )
+
+    #: Blobs containing ISA-Tab file contents
+    blobs = models.ManyToManyField(
+        ISATabBlob,
+        related_name='isatabs',
+        blank=True,
+        help_text='Blobs containing ISAtab file contents',
     )
 
     #: Tags for categorizing the ISA-Tab
@@ -1086,6 +1267,9 @@ class ISATab(models.Model):
         default=uuid.uuid4, unique=True, help_text='SODAR UUID for the object'
     )
 
+    #: Data with file contents loaded, set on access
+    _data = None
+
     def __str__(self):
         return '{}: {} ({})'.format(
             self.project.title, self.archive_name, self.date_created
@@ -1095,6 +1279,65 @@ class ISATab(models.Model):
         values = (self.project.title, self.archive_name, self.date_created)
         return 'ISATab({})'.format(', '.join(repr(v) for v in values))
 
+    def save(self, *args, **kwargs):
+        """Override save() to store file contents in blobs"""
+        if self._data is None:
+            return super().save(*args, **kwargs)
+        contents = {}
+
+        def _compact(f):
+            if 'tsv' not in f:
+                return f
+            f = dict(f)
+            tsv = f.pop('tsv')
+            f['blob'] = ISATabBlob.get_digest(tsv)
+            contents[f['blob']] = tsv
+            return f
+
+        with transaction.atomic():
+            self.stored_data = map_isatab_files(self._data, _compact)
+            blobs = ISATabBlob.objects.get_or_create_blobs(contents)
+            super().save(*args, **kwargs)
+            self.blobs.set(blobs)
+
+    def refresh_from_db(self, *args, **kwargs):
+        """Override refresh_from_db() to clear loaded data"""
+        self._data = None
+        super().refresh_from_db(*args, **kwargs)
+
+    @property
+    def data(self):
+        """
+        Return data from ISA-Tab files with file contents loaded from blobs.
+        Modifications to the returned dict are stored on save().
+
+        :return: dict
+        """
+        if self._data is None:
+            digests = set()
+
+            def _get_digest(f):
+                if 'blob' in f:
+                    digests.add(f['blob'])
+                return f
+
+            map_isatab_files(self.stored_data, _get_digest)
+            contents = ISATabBlob.objects.get_contents(digests)
+
+            def _expand(f):
+                if 'blob' not in f:
+                    return f
+                f = dict(f)
+                f['tsv'] = contents[f.pop('blob')]
+                return f
+
+            self._data = map_isatab_files(self.stored_data, _expand)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
     # Custom row-level functions
 
     def get_name(self):
@@ -60,16 +60,23 @@ PROJECT_ACTION_UPDATE = SODAR_CONSTANTS['PROJECT_ACTION_UPDATE']
 # Local constants
 SHEETS_INFO_SETTINGS = [
     'SHEETS_ALLOW_CRITICAL',
+    'SHEETS_API_FILE_EXISTS_LIMIT',
+    'SHEETS_CACHE_CONCURRENCY',
     'SHEETS_CONFIG_VERSION',
     'SHEETS_ENABLE_CACHE',
     'SHEETS_ENABLED_TEMPLATES',
+    'SHEETS_IMPORT_PROCESSES',
     'SHEETS_IRODS_LIMIT',
     'SHEETS_IRODS_REQUEST_PAGINATION',
     'SHEETS_IRODS_TICKET_PAGINATION',
     'SHEETS_MAX_COLUMN_WIDTH',
     'SHEETS_MIN_COLUMN_WIDTH',
+    'SHEETS_SYNC_CONCURRENCY',
     'SHEETS_SYNC_INTERVAL',
+    'SHEETS_TABLE_CACHE_ENABLE',
+    'SHEETS_TABLE_CACHE_TIMEOUT',
     'SHEETS_TABLE_HEIGHT',
+    'SHEETS_VERSION_DIFF_PAGINATION',
     'SHEETS_VERSION_PAGINATION',
 ]
 MATERIAL_SEARCH_TYPES = ['source', 'sample']
@@ -167,6 +174,15 @@ class ProjectAppPlugin(
             'source project',
             'user_modifiable': True,
         },
+        'sheet_sync_etag': {
+            'scope': SODAR_CONSTANTS['APP_SETTING_SCOPE_PROJECT'],
+            'type': 'STRING',
+            'label': 'ETag of last synchronized sheet',
+            'default': '',
+            'description': 'ETag of source sheet data in last synchronization, '
+            'used for skipping unchanged source data',
+            'user_modifiable': False,
+        },
         'public_access_ticket': {
             'scope': SODAR_CONSTANTS['APP_SETTING_SCOPE_PROJECT'],
             'type': 'STRING',
@@ -613,6 +629,91 @@ class ProjectAppPlugin(
         # Sync public guest access
         self._update_public_access(project, taskflow, irods_backend)
 
+    @classmethod
+    def _get_assay_shortcut_data(cls, irods_backend, assay_path, shortcuts):
+        """
+        Return assay shortcut cache data queried from iRODS.
+
+        :param irods_backend: IrodsAPI object
+        :param assay_path: Assay path in iRODS (string)
+        :param shortcuts: Assay plugin shortcuts (list of dicts)
+        :return: Dict
+        """
+        ret = {
+            'shortcuts': {
+                'results_reports': irods_backend.collection_exists(
+                    assay_path + '/' + RESULTS_COLL
+                ),
+                'misc_files': irods_backend.collection_exists(
+                    assay_path + '/' + MISC_FILES_COLL
+                ),
+            }
+        }
+        for sc in shortcuts:
+            ret['shortcuts'][sc['id']] = irods_backend.collection_exists(
+                sc['path']
+            )
+        ret['shortcuts']['track_hubs'] = [
+            track_hub_coll.path
+            for track_hub_coll in irods_backend.get_child_colls_by_path(
+                assay_path + '/' + TRACK_HUBS_COLL
+            )
+        ]
+        return ret
+
+    @classmethod
+    def _update_assay_shortcuts(
+        cls, assay_items, irods_backend, cache_backend, user
+    ):
+        """
+        Update assay shortcut cache items. iRODS queries are run concurrently
+        on pooled iRODS sessions, up to the limit set in
+        SHEETS_CACHE_CONCURRENCY. Each cache item is saved as soon as its
+        assay is done, so failing or slow assays do not block the others.
+
+        :param assay_items: List of tuples (Assay, path, plugin shortcuts)
+        :param irods_backend: IrodsAPI object
+        :param cache_backend: Sodarcache backend object
+        :param user: User object or None
+        :raise: Exception if updating any of the assays fails
+        """
+        errors = []
+
+        def _get_data(backend, assay_item):
+            return cls._get_assay_shortcut_data(backend, *assay_item[1:])
+
+        def _set_cache_item(assay_item, get_data):
+            assay = assay_item[0]
+            try:
+                cache_backend.set_cache_item(
+                    name='irods/shortcuts/assay/{}'.format(assay.sodar_uuid),
+                    app_name='samplesheets',
+                    user=user,
+                    data=get_data(),
+                    project=assay.get_project(),
+                )
+            except Exception as ex:
+                logger.error(
+                    'Assay shortcut cache update failed for assay "{}" '
+                    '({}): {}'.format(
+                        assay.get_display_name(), assay.sodar_uuid, ex
+                    )
+                )
+                errors.append(ex)
+
+        irods_backend.run_jobs(
+            _get_data,
+            assay_items,
+            settings.SHEETS_CACHE_CONCURRENCY,
+            callback=_set_cache_item,
+        )
+        if errors:
+            raise Exception(
+                'Assay shortcut cache update failed for {} assay{}: {}'.format(
+                    len(errors), 's' if len(errors) != 1 else '', errors[0]
+                )
+            )
+
     def update_cache(self, name=None, project=None, user=None):
         """
         Update cached data for this app, limitable to item ID and/or project.
@@ -651,48 +752,29 @@ class ProjectAppPlugin(
             study__investigation__irods_status=True,
         )
 
-        for assay in assays:
-            item_name = 'irods/shortcuts/assay/{}'.format(assay.sodar_uuid)
-            assay_path = irods_backend.get_path(assay)
+        # Collect assay shortcut paths, only iRODS is queried concurrently
+        assay_items = []
+        for assay in assays.select_related('study__investigation__project'):
             assay_plugin = assay.get_plugin()
-
-            # Default assay shortcuts
-            cache_data = {
-                'shortcuts': {
-                    'results_reports': irods_backend.collection_exists(
-                        assay_path + '/' + RESULTS_COLL
-                    ),
-                    'misc_files': irods_backend.collection_exists(
-                        assay_path + '/' + MISC_FILES_COLL
-                    ),
-                }
-            }
-
-            # Plugin assay shortcuts
+            plugin_shortcuts = []
             if assay_plugin:
                 plugin_shortcuts = assay_plugin.get_shortcuts(assay) or []
-                for sc in plugin_shortcuts:
-                    cache_data['shortcuts'][
-                        sc['id']
-                    ] = irods_backend.collection_exists(sc['path'])
-
-            cache_data['shortcuts']['track_hubs'] = [
-                track_hub_coll.path
-                for track_hub_coll in irods_backend.get_child_colls_by_path(
-                    assay_path + '/' + TRACK_HUBS_COLL
-                )
-            ]
-            cache_backend.set_cache_item(
-                name=item_name,
-                app_name='samplesheets',
-                user=user,
-                data=cache_data,
-                project=assay.get_project(),
+            assay_items.append(
+                (assay, irods_backend.get_path(assay), plugin_shortcuts)
+            )
+        shortcut_ex = None
+        try:
+            self._update_assay_shortcuts(
+                assay_items, irods_backend, cache_backend, user
             )
+        except Exception as ex:
+            shortcut_ex = ex  # Update assay sub-apps before raising
 
         # Assay sub-app plugins
         for assay_plugin in SampleSheetAssayPluginPoint.get_plugins():
             assay_plugin.update_cache(name, project, user)
+        if shortcut_ex:
+            raise shortcut_ex
 
 
 # Samplesheets study sub-app plugin --------------------------------------------
@@ -872,6 +954,17 @@ class SampleSheetAssayPluginPoint(PluginPoint):
 
     # Common cache update utilities --------------------------------------
 
+    @classmethod
+    def _get_row_cache_data(cls, irods_backend, row_paths):
+        """
+        Return row cache data queried from iRODS.
+
+        :param irods_backend: IrodsAPI object
+        :param row_paths: List of iRODS collection paths for assay rows
+        :return: Dict
+        """
+        return {'paths': irods_backend.get_object_stats_bulk(row_paths)}
+
     def _update_cache_rows(self, app_name, name=None, project=None, user=None):
         """
         Update cache for row-based iRODS links using get_row_path().
@@ -916,6 +1009,7 @@ class SampleSheetAssayPluginPoint(PluginPoint):
 
         # Iterate through studies so we don't have to rebuild too many tables
         studies = list(set([a.study for a in config_assays]))
+        assay_items = []
 
         # Get assay paths
         for study in studies:
@@ -925,7 +1019,6 @@ class SampleSheetAssayPluginPoint(PluginPoint):
                 assay_table = study_tables['assays'][str(assay.sodar_uuid)]
                 assay_path = irods_backend.get_path(assay)
                 row_paths = []
-                item_name = 'irods/rows/{}'.format(assay.sodar_uuid)
 
                 for row in assay_table['table_data']:
                     path = self.get_row_path(
@@ -933,25 +1026,44 @@ class SampleSheetAssayPluginPoint(PluginPoint):
                     )
                     if path and path not in row_paths:
                         row_paths.append(path)
+                assay_items.append((assay, row_paths))
 
-                # Build cache for paths
-                cache_data = {'paths': {}}
+        # Query path stats concurrently and save each item once done
+        errors = []
 
-                for path in row_paths:
-                    try:
-                        cache_data['paths'][
-                            path
-                        ] = irods_backend.get_object_stats(path)
-                    except FileNotFoundError:
-                        cache_data['paths'][path] = None
+        def _get_data(backend, assay_item):
+            return self._get_row_cache_data(backend, assay_item[1])
 
+        def _set_cache_item(assay_item, get_data):
+            assay = assay_item[0]
+            try:
                 cache_backend.set_cache_item(
-                    name=item_name,
+                    name='irods/rows/{}'.format(assay.sodar_uuid),
                     app_name=app_name,
                     user=user,
-                    data=cache_data,
+                    data=get_data(),
                     project=assay.get_project(),
                 )
+            except Exception as ex:
+                logger.error(
+                    'Row cache update failed for assay "{}" ({}): {}'.format(
+                        assay.get_display_name(), assay.sodar_uuid, ex
+                    )
+                )
+                errors.append(ex)
+
+        irods_backend.run_jobs(
+            _get_data,
+            assay_items,
+            settings.SHEETS_CACHE_CONCURRENCY,
+            callback=_set_cache_item,
+        )
+        if errors:
+            raise Exception(
+                'Row cache update failed for {} assay{}: {}'.format(
+                    len(errors), 's' if len(errors) != 1 else '', errors[0]
+                )
+            )
 
 
 def get_assay_plugin(plugin_name):
@@ -1,10 +1,11 @@
 """Rendering utilities for samplesheets"""
 
 import functools
-import itertools
+import hashlib
 import logging
 import re
 import time
+import uuid
 from datetime import date
 from packaging import version
 
@@ -12,16 +13,18 @@ from altamisa.constants import table_headers as th
 from altamisa.isatab.write_assay_study import RefTableBuilder
 
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 
 # Projectroles dependency
 from projectroles.app_settings import AppSettingAPI
 
 from samplesheets.models import Process, GenericMaterial
-from samplesheets.utils import get_node_obj
 
 
 header_re = re.compile(r'^([a-zA-Z\s]+)[\[](.+)[\]]$')
 contact_re = re.compile(r'(.+?)\s?(?:[<|[])(.+?)(?:[>\]])')
+assay_id_re = re.compile(r'-a(\d+)-')
 logger = logging.getLogger(__name__)
 app_settings = AppSettingAPI()
 
@@ -44,8 +47,11 @@ EMPTY_VALUE = '-'
 
 STUDY_HIDEABLE_CLASS = 'sodar-ss-hideable-study'
 SOURCE_SEARCH_STR = '-source-'
-NARROW_CHARS = 'fIijlt;:.,/"!\'!()[]{}'
+NARROW_CHARS = 'fIijlt;:.,/"!\'()[]{}'
 WIDE_CHARS = 'ABCDEFHKLMNOPQRSTUVXYZ<>%$_'
+# Translation tables for removing narrow and wide characters
+NARROW_TABLE = str.maketrans('', '', NARROW_CHARS)
+WIDE_TABLE = str.maketrans('', '', WIDE_CHARS)
 
 IGNORED_HEADERS = ['Unit', 'Term Source REF', 'Term Accession Number']
 
@@ -87,6 +93,11 @@ MODEL_JSON_ATTRS = [
 # HACK: Special cases for inline file linking (see issue #817)
 SPECIAL_FILE_LINK_HEADERS = ['report file']
 
+# Rendered study table cache
+# NOTE: Increase version if the structure of rendered tables changes
+TABLE_CACHE_VERSION = 1
+TABLE_CACHE_PREFIX = 'samplesheets.study_tables'
+
 
 # Table building ---------------------------------------------------------------
 
@@ -118,6 +129,9 @@ class SampleSheetTableBuilder:
         self._parser_version = None
         self._edit = False
         self._sheet_config = None
+        self._headers = {}
+        self._parsed_headers = {}
+        self._refs = {}
 
     # General Data and Cell Functions ------------------------------------------
 
@@ -344,6 +358,26 @@ class SampleSheetTableBuilder:
             self._col_values[self._col_idx] = 1
         self._col_idx += 1
 
+    def _parse_headers(self, headers):
+        """
+        Return parsed headers for a node, omitting ignored headers. Results are
+        cached for each distinct header list during a table build.
+
+        :param headers: List of header strings
+        :return: List of tuples (header, (type, name) or None)
+        """
+        key = tuple(headers)
+        ret = self._parsed_headers.get(key)
+        if ret is None:
+            ret = []
+            for h in key:
+                if h in IGNORED_HEADERS:
+                    continue
+                list_ref = re.findall(header_re, h)
+                ret.append((h, list_ref[0] if list_ref else None))
+            self._parsed_headers[key] = ret
+        return ret
+
     def _add_ordered_element(self, obj):
         """
         Append GenericMaterial or Process element to row along with its
@@ -353,15 +387,11 @@ class SampleSheetTableBuilder:
         :param obj: GenericMaterial or Pocess object
         """
         old_header_len = len(self._field_header)
-        headers = [h for h in obj.headers if h not in IGNORED_HEADERS]
-
-        for h in headers:
-            list_ref = re.findall(header_re, h)
 
+        for h, list_ref in self._parse_headers(obj.headers):
             # Value lists with possible ontology annotation
             if list_ref:
-                h_type = list_ref[0][0]
-                h_name = list_ref[0][1]
+                h_type, h_name = list_ref
                 if h_type in LIST_ATTR_MAP and hasattr(
                     obj, LIST_ATTR_MAP[h_type]
                 ):
@@ -521,8 +551,25 @@ class SampleSheetTableBuilder:
         self._field_idx = 0
 
     def _add_ui_table_data(self):
-        """Add UI specific data to a table"""
+        """
+        Add UI specific data to a table. Column metrics are computed in a
+        single pass over each column, with lengths and numeric checks memoised
+        for repeated values.
+        """
         # TODO: Un-hackify
+        len_cache = {}
+        num_cache = {}
+
+        def _get_text_length(value):
+            """Return estimated length for proportional text string"""
+            ret = len_cache.get(value)
+            if ret is None:
+                # Very unscientific and font-specific, don't try this at home
+                nc = len(value) - len(value.translate(NARROW_TABLE))
+                wc = len(value) - len(value.translate(WIDE_TABLE))
+                ret = round(len(value) - nc - wc + 0.6 * nc + 1.3 * wc)
+                len_cache[value] = ret
+            return ret
 
         def _get_length(value, col_type=None):
             """Return estimated length for proportional text"""
@@ -539,48 +586,90 @@ class SampleSheetTableBuilder:
                     value = '; '.join([x[0] for x in value])
                 elif isinstance(value[0], str):
                     value = '; '.join(value)
-            # Very unscientific and font-specific, don't try this at home
-            nc = sum([value.count(c) for c in NARROW_CHARS])
-            wc = sum([value.count(c) for c in WIDE_CHARS])
-            return round(len(value) - nc - wc + 0.6 * nc + 1.3 * wc)
+            if not isinstance(value, str):
+                return len(value)  # Count list elements
+            return _get_text_length(value)
 
         def _is_num(value):
             """Return whether a value contains an integer/double"""
-            if isinstance(value, str) and '_' in value:
-                return False  # HACK because float() accepts underscore
-            try:
-                float(value)
-                return True
-            except (ValueError, TypeError):
-                return False
+            if not isinstance(value, str):
+                try:
+                    float(value)
+                    return True
+                except (ValueError, TypeError):
+                    return False
+            ret = num_cache.get(value)
+            if ret is None:
+                ret = False
+                # HACK: Check underscore because float() accepts it
+                if '_' not in value:
+                    try:
+                        float(value)
+                        ret = True
+                    except ValueError:
+                        pass
+                num_cache[value] = ret
+            return ret
 
         top_idx = 0  # Top header index
         grp_idx = 0  # Index within current top header group
 
         for i in range(len(self._field_header)):
             header_name = self._field_header[i]['value']
+            col_type = self._field_header[i]['col_type']
 
             # Set column type to NUMERIC if values are all numeric or empty
             # (except if name or process name)
             # Skip check if column is already defined as UNIT
-            if (
+            check_num = (
                 header_name != 'Name'
                 and header_name not in th.PROCESS_NAME_HEADERS
                 and not self._field_configs[i]
-                and self._field_header[i]['col_type'] not in ['NUMERIC', 'UNIT']
-                and any(_is_num(x[i]['value']) for x in self._table_data)
-                and all(
-                    (_is_num(x[i]['value']) or not x[i]['value'])
-                    for x in self._table_data
-                )
-            ):
-                self._field_header[i]['col_type'] = 'NUMERIC'
+                and col_type not in ['NUMERIC', 'UNIT']
+            )
+            any_num = False
+            all_num = True
+            # Maximum cell value lengths for column width estimate
+            max_len = 0
+            max_contact_len = 0
+
+            for row in self._table_data:
+                cell = row[i]
+                value = cell['value']
+                if check_num and all_num:
+                    if _is_num(value):
+                        any_num = True
+                    elif value:
+                        all_num = False
+                if col_type == 'EXTERNAL_LINKS':  # Special case, count elements
+                    cell_len = (
+                        _get_length(value, col_type)
+                        if (value and isinstance(value, list))
+                        else 0
+                    )
+                else:  # Generic type
+                    cell_len = (
+                        _get_length(value, col_type)
+                        + _get_length(cell.get('unit'), col_type)
+                        + 1
+                    )
+                if cell_len > max_len:
+                    max_len = cell_len
+                if col_type == 'CONTACT':
+                    m = contact_re.search(value) if value else None
+                    cell_len = (
+                        _get_length(m.group(1)) if m else len(value or '')
+                    )
+                    if cell_len > max_contact_len:
+                        max_contact_len = cell_len
+
+            if check_num and any_num and all_num:
+                col_type = 'NUMERIC'
+                self._field_header[i]['col_type'] = col_type
 
-            # Maximum column value length for column width estimate
             field_header_len = round(
                 _get_length(self._field_header[i]['value'])
             )
-
             # If there is only one column in top header, use top header length
             if self._top_header[top_idx]['colspan'] == 1:
                 top_header_len = round(
@@ -590,47 +679,11 @@ class SampleSheetTableBuilder:
             else:
                 header_len = field_header_len
 
-            col_type = self._field_header[i]['col_type']
-
             if col_type == 'CONTACT':
-                max_cell_len = max(
-                    [
-                        (
-                            _get_length(
-                                re.findall(contact_re, x[i]['value'])[0][0]
-                            )
-                            if re.findall(contact_re, x[i].get('value'))
-                            else len(x[i].get('value') or '')
-                        )
-                        for x in self._table_data
-                    ]
-                )
-
-            elif col_type == 'EXTERNAL_LINKS':  # Special case, count elements
+                max_len = max_contact_len
+            elif col_type == 'EXTERNAL_LINKS':
                 header_len = 0  # Header length is not comparable
-
-                max_cell_len = max(
-                    [
-                        _get_length(x[i]['value'], col_type)
-                        if (x[i]['value'] and isinstance(x[i]['value'], list))
-                        else 0
-                        for x in self._table_data
-                    ]
-                )
-
-            else:  # Generic type
-                max_cell_len = max(
-                    [
-                        _get_length(x[i]['value'], col_type)
-                        + _get_length(x[i].get('unit'), col_type)
-                        + 1
-                        for x in self._table_data
-                    ]
-                )
-
-            self._field_header[i]['max_value_len'] = max(
-                [header_len, max_cell_len]
-            )
+            self._field_header[i]['max_value_len'] = max([header_len, max_len])
 
             if grp_idx == self._top_header[top_idx]['colspan'] - 1:
                 top_idx += 1
@@ -665,6 +718,7 @@ class SampleSheetTableBuilder:
         self._first_row = True
         self._col_values = []
         self._col_idx = 0
+        self._parsed_headers = {}
         row_id = 0
 
         if not node_map:
@@ -697,28 +751,55 @@ class SampleSheetTableBuilder:
         return ret
 
     @classmethod
-    def build_study_reference(cls, study, nodes=None):
+    def get_study_arcs(cls, study):
+        """
+        Return arcs of a study and its assays.
+
+        :param study: Study object
+        :return: List
+        """
+        arcs = list(study.arcs)
+        for a in study.assays.all().order_by('file_name'):
+            arcs += a.arcs
+        return arcs
+
+    @classmethod
+    def build_study_reference(cls, study, nodes=None, arcs=None):
         """
         Get study reference table for building final table data.
 
         :param study: Study object
         :param nodes: Study nodes (optional)
+        :param arcs: Study and assay arcs (optional)
         :return: Nodes (list), table (list)
         """
         if not nodes:
             nodes = study.get_nodes()
-        arcs = study.arcs
-        for a in study.assays.all().order_by('file_name'):
-            arcs += a.arcs
+        if not arcs:
+            arcs = cls.get_study_arcs(study)
+        return cls.build_reference(nodes, arcs)
+
+    @classmethod
+    def build_reference(cls, nodes, arcs, is_starting=None):
+        """
+        Build reference table from nodes and arcs of a study and its assays.
+
+        :param nodes: List of node objects
+        :param arcs: List of arcs
+        :param is_starting: Predicate for selecting starting nodes (optional,
+                            sources are selected by default)
+        :raise: SampleSheetRenderingException if unable to build table
+        :return: List
+        """
 
         def _is_of_starting_type(starting_type, v):
             """Predicate to select vertices based on starting type."""
             return getattr(v, 'item_type', None) == starting_type
 
         # starting_type = 'Source Name'
-        tb = RefTableBuilder(
-            nodes, arcs, functools.partial(_is_of_starting_type, 'SOURCE')
-        )
+        if not is_starting:
+            is_starting = functools.partial(_is_of_starting_type, 'SOURCE')
+        tb = RefTableBuilder(nodes, arcs, is_starting)
         all_refs = tb.run()
         if not all_refs:
             error_msg = (
@@ -729,6 +810,54 @@ class SampleSheetTableBuilder:
             raise SampleSheetRenderingException(error_msg)
         return all_refs
 
+    def get_study_reference(self, study, nodes=None):
+        """
+        Return study reference table along with its sample column index and
+        row index. Results are cached in the table builder object for each
+        study and reused as long as the study and assay arcs are unchanged.
+
+        :param study: Study object
+        :param nodes: Study nodes (optional)
+        :return: Dict
+        """
+        arcs = self.get_study_arcs(study)
+        arcs_key = tuple(tuple(a) for a in arcs)
+        cached = self._refs.get(study.sodar_uuid)
+        if cached and cached['arcs'] == arcs_key:
+            return cached['reference']
+        all_refs = self.build_study_reference(study, nodes, arcs)
+        sample_idx = self.get_sample_idx(all_refs)
+        ret = {
+            'all_refs': all_refs,
+            'sample_idx': sample_idx,
+            'index': self.get_ref_index(all_refs, sample_idx),
+        }
+        self._refs[study.sodar_uuid] = {'arcs': arcs_key, 'reference': ret}
+        return ret
+
+    @classmethod
+    def get_ref_index(cls, all_refs, sample_idx=None):
+        """
+        Return index of reference table rows for the study table and each
+        assay table, built in a single pass over the reference table.
+
+        :param all_refs: All references for a study (list)
+        :param sample_idx: Integer for sample column index (optional)
+        :return: Dict with keys "study" (list of row indices for distinct
+                 study rows) and "assays" (dict of assay ID and row indices)
+        """
+        if not sample_idx:
+            sample_idx = cls.get_sample_idx(all_refs)
+        study_rows = {}
+        assay_rows = {}
+        for i, row in enumerate(all_refs):
+            study_rows.setdefault(tuple(row[: sample_idx + 1]), i)
+            if len(row) > sample_idx + 1:
+                m = assay_id_re.search(row[sample_idx + 1])
+                if m:
+                    assay_rows.setdefault(int(m.group(1)), []).append(i)
+        return {'study': list(study_rows.values()), 'assays': assay_rows}
+
     @classmethod
     def get_sample_idx(cls, all_refs):
         """
@@ -750,50 +879,162 @@ class SampleSheetTableBuilder:
         return {n.unique_name: n for n in nodes}
 
     @classmethod
-    def get_study_refs(cls, all_refs, sample_idx=None):
+    def get_study_refs(cls, all_refs, sample_idx=None, ref_index=None):
         """
         Get study table references without duplicates.
 
         :param all_refs: All references for a study.
         :param sample_idx: Integer for sample column index (optional)
+        :param ref_index: Reference row index from get_ref_index() (optional)
         :return: List
         """
         if not sample_idx:
             sample_idx = cls.get_sample_idx(all_refs)
-        sr = [row[: sample_idx + 1] for row in all_refs]
-        return list(sr for sr, _ in itertools.groupby(sr))
+        if not ref_index:
+            ref_index = cls.get_ref_index(all_refs, sample_idx)
+        return [all_refs[i][: sample_idx + 1] for i in ref_index['study']]
 
     @classmethod
-    def get_assay_refs(cls, all_refs, assay_id, sample_idx, study_cols=True):
+    def get_assay_refs(
+        cls, all_refs, assay_id, sample_idx, study_cols=True, ref_index=None
+    ):
         """
         Return assay table references based on assay ID.
 
-        :param all_refs:
+        :param all_refs: All references for a study.
         :param assay_id: Integer for assay ID
         :param sample_idx: Integer for sample column index
         :param study_cols: Include study columns if True (bool)
+        :param ref_index: Reference row index from get_ref_index() (optional)
         :return: List
         """
-        assay_search_str = '-a{}-'.format(assay_id)
-        assay_refs = []
+        if not ref_index:
+            ref_index = cls.get_ref_index(all_refs, sample_idx)
         start_idx = 0 if study_cols else sample_idx
-        for row in all_refs:
-            if (
-                len(row) > sample_idx + 1
-                and assay_search_str in row[sample_idx + 1]
-            ):
-                assay_refs.append(row[start_idx:])
-        return assay_refs
+        return [
+            all_refs[i][start_idx:]
+            for i in ref_index['assays'].get(assay_id, [])
+        ]
+
+    # Table caching ------------------------------------------------------------
+
+    @classmethod
+    def _get_cache_stamp(cls, study):
+        """
+        Return modification stamp for a study in the table cache. The stamp is
+        renewed each time the cache for the study is cleared.
+
+        :param study: Study object
+        :return: String
+        """
+        stamp_key = '{}.{}.stamp'.format(TABLE_CACHE_PREFIX, study.sodar_uuid)
+        stamp = cache.get(stamp_key, version=TABLE_CACHE_VERSION)
+        if not stamp:
+            stamp = uuid.uuid4().hex
+            cache.set(
+                stamp_key, stamp, timeout=None, version=TABLE_CACHE_VERSION
+            )
+        return stamp
+
+    @classmethod
+    def get_investigation_stamp(cls, investigation):
+        """
+        Return combined table cache stamp for the studies of an investigation.
+        The stamp changes whenever the cache of any of its studies is cleared.
+
+        :param investigation: Investigation object
+        :return: String
+        """
+        stamps = [
+            cls._get_cache_stamp(s)
+            for s in investigation.studies.order_by('pk')
+        ]
+        return hashlib.md5(''.join(stamps).encode()).hexdigest()
+
+    @classmethod
+    def get_cache_key(cls, study, edit=False, use_config=True, ui=True):
+        """
+        Return key for rendered study tables in the Django cache.
+
+        :param study: Study object
+        :param edit: Edit mode (bool)
+        :param use_config: Sheet configuration used in building (bool)
+        :param ui: UI specific data included (bool)
+        :return: String
+        """
+        return '{}.{}.{}.{}.{}{}{}'.format(
+            TABLE_CACHE_PREFIX,
+            study.sodar_uuid,
+            study.investigation.date_modified.timestamp(),
+            cls._get_cache_stamp(study),
+            int(edit),
+            int(use_config),
+            int(ui),
+        )
+
+    @classmethod
+    def clear_study_cache(cls, study):
+        """
+        Invalidate cached rendered tables for a study. If called within a
+        transaction, the cache is cleared again on commit to discard tables
+        rendered from uncommitted data in the meantime.
+
+        :param study: Study object
+        """
+        stamp_key = '{}.{}.stamp'.format(TABLE_CACHE_PREFIX, study.sodar_uuid)
+
+        def _renew_stamp():
+            cache.set(
+                stamp_key,
+                uuid.uuid4().hex,
+                timeout=None,
+                version=TABLE_CACHE_VERSION,
+            )
+
+        _renew_stamp()
+        transaction.on_commit(_renew_stamp)
+        logger.debug(
+            'Cleared table cache for study "{}" ({})'.format(
+                study.get_name(), study.sodar_uuid
+            )
+        )
+
+    @classmethod
+    def clear_investigation_cache(cls, investigation):
+        """
+        Invalidate cached rendered tables for all studies in an investigation.
 
-    def build_study_tables(self, study, edit=False, use_config=True, ui=True):
+        :param investigation: Investigation object
+        """
+        for study in investigation.studies.all():
+            cls.clear_study_cache(study)
+
+    # Table building API -------------------------------------------------------
+
+    def build_study_tables(
+        self, study, edit=False, use_config=True, ui=True, use_cache=True
+    ):
         """
         Build study table and associated assay tables for rendering.
 
         :param study: Study object
         :param edit: Return extra data for editing if true (bool)
         :param use_config: Use sheet configuration in building (bool)
+        :param ui: Add UI specific data if True (bool)
+        :param use_cache: Use and update table cache if enabled (bool)
         :return: Dict
         """
+        cache_key = None
+        if use_cache and settings.SHEETS_TABLE_CACHE_ENABLE:
+            cache_key = self.get_cache_key(study, edit, use_config, ui)
+            ret = cache.get(cache_key, version=TABLE_CACHE_VERSION)
+            if ret:
+                logger.debug(
+                    'Returning cached tables for study "{}" (UUID={}, '
+                    'edit={})'.format(study.get_name(), study.sodar_uuid, edit)
+                )
+                return ret
+
         s_start = time.time()
         logger.debug(
             'Building study "{}" (UUID={}, edit={})..'.format(
@@ -841,12 +1082,13 @@ class SampleSheetTableBuilder:
 
         ret = {'study': None, 'assays': {}}
         nodes = study.get_nodes()
-        all_refs = self.build_study_reference(study, nodes)
-        sample_idx = self.get_sample_idx(all_refs)
+        ref = self.get_study_reference(study, nodes)
+        all_refs = ref['all_refs']
+        sample_idx = ref['sample_idx']
         node_map = self.get_node_map(nodes)
 
         # Study ref table without duplicates
-        study_refs = self.get_study_refs(all_refs, sample_idx)
+        study_refs = self.get_study_refs(all_refs, sample_idx, ref['index'])
         ret['study'] = self._build_table(
             study_refs, node_map, study=study, ui=ui
         )
@@ -864,7 +1106,9 @@ class SampleSheetTableBuilder:
                     assay.get_name(), assay.sodar_uuid, edit
                 )
             )
-            assay_refs = self.get_assay_refs(all_refs, assay_id, sample_idx)
+            assay_refs = self.get_assay_refs(
+                all_refs, assay_id, sample_idx, ref_index=ref['index']
+            )
             ret['assays'][str(assay.sodar_uuid)] = self._build_table(
                 assay_refs, node_map, assay=assay, ui=ui
             )
@@ -873,39 +1117,73 @@ class SampleSheetTableBuilder:
                 'Building assay OK ({:.1f}s)'.format(time.time() - a_start)
             )
 
+        if cache_key:
+            cache.set(
+                cache_key,
+                ret,
+                timeout=settings.SHEETS_TABLE_CACHE_TIMEOUT,
+                version=TABLE_CACHE_VERSION,
+            )
         return ret
 
+    @classmethod
+    def get_header_nodes(cls, study):
+        """
+        Return study nodes with only the fields needed for building the study
+        reference table and retrieving node headers. Materials and processes
+        are retrieved with a single query each.
+
+        :param study: Study object
+        :return: List of GenericMaterial and Process objects
+        """
+        return list(
+            GenericMaterial.objects.filter(study=study)
+            .order_by('pk')
+            .only('unique_name', 'item_type', 'headers')
+        ) + list(
+            Process.objects.filter(study=study)
+            .order_by('pk')
+            .only('unique_name', 'headers')
+        )
+
     def get_headers(self, investigation):
         """
         Return lists of headers for the studies and assays in an investigation.
+        Results are cached in the table builder object for each investigation
+        and modification date.
 
         :param investigation: Investigation object
         :return: Dict
         """
+        cache_key = (investigation.sodar_uuid, investigation.date_modified)
+        if cache_key in self._headers:
+            return self._headers[cache_key]
         ret = {'studies': []}
 
         for study in investigation.studies.all().order_by('pk'):
             study_data = {'headers': [], 'assays': []}
-            all_refs = self.build_study_reference(study, study.get_nodes())
-            sample_idx = self.get_sample_idx(all_refs)
-            study_refs = self.get_study_refs(all_refs, sample_idx)
+            nodes = self.get_header_nodes(study)
+            node_map = self.get_node_map(nodes)
+            ref = self.get_study_reference(study, nodes)
+            all_refs = ref['all_refs']
+            sample_idx = ref['sample_idx']
+            study_refs = self.get_study_refs(all_refs, sample_idx, ref['index'])
             assay_id = 0
 
             for n in study_refs[0]:
-                study_data['headers'] += get_node_obj(
-                    study=study, unique_name=n
-                ).headers
+                study_data['headers'] += node_map[n].headers
 
             for assay in study.assays.all().order_by('pk'):
-                assay_refs = self.get_assay_refs(all_refs, assay_id, sample_idx)
+                assay_refs = self.get_assay_refs(
+                    all_refs, assay_id, sample_idx, ref_index=ref['index']
+                )
                 assay_headers = []
                 for i in range(sample_idx + 1, len(assay_refs[0])):
-                    assay_headers += get_node_obj(
-                        assay=assay, unique_name=assay_refs[0][i]
-                    ).headers
+                    assay_headers += node_map[assay_refs[0][i]].headers
                 study_data['assays'].append(assay_headers)
                 assay_id += 1
 
             ret['studies'].append(study_data)
 
+        self._headers[cache_key] = ret
         return ret
@@ -82,6 +82,7 @@ class InvestigationSerializer(SODARProjectModelSerializer):
             'parser_version',
             'archive_name',
             'comments',
+            'date_modified',
             'studies',
             'sodar_uuid',
         ]
@@ -1,6 +1,14 @@
-
-
-function buildDiffCard(category, filename, counter, table, url, source, target) {
+function buildDiffCard(category, filename, counter, table, url, source, target,
+                       pageCount) {
+  let pageInfo = '';
+  if (pageCount > 1) {
+    pageInfo = `
+      <div class="alert alert-info m-2">
+        Showing page 1 of ${pageCount}. Open the table in a new window to
+        browse all changes.
+      </div>
+    `;
+  }
   return `
     <div class="card" id="sodar-ss-${category}-diff${counter}">
       <div class="card-header">
@@ -15,6 +23,7 @@ function buildDiffCard(category, filename, counter, table, url, source, target)
         </h4>
       </div>
       <div class="card-body p-0 table-responsive sodar-ss-diff-card-body">
+        ${pageInfo}
         ${table}
       </div>
     </div>
@@ -29,9 +38,11 @@ function buildDiffPage(ajaxUrl, url, source, target) {
     for (let category in data) {
       let counter = 0;
       for (let filename in data[category]) {
-        let table = buildDiffTable(data[category][filename]);
+        let fileData = data[category][filename];
+        let table = buildDiffTable(fileData);
         let card = buildDiffCard(
-            category, filename, counter, table, url, source, target);
+            category, filename, counter, table, url, source, target,
+            fileData.page_count);
         $('#sodar-ss-diff-container').append(card);
         counter++;
       }
@@ -40,30 +51,47 @@ function buildDiffPage(ajaxUrl, url, source, target) {
 }
 
 
-function buildFilePage(ajaxUrl, source, target, filename, category) {
+function buildFilePager(page, pageCount) {
+  if (pageCount <= 1) return '';
+  let prevDisabled = page <= 1 ? 'disabled' : '';
+  let nextDisabled = page >= pageCount ? 'disabled' : '';
+  return `
+    <div class="sodar-ss-diff-pager p-2">
+      <button class="btn btn-secondary sodar-ss-diff-page-btn" data-page="${page - 1}" ${prevDisabled}>
+        Previous
+      </button>
+      <span class="mx-2">Page ${page} of ${pageCount}</span>
+      <button class="btn btn-secondary sodar-ss-diff-page-btn" data-page="${page + 1}" ${nextDisabled}>
+        Next
+      </button>
+    </div>
+  `
+}
+
+
+function buildFilePage(ajaxUrl, source, target, filename, category, page) {
+  page = page || 1;
   $.ajax({
     url: ajaxUrl + '?source=' + source + '&target=' + target + '&filename=' +
-        filename + '&category=' + category
+        filename + '&category=' + category + '&page=' + page
   }).done(function(data) {
-    let table = buildDiffTable(data);
-    $('#sodar-ss-diff-container').append(table);
+    let container = $('#sodar-ss-diff-container');
+    let pager = buildFilePager(data.page, data.page_count);
+    container.empty();
+    container.append(pager);
+    container.append(buildDiffTable(data));
+    container.append(pager);
+    container.find('.sodar-ss-diff-page-btn').click(function() {
+      buildFilePage(
+          ajaxUrl, source, target, filename, category, $(this).data('page'));
+    });
   })
 }
 
 
 function buildDiffTable(data) {
-  let table1 = new daff.TableView(data[0]);
-  let table2 = new daff.TableView(data[1]);
-  table1.trim();
-  table2.trim();
-  let alignment = daff.compareTables(table1, table2).align();
-  let data_diff = [];
-  let table_diff = new daff.TableView(data_diff);
-  let flags = new daff.CompareFlags();
-  flags.show_unchanged = false;
-  flags.always_show_header = false;
-  let highlighter = new daff.TableDiff(alignment, flags);
-  highlighter.hilite(table_diff);
+  // Diff is computed on the server in the daff highlighter format
+  let table_diff = new daff.TableView(data.diff);
   let diff2html = new daff.DiffRender();
   diff2html.render(table_diff);
   return diff2html.html();
@@ -14,7 +14,11 @@ from samplesheets.models import Investigation, Study, GenericMaterial
 from samplesheets.plugins import SampleSheetStudyPluginPoint
 from samplesheets.rendering import SampleSheetTableBuilder
 from samplesheets.studyapps.cancer.utils import get_library_file_path
-from samplesheets.studyapps.utils import get_igv_session_url, get_igv_irods_url
+from samplesheets.studyapps.utils import (
+    get_igv_session_url,
+    get_igv_irods_url,
+    ObjectPathIndex,
+)
 from samplesheets.utils import (
     get_sample_libraries,
     get_study_libraries,
@@ -265,7 +269,8 @@ class SampleSheetStudyPlugin(SampleSheetStudyPluginPoint):
         if name and name.split('/')[0] != 'irods':
             return
         cache_backend = get_backend_api('sodar_cache')
-        if not cache_backend:
+        irods_backend = get_backend_api('omics_irods')
+        if not cache_backend or not irods_backend:
             return
 
         tb = SampleSheetTableBuilder()
@@ -300,18 +305,38 @@ class SampleSheetStudyPlugin(SampleSheetStudyPluginPoint):
                 bam_paths = {}
                 vcf_paths = {}
 
+                # Pre-fetch study objects to eliminate per-library queries
+                try:
+                    study_objs = irods_backend.get_objects(
+                        irods_backend.get_path(study)
+                    )
+                    obj_index = ObjectPathIndex(study_objs['irods_data'])
+                except FileNotFoundError:
+                    obj_index = ObjectPathIndex([])
+
                 # Build render table
                 study_tables = tb.build_study_tables(study, ui=False)
+                assay_paths = {}
                 for library in get_study_libraries(study, study_tables):
                     if not library.assay:
                         continue
+                    if library.assay_id not in assay_paths:
+                        assay_paths[library.assay_id] = irods_backend.get_path(
+                            library.assay
+                        )
                     bam_path = get_library_file_path(
-                        file_type='bam', library=library
+                        file_type='bam',
+                        library=library,
+                        obj_index=obj_index,
+                        assay_path=assay_paths[library.assay_id],
                     )
                     bam_paths[library.name.strip()] = bam_path
 
                     bam_path = get_library_file_path(
-                        file_type='vcf', library=library
+                        file_type='vcf',
+                        library=library,
+                        obj_index=obj_index,
+                        assay_path=assay_paths[library.assay_id],
                     )
                     vcf_paths[library.name.strip()] = bam_path
 
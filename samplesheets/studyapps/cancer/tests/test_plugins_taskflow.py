@@ -2,6 +2,8 @@
 
 import os
 
+from unittest import mock
+
 from django.conf import settings
 from django.urls import reverse
 
@@ -17,8 +19,9 @@ from samplesheets.tests.test_io import SampleSheetIOMixin, SHEET_DIR
 from samplesheets.tests.test_models import SampleSheetModelMixin
 from samplesheets.tests.test_views_taskflow import SampleSheetTaskflowMixin
 from samplesheets.plugins import SampleSheetStudyPluginPoint
+from samplesheets.studyapps.cancer.utils import get_library_file_path
 from samplesheets.studyapps.germline.utils import get_pedigree_file_path
-from samplesheets.studyapps.utils import get_igv_session_url
+from samplesheets.studyapps.utils import ObjectPathIndex, get_igv_session_url
 
 # SODAR constants
 PROJECT_ROLE_OWNER = SODAR_CONSTANTS['PROJECT_ROLE_OWNER']
@@ -318,3 +321,26 @@ class TestCancerPlugin(
         for i in range(1, len(CASE_IDS) - 1):
             self.assertEqual(ci['bam'][CASE_IDS[i]], None)
             self.assertEqual(ci['vcf'][CASE_IDS[i]], None)
+
+    def test_get_library_file_path_index(self):
+        """Test get_library_file_path() with object index and assay path"""
+        bam_path = os.path.join(
+            self.source_path, '{}_test.bam'.format(SAMPLE_ID_NORMAL)
+        )
+        obj_index = ObjectPathIndex(
+            [{'name': bam_path.split('/')[-1], 'path': bam_path}]
+        )
+        library = self.study.assays.first().materials.get(
+            name=LIBRARY_ID_NORMAL
+        )
+        with mock.patch(
+            'samplesheets.studyapps.cancer.utils.get_backend_api'
+        ) as mock_backend:
+            path = get_library_file_path(
+                file_type='bam',
+                library=library,
+                obj_index=obj_index,
+                assay_path=self.assay_path,
+            )
+        self.assertEqual(path, bam_path)
+        mock_backend.assert_not_called()
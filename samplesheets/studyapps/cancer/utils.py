@@ -4,31 +4,42 @@ from projectroles.plugins import get_backend_api
 from samplesheets.studyapps.utils import FILE_TYPE_SUFFIXES
 
 
-def get_library_file_path(file_type, library):
+def get_library_file_path(
+    file_type, library, obj_index=None, irods_backend=None, assay_path=None
+):
     """
     Return iRODS path for the most recent file of type "bam" or "vcf"
     linked to the library.
 
     :param file_type: String ("bam" or "vcf")
     :param library: GenericMaterial object
+    :param obj_index: ObjectPathIndex of study objects (optional, queried from
+                      iRODS if not set)
+    :param irods_backend: IrodsAPI object (optional)
+    :param assay_path: iRODS path of the library assay (optional)
     :return: String
     """
-    irods_backend = get_backend_api('omics_irods')
-    if not irods_backend:
-        raise Exception('iRODS Backend not available')
-
-    assay_path = irods_backend.get_path(library.assay)
+    if obj_index is None or not assay_path:
+        if not irods_backend:
+            irods_backend = get_backend_api('omics_irods')
+        if not irods_backend:
+            raise Exception('iRODS Backend not available')
+    if not assay_path:
+        assay_path = irods_backend.get_path(library.assay)
     query_path = assay_path + '/' + library.name
 
     # Get paths to relevant files
     file_paths = []
-    try:
-        obj_list = irods_backend.get_objects(query_path)
-        for obj in obj_list['irods_data']:
-            if obj['name'].lower().endswith(FILE_TYPE_SUFFIXES[file_type]):
-                file_paths.append(obj['path'])
-    except FileNotFoundError:
-        pass
+    if obj_index is not None:
+        obj_list = obj_index.get_objects(query_path)
+    else:
+        try:
+            obj_list = irods_backend.get_objects(query_path)['irods_data']
+        except FileNotFoundError:
+            obj_list = []
+    for obj in obj_list:
+        if obj['name'].lower().endswith(FILE_TYPE_SUFFIXES[file_type]):
+            file_paths.append(obj['path'])
 
     if not file_paths:
         return None
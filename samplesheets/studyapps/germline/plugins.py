@@ -13,7 +13,11 @@ from projectroles.plugins import get_backend_api
 from samplesheets.models import Investigation, Study, GenericMaterial
 from samplesheets.plugins import SampleSheetStudyPluginPoint
 from samplesheets.rendering import SampleSheetTableBuilder
-from samplesheets.studyapps.utils import get_igv_session_url, get_igv_irods_url
+from samplesheets.studyapps.utils import (
+    get_igv_session_url,
+    get_igv_irods_url,
+    ObjectPathIndex,
+)
 from samplesheets.utils import get_index_by_header
 
 from samplesheets.studyapps.germline.utils import (
@@ -299,6 +303,7 @@ class SampleSheetStudyPlugin(SampleSheetStudyPluginPoint):
 
         # Pre-fetch study objects to eliminate redundant queries
         obj_len = 0
+        obj_index = None
         try:
             logger.debug('Querying for study objects in iRODS..')
             study_objs = irods_backend.get_objects(
@@ -310,8 +315,9 @@ class SampleSheetStudyPlugin(SampleSheetStudyPluginPoint):
                     obj_len, 's' if obj_len != 1 else ''
                 )
             )
+            # Index objects by path for prefix lookups
+            obj_index = ObjectPathIndex(study_objs['irods_data'])
         except FileNotFoundError:
-            study_objs = None
             logger.debug('No data objects found')
 
         for assay in study.assays.all():
@@ -335,12 +341,12 @@ class SampleSheetStudyPlugin(SampleSheetStudyPluginPoint):
                 path = assay_plugin.get_row_path(
                     row, assay_table, assay, assay_path
                 )
+                row_objs = obj_index.get_objects(path) if obj_len > 0 else []
                 if obj_len > 0 and path not in bam_paths[source_name]:
                     bam_paths[source_name] += [
                         o['path']
-                        for o in study_objs['irods_data']
-                        if o['path'].startswith(path + '/')
-                        and o['name'].lower().endswith('bam')
+                        for o in row_objs
+                        if o['name'].lower().endswith('bam')
                     ]
                 row_fam = row[fam_idx]['value']
                 # Add VCF objects
@@ -353,9 +359,8 @@ class SampleSheetStudyPlugin(SampleSheetStudyPluginPoint):
                 if obj_len > 0 and path not in vcf_paths[vcf_query_id]:
                     vcf_paths[vcf_query_id] += [
                         o['path']
-                        for o in study_objs['irods_data']
-                        if o['path'].startswith(path + '/')
-                        and o['name'].lower().endswith('vcf.gz')
+                        for o in row_objs
+                        if o['name'].lower().endswith('vcf.gz')
                     ]
 
         # Update data
@@ -1,6 +1,7 @@
 """General utility functions for samplesheets study apps"""
 
 import hashlib
+from bisect import bisect_left
 from lxml import etree as ET
 
 from django.conf import settings
@@ -16,6 +17,37 @@ FILE_TYPE_BLACKLISTED_SUFFIXES = {
 }
 
 
+class ObjectPathIndex:
+    """
+    Sorted index of iRODS data objects for fast lookups of objects by
+    collection path prefix.
+    """
+
+    def __init__(self, objects):
+        """
+        Initialize index.
+
+        :param objects: List of iRODS data object dicts with the "path" key
+        """
+        self._objects = sorted(objects, key=lambda x: x['path'])
+        self._paths = [o['path'] for o in self._objects]
+
+    def __len__(self):
+        return len(self._objects)
+
+    def get_objects(self, coll_path):
+        """
+        Return data objects under a collection, including subcollections.
+
+        :param coll_path: Full iRODS collection path (string)
+        :return: List of dicts
+        """
+        # Paths starting with "coll_path/" sort between it and "coll_path0"
+        start = bisect_left(self._paths, coll_path + '/')
+        end = bisect_left(self._paths, coll_path + '0', lo=start)
+        return self._objects[start:end]
+
+
 def get_igv_session_url(source, app_name, merge=False):
     """
     Return URL for opening a generated session file in IGV.
@@ -2,6 +2,8 @@
 
 import logging
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from django.conf import settings
 from django.contrib import auth
 from django.urls import reverse
@@ -110,13 +112,32 @@ def update_project_cache_task(
 
 @app.task(bind=True)
 def sheet_sync_task(_self):
-    """Task for synchronizing sample sheets from a source project"""
+    """
+    Task for synchronizing sample sheets from a source project. Source data is
+    retrieved concurrently for all projects, up to the limit set in
+    SHEETS_SYNC_CONCURRENCY. Sheets are imported in the task thread.
+    """
     from samplesheets.views import SheetRemoteSyncAPI
 
     timeline = get_backend_api('timeline_backend')
-    tl_add = False
-    tl_status_type = 'OK'
-    tl_status_desc = 'Sync OK'
+    sync_api = SheetRemoteSyncAPI()
+    sync_params = {}
+
+    def _add_event(project, ex=None):
+        status_desc = 'Sync OK'
+        if ex:
+            status_desc = 'Sync failed: {}'.format(ex)
+            logger.error(status_desc)
+        if timeline:
+            timeline.add_event(
+                project=project,
+                app_name=APP_NAME,
+                user=None,
+                event_name='sheet_sync_task',
+                description='sync sheets from source project',
+                status_type='FAILED' if ex else 'OK',
+                status_desc=status_desc,
+            )
 
     for project in Project.objects.filter(type=PROJECT_TYPE_PROJECT):
         sheet_sync_enable = app_settings.get_app_setting(
@@ -124,29 +145,26 @@ def sheet_sync_task(_self):
         )
         if not sheet_sync_enable:
             continue
-
-        sync_api = SheetRemoteSyncAPI()
         try:
-            ret = sync_api.sync_sheets(project, None)
-            if ret:
-                tl_add = True
+            sync_params[project] = sync_api.get_sync_params(project)
         except Exception as ex:
-            fail_msg = 'Sync failed: {}'.format(ex)
-            logger.error(fail_msg)
-            tl_add = True  # Add timeline event
-            tl_status_type = 'FAILED'
-            tl_status_desc = fail_msg
+            _add_event(project, ex)
+    if not sync_params:
+        return
 
-        if timeline and tl_add:
-            timeline.add_event(
-                project=project,
-                app_name=APP_NAME,
-                user=None,
-                event_name='sheet_sync_task',
-                description='sync sheets from source project',
-                status_type=tl_status_type,
-                status_desc=tl_status_desc,
-            )
+    worker_count = min(settings.SHEETS_SYNC_CONCURRENCY, len(sync_params))
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        futures = {
+            executor.submit(sync_api.get_source_data, **params): project
+            for project, params in sync_params.items()
+        }
+        for future in as_completed(futures):
+            project = futures[future]
+            try:
+                if sync_api.sync_sheets(project, None, source=future.result()):
+                    _add_event(project)
+            except Exception as ex:
+                _add_event(project, ex)
 
 
 @app.on_after_finalize.connect
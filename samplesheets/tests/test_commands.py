@@ -1,5 +1,9 @@
 """Tests for management commands in the samplesheets app"""
 
+import json
+import os
+import tempfile
+
 from django.core.management import call_command
 
 from test_plus.test import TestCase
@@ -8,7 +12,12 @@ from test_plus.test import TestCase
 from projectroles.models import Role, SODAR_CONSTANTS
 from projectroles.tests.test_models import ProjectMixin, RoleAssignmentMixin
 
-from samplesheets.models import GenericMaterial
+from samplesheets.io import SampleSheetIO
+from samplesheets.management.commands.benchsheets import (
+    get_bench_isa,
+    BENCH_RESULT_KEYS,
+)
+from samplesheets.models import GenericMaterial, Investigation
 from samplesheets.tests.test_io import (
     SampleSheetIOMixin,
     SHEET_DIR,
@@ -60,3 +69,55 @@ class TestSyncnamesCommand(
         call_command('syncnames')
         for m in GenericMaterial.objects.all():
             self.assertEqual(m.alt_names, get_alt_names(m.name))
+
+
+class TestBenchsheetsCommand(ProjectMixin, TestCase):
+    """Tests for the benchsheets command"""
+
+    def test_get_bench_isa(self):
+        """Test importing generated benchmark investigation"""
+        isa_data = get_bench_isa(rows=5, columns=2, assays=2, protocols=4)
+        project = self._make_project(
+            'TestProject', SODAR_CONSTANTS['PROJECT_TYPE_PROJECT'], None
+        )
+        investigation = SampleSheetIO().import_isa(isa_data, project)
+        study = investigation.studies.first()
+        self.assertEqual(study.assays.count(), 2)
+        self.assertEqual(
+            GenericMaterial.objects.filter(
+                study=study, item_type='SAMPLE'
+            ).count(),
+            5,
+        )
+        # Sample collection and 4 assay protocols
+        self.assertEqual(study.protocols.count(), 5)
+
+    def test_get_bench_isa_invalid_protocols(self):
+        """Test generating benchmark investigation with too few protocols"""
+        with self.assertRaises(ValueError):
+            get_bench_isa(rows=5, columns=2, assays=1, protocols=1)
+
+    def test_command(self):
+        """Test benchsheets command"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, 'bench.json')
+            call_command('benchsheets', rows=5, repeat=1, output=output)
+            with open(output) as f:
+                data = json.load(f)
+        self.assertEqual(data['params']['rows'], 5)
+        self.assertEqual(
+            sorted(data['results'].keys()),
+            sorted(
+                [
+                    'add_ui_table_data',
+                    'build_study_tables',
+                    'export_isa',
+                    'get_irods_content',
+                    'import_isa',
+                ]
+            ),
+        )
+        for result in data['results'].values():
+            self.assertEqual(sorted(result.keys()), sorted(BENCH_RESULT_KEYS))
+        # Database changes should be rolled back
+        self.assertEqual(Investigation.objects.count(), 0)
@@ -13,6 +13,8 @@ from altamisa.isatab import (
     models as isa_models,
 )
 
+from django.test import override_settings
+
 from test_plus.test import TestCase
 
 # Projectroles dependency
@@ -339,6 +341,39 @@ class TestSampleSheetIOImport(TestSampleSheetIOBase):
         )
         self.p_id = 'p{}'.format(self.project.pk)
 
+    def _assert_parsed(self, parsed):
+        """Assert parsed study and assay data equals data read from file"""
+        self.assertEqual(len(parsed), 1)
+        study = list(self.isa_studies.values())[0]
+        assay = list(self.isa_assays.values())[0]
+        self.assertEqual(parsed[0]['parsed'].materials, study.materials)
+        self.assertEqual(parsed[0]['parsed'].processes, study.processes)
+        self.assertEqual(parsed[0]['parsed'].arcs, study.arcs)
+        self.assertIsNone(parsed[0]['ref_ex'])
+        self.assertEqual(len(parsed[0]['assays']), 1)
+        self.assertEqual(parsed[0]['assays'][0]['parsed'].arcs, assay.arcs)
+        self.assertEqual(
+            parsed[0]['assays'][0]['parsed'].materials, assay.materials
+        )
+
+    @override_settings(SHEETS_IMPORT_PROCESSES=2)
+    def test_parse_isa_files(self):
+        """Test _parse_isa_files() with worker processes"""
+        isa_data = self.sheet_io.get_isa_from_zip(ZipFile(SHEET_PATH))
+        parsed = self.sheet_io._parse_isa_files(
+            self.isa_inv, isa_data, self.project
+        )
+        self._assert_parsed(parsed)
+
+    @override_settings(SHEETS_IMPORT_PROCESSES=1)
+    def test_parse_isa_files_sequential(self):
+        """Test _parse_isa_files() without worker processes"""
+        isa_data = self.sheet_io.get_isa_from_zip(ZipFile(SHEET_PATH))
+        parsed = self.sheet_io._parse_isa_files(
+            self.isa_inv, isa_data, self.project
+        )
+        self._assert_parsed(parsed)
+
     def test_import_ref_val(self):
         """Test _import_ref_val()"""
 
@@ -2,9 +2,12 @@
 
 # NOTE: Retraction and sharing data not yet tested, to be implemented
 # TODO: Test validation rules and uniqueness constraints
+import copy
+import hashlib
 import pytz
 import re
 from datetime import timedelta
+from unittest import mock
 
 import altamisa
 
@@ -28,6 +31,7 @@ from samplesheets.models import (
     Process,
     GenericMaterial,
     ISATab,
+    ISATabBlob,
     IrodsAccessTicket,
     NOT_AVAILABLE_STR,
     CONFIG_LABEL_CREATE,
@@ -111,6 +115,12 @@ DEFAULT_COMMENTS = {'comment': 'value'}
 
 ISATAB_DATA = {'i_investigation.txt': '', 's_study.txt': '', 'a_assay.txt': ''}
 ISATAB_DESC = 'description'
+ISATAB_FILE_DATA = {
+    'investigation': {'path': 'i_investigation.txt', 'tsv': 'INVESTIGATION\n'},
+    'studies': {'s_study.txt': {'tsv': 'Source Name\tSample Name\n'}},
+    'assays': {'a_assay.txt': {'tsv': 'Sample Name\n'}},
+    'sheet_config': {},
+}
 
 PLUGIN_NAME_DNA_SEQ = 'samplesheets_assay_dna_sequencing'
 PLUGIN_NAME_GENERIC_RAW = 'samplesheets_assay_generic_raw'
@@ -1275,7 +1285,8 @@ class TestISATab(TestSampleSheetBase):
         expected = {
             'id': self.isatab.pk,
             'project': self.project.pk,
-            'data': ISATAB_DATA,
+            'stored_data': ISATAB_DATA,
+            'blobs': [],
             'investigation_uuid': self.investigation.sodar_uuid,
             'archive_name': self.investigation.archive_name,
             'tags': [],
@@ -1345,6 +1356,141 @@ class TestISATab(TestSampleSheetBase):
         )
         self.assertEqual(self.isatab.get_full_name(), expected)
 
+    def test_save_blobs(self):
+        """Test storing file contents in blobs on save()"""
+        self.assertEqual(ISATabBlob.objects.count(), 0)
+        isatab = self._make_isatab(project=self.project, data=ISATAB_FILE_DATA)
+        self.assertEqual(ISATabBlob.objects.count(), 3)
+        self.assertEqual(isatab.blobs.count(), 3)
+        tsv = ISATAB_FILE_DATA['investigation']['tsv']
+        self.assertEqual(
+            isatab.stored_data['investigation'],
+            {
+                'path': 'i_investigation.txt',
+                'blob': ISATabBlob.get_digest(tsv),
+            },
+        )
+        self.assertNotIn('tsv', isatab.stored_data['studies']['s_study.txt'])
+        isatab = ISATab.objects.get(pk=isatab.pk)
+        self.assertEqual(isatab.data, ISATAB_FILE_DATA)
+
+    def test_save_blobs_shared(self):
+        """Test sharing blobs between ISATab objects"""
+        isatab = self._make_isatab(project=self.project, data=ISATAB_FILE_DATA)
+        data = copy.deepcopy(ISATAB_FILE_DATA)
+        data['assays']['a_assay.txt']['tsv'] += 'sample1\n'
+        isatab2 = self._make_isatab(project=self.project, data=data)
+        self.assertEqual(ISATabBlob.objects.count(), 4)
+        self.assertEqual(
+            isatab.stored_data['studies'], isatab2.stored_data['studies']
+        )
+        self.assertEqual(ISATab.objects.get(pk=isatab2.pk).data, data)
+
+    def test_save_modified(self):
+        """Test saving modified data"""
+        isatab = self._make_isatab(project=self.project, data=ISATAB_FILE_DATA)
+        isatab = ISATab.objects.get(pk=isatab.pk)
+        isatab.data['sheet_config'] = {'version': '0.8.0'}
+        isatab.save()
+        isatab.refresh_from_db()
+        self.assertEqual(isatab.data['sheet_config'], {'version': '0.8.0'})
+        self.assertEqual(
+            isatab.data['investigation'], ISATAB_FILE_DATA['investigation']
+        )
+        self.assertEqual(isatab.blobs.count(), 3)
+
+
+class TestISATabBlob(TestSampleSheetBase):
+    """Tests for the ISATabBlob model"""
+
+    def setUp(self):
+        super().setUp()
+        self.content = ISATAB_FILE_DATA['investigation']['tsv']
+        self.blob = ISATabBlob.from_content(self.content)
+        self.blob.save()
+
+    def test_initialization(self):
+        """Test ISATabBlob initialization"""
+        self.assertEqual(
+            self.blob.digest,
+            hashlib.sha256(self.content.encode('utf-8')).hexdigest(),
+        )
+        self.assertEqual(self.blob.size, len(self.content.encode('utf-8')))
+        self.assertNotEqual(bytes(self.blob.content), self.content)
+
+    def test__str__(self):
+        """Test ISATabBlob __str__()"""
+        expected = '{} ({} bytes)'.format(self.blob.digest, self.blob.size)
+        self.assertEqual(str(self.blob), expected)
+
+    def test__repr__(self):
+        """Test ISATabBlob __repr__()"""
+        expected = 'ISATabBlob({})'.format(
+            ', '.join(repr(v) for v in [self.blob.digest, self.blob.size])
+        )
+        self.assertEqual(repr(self.blob), expected)
+
+    def test_get_content(self):
+        """Test get_content()"""
+        blob = ISATabBlob.objects.get(pk=self.blob.pk)
+        self.assertEqual(blob.get_content(), self.content)
+
+
+class TestISATabBlobManager(TestSampleSheetBase):
+    """Tests for ISATabBlobManager"""
+
+    def test_get_or_create_blobs(self):
+        """Test get_or_create_blobs() with existing and new content"""
+        ISATabBlob.from_content('existing').save()
+        contents = {ISATabBlob.get_digest(c): c for c in ['existing', 'new']}
+        blobs = ISATabBlob.objects.get_or_create_blobs(contents)
+        self.assertEqual(len(blobs), 2)
+        self.assertEqual(ISATabBlob.objects.count(), 2)
+
+    def test_get_or_create_blobs_deleted(self):
+        """Test get_or_create_blobs() with blob deleted before locking"""
+        ISATabBlob.from_content('existing').save()
+        contents = {ISATabBlob.get_digest('existing'): 'existing'}
+        bulk_create = ISATabBlob.objects.bulk_create
+
+        def _bulk_create(objs, **kwargs):
+            # Simulate concurrent delete_orphans()
+            ISATabBlob.objects.all().delete()
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(
+            ISATabBlob.objects, 'bulk_create', side_effect=_bulk_create
+        ) as mock_create:
+            blobs = ISATabBlob.objects.get_or_create_blobs(contents)
+        self.assertEqual(len(blobs), 1)
+        self.assertEqual(blobs[0].get_content(), 'existing')
+        self.assertEqual(mock_create.call_count, 2)
+
+    def test_get_contents(self):
+        """Test get_contents()"""
+        blob = ISATabBlob.from_content('content')
+        blob.save()
+        self.assertEqual(
+            ISATabBlob.objects.get_contents([blob.digest]),
+            {blob.digest: 'content'},
+        )
+
+    def test_get_contents_missing(self):
+        """Test get_contents() with missing blob"""
+        with self.assertRaises(ISATabBlob.DoesNotExist):
+            ISATabBlob.objects.get_contents(['0' * 64])
+
+    def test_delete_orphans(self):
+        """Test delete_orphans()"""
+        isatab = self._make_isatab(project=self.project, data=ISATAB_FILE_DATA)
+        ISATabBlob.from_content('orphan').save()
+        self.assertEqual(ISATabBlob.objects.count(), 4)
+        self.assertEqual(ISATabBlob.objects.delete_orphans(), 1)
+        self.assertEqual(ISATabBlob.objects.count(), 3)
+        isatab.delete()
+        self.assertEqual(ISATabBlob.objects.delete_orphans(), 3)
+        self.assertEqual(ISATabBlob.objects.count(), 0)
+
 
 class TestIrodsAccessTicket(TestSampleSheetBase):
     """Tests for the IrodsAccessTicket model"""
@@ -237,6 +237,31 @@ class TestSampleDataFileExistsAPIView(TestProjectAPIPermissionBase):
         self.assert_response_api(url, self.anonymous, 401, data=request_data)
 
 
+class TestSampleDataFileExistsBatchAPIView(TestProjectAPIPermissionBase):
+    """Tests for SampleDataFileExistsBatchAPIView permissions"""
+
+    @override_settings(ENABLE_IRODS=False)
+    def test_post(self):
+        """Test post() in SampleDataFileExistsBatchAPIView"""
+        url = reverse('samplesheets:api_file_exists_batch')
+        request_data = {'checksums': []}
+        good_users = [
+            self.superuser,
+            self.owner_as.user,
+            self.delegate_as.user,
+            self.contributor_as.user,
+            self.guest_as.user,
+            self.user_no_roles,
+        ]
+        # No iRODS so good users get 500 -> still ok for auth :)
+        self.assert_response_api(
+            url, good_users, 500, method='POST', data=request_data
+        )
+        self.assert_response_api(
+            url, self.anonymous, 401, method='POST', data=request_data
+        )
+
+
 class TestRemoteSheetGetAPIView(
     SampleSheetIOMixin,
     RemoteSiteMixin,
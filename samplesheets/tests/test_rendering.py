@@ -1,5 +1,10 @@
 """Tests for samplesheets.rendering"""
 
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
 from test_plus.test import TestCase
 
 # Projectroles dependency
@@ -7,7 +12,10 @@ from projectroles.models import Role, SODAR_CONSTANTS
 from projectroles.tests.test_models import ProjectMixin, RoleAssignmentMixin
 
 from samplesheets.models import GenericMaterial
-from samplesheets.rendering import SampleSheetTableBuilder
+from samplesheets.rendering import (
+    SampleSheetTableBuilder,
+    TABLE_CACHE_VERSION,
+)
 from samplesheets.tests.test_io import (
     SampleSheetIOMixin,
     SHEET_DIR,
@@ -102,6 +110,107 @@ class TestTableBuilder(TestRenderingBase):
         for k, assay_table in tables['assays'].items():
             assert_row_length(assay_table)
 
+    def test_parse_headers(self):
+        """Test _parse_headers()"""
+        headers = [
+            'Sample Name',
+            'Characteristics[organism]',
+            'Term Source REF',
+            'Term Accession Number',
+        ]
+        expected = [
+            ('Sample Name', None),
+            ('Characteristics[organism]', ('Characteristics', 'organism')),
+        ]
+        self.assertEqual(self.tb._parse_headers(headers), expected)
+        self.assertEqual(len(self.tb._parsed_headers), 1)
+        ret = self.tb._parse_headers(list(headers))
+        self.assertEqual(ret, expected)
+        self.assertEqual(len(self.tb._parsed_headers), 1)
+
+    def test_parse_headers_build(self):
+        """Test _parse_headers() cache in table building"""
+        self.tb.build_study_tables(self.study, use_cache=False)
+        node_headers = set(tuple(n.headers) for n in self.study.get_nodes())
+        self.assertLessEqual(len(self.tb._parsed_headers), len(node_headers))
+        for key in self.tb._parsed_headers.keys():
+            self.assertIn(key, node_headers)
+
+    def test_add_ui_table_data(self):
+        """Test _add_ui_table_data() column metrics"""
+        self.tb._top_header = [
+            {'value': 'Source', 'colspan': 2},
+            {'value': 'Process', 'colspan': 1},
+        ]
+        self.tb._field_header = [
+            {'value': 'Age', 'col_type': None},
+            {'value': 'Name', 'col_type': None},
+            {'value': 'Performer', 'col_type': 'CONTACT'},
+        ]
+        self.tb._field_configs = [None, None, None]
+        self.tb._table_data = [
+            [
+                {'value': '12', 'unit': None},
+                {'value': '1', 'unit': None},
+                {'value': 'John Doe <john@example.com>'},
+            ],
+            [
+                {'value': '', 'unit': None},
+                {'value': '2', 'unit': None},
+                {'value': 'John Doe <john@example.com>'},
+            ],
+            [
+                {'value': '1.5', 'unit': 'year'},
+                {'value': '3', 'unit': None},
+                {'value': 'xy'},
+            ],
+        ]
+        self.tb._add_ui_table_data()
+        fh = self.tb._field_header
+        self.assertEqual(fh[0]['col_type'], 'NUMERIC')
+        self.assertIsNone(fh[1]['col_type'])  # Name columns are not numeric
+        self.assertEqual(fh[0]['max_value_len'], 8)  # "1.5" + "year" + 1
+        self.assertEqual(fh[1]['max_value_len'], 4)  # Header length
+        self.assertEqual(fh[2]['max_value_len'], 9)  # Header length
+
+    def test_get_ref_index(self):
+        """Test get_ref_index()"""
+        all_refs = self.tb.build_study_reference(self.study)
+        sample_idx = self.tb.get_sample_idx(all_refs)
+        ref_index = self.tb.get_ref_index(all_refs, sample_idx)
+        self.assertEqual(
+            list(ref_index['assays'].keys()),
+            list(range(self.study.assays.count())),
+        )
+        study_refs = self.tb.get_study_refs(all_refs, sample_idx, ref_index)
+        self.assertEqual(
+            len(study_refs), len(set(tuple(r) for r in study_refs))
+        )
+        assay_refs = self.tb.get_assay_refs(
+            all_refs, 0, sample_idx, ref_index=ref_index
+        )
+        self.assertEqual(len(assay_refs), len(ref_index['assays'][0]))
+        for row in assay_refs:
+            self.assertIn('-a0-', row[sample_idx + 1])
+        self.assertEqual(
+            self.tb.get_assay_refs(
+                all_refs, 1, sample_idx, ref_index=ref_index
+            ),
+            [],
+        )
+
+    def test_get_study_reference_cache(self):
+        """Test get_study_reference() caching"""
+        ref = self.tb.get_study_reference(self.study)
+        self.assertEqual(
+            ref['all_refs'], self.tb.build_study_reference(self.study)
+        )
+        self.assertIs(self.tb.get_study_reference(self.study), ref)
+        # Modify arcs
+        self.study.arcs = list(reversed(self.study.arcs))
+        self.study.save()
+        self.assertIsNot(self.tb.get_study_reference(self.study), ref)
+
     def test_get_headers(self):
         """Test get_headers()"""
         h = self.tb.get_headers(self.investigation)
@@ -109,6 +218,22 @@ class TestTableBuilder(TestRenderingBase):
         self.assertEqual(len(h['studies'][0]['headers']), 15)
         self.assertEqual(len(h['studies'][0]['assays'][0]), 8)
 
+    def test_get_headers_cache(self):
+        """Test get_headers() result caching"""
+        h = self.tb.get_headers(self.investigation)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.tb.get_headers(self.investigation), h)
+        self.investigation.save()  # Update date_modified
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.tb.get_headers(self.investigation), h)
+        self.assertGreater(len(ctx.captured_queries), 0)
+
+    def test_get_headers_queries(self):
+        """Test get_headers() query count not depending on node count"""
+        with CaptureQueriesContext(connection) as ctx:
+            self.tb.get_headers(self.investigation)
+        self.assertLess(len(ctx.captured_queries), len(self.study.get_nodes()))
+
     def test_get_headers_compare_row(self):
         """Test comparing get_headers() results for inserted rows"""
         investigation2 = self.import_isa_from_file(
@@ -126,3 +251,56 @@ class TestTableBuilder(TestRenderingBase):
         h2 = self.tb.get_headers(investigation2)
         self.assertIsNotNone(h2)
         self.assertNotEqual(h1, h2)
+
+
+@override_settings(SHEETS_TABLE_CACHE_ENABLE=True)
+class TestTableBuilderCache(TestRenderingBase):
+    """Tests for SampleSheetTableBuilder table caching"""
+
+    def test_build_study_cache(self):
+        """Test building tables with cache enabled"""
+        cache_key = self.tb.get_cache_key(self.study)
+        self.assertIsNone(cache.get(cache_key, version=TABLE_CACHE_VERSION))
+        tables = self.tb.build_study_tables(self.study)
+        self.assertEqual(
+            cache.get(cache_key, version=TABLE_CACHE_VERSION), tables
+        )
+        self.assertEqual(self.tb.build_study_tables(self.study), tables)
+
+    def test_build_study_cache_flags(self):
+        """Test building tables with different flags"""
+        self.tb.build_study_tables(self.study)
+        cache_key = self.tb.get_cache_key(self.study, edit=True)
+        self.assertNotEqual(cache_key, self.tb.get_cache_key(self.study))
+        self.assertIsNone(cache.get(cache_key, version=TABLE_CACHE_VERSION))
+
+    def test_build_study_no_cache(self):
+        """Test building tables with use_cache=False"""
+        self.tb.build_study_tables(self.study, use_cache=False)
+        cache_key = self.tb.get_cache_key(self.study)
+        self.assertIsNone(cache.get(cache_key, version=TABLE_CACHE_VERSION))
+
+    def test_clear_study_cache(self):
+        """Test clear_study_cache()"""
+        self.tb.build_study_tables(self.study)
+        cache_key = self.tb.get_cache_key(self.study)
+        self.tb.clear_study_cache(self.study)
+        self.assertNotEqual(self.tb.get_cache_key(self.study), cache_key)
+        self.assertIsNone(
+            cache.get(
+                self.tb.get_cache_key(self.study), version=TABLE_CACHE_VERSION
+            )
+        )
+
+    def test_clear_investigation_cache(self):
+        """Test clear_investigation_cache()"""
+        cache_key = self.tb.get_cache_key(self.study)
+        self.tb.clear_investigation_cache(self.investigation)
+        self.assertNotEqual(self.tb.get_cache_key(self.study), cache_key)
+
+    def test_cache_investigation_modified(self):
+        """Test cache key after modifying investigation"""
+        cache_key = self.tb.get_cache_key(self.study)
+        self.investigation.save()
+        self.study.refresh_from_db()
+        self.assertNotEqual(self.tb.get_cache_key(self.study), cache_key)
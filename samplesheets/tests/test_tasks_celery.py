@@ -180,6 +180,30 @@ class TestSheetRemoteSyncTask(TestSheetRemoteSyncBase):
         ).data
         self.assertEqual(data_target, data_source)
 
+    def test_sync_not_modified(self):
+        """Test sync with unmodified source sheet"""
+        sheet_sync_task()
+        etag = app_settings.get_app_setting(
+            APP_NAME, 'sheet_sync_etag', project=self.project_target
+        )
+        self.assertNotEqual(etag, '')
+        date_modified = self.project_target.investigations.first().date_modified
+        self.assertEqual(ISATab.objects.count(), 2)
+
+        sheet_sync_task()
+
+        self.assertEqual(ISATab.objects.count(), 2)
+        self.assertEqual(
+            self.project_target.investigations.first().date_modified,
+            date_modified,
+        )
+        self.assertEqual(
+            app_settings.get_app_setting(
+                APP_NAME, 'sheet_sync_etag', project=self.project_target
+            ),
+            etag,
+        )
+
     def test_sync_existing_source_newer(self):
         """Test sync with existing sheet and changes in source sheet"""
         # Create investigation for target project
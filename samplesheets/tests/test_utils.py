@@ -1,5 +1,9 @@
 """Tests for utility functions in the samplesheets app"""
 
+import io
+
+from openpyxl import load_workbook
+
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.test import override_settings
@@ -23,6 +27,9 @@ from samplesheets.utils import (
     compare_inv_replace,
     get_webdav_url,
     get_ext_link_labels,
+    get_sheet_diff,
+    get_tsv_rows,
+    write_excel_table,
 )
 from samplesheets.tests.test_io import (
     SampleSheetIOMixin,
@@ -48,6 +55,7 @@ CONFIG_PROTOCOL_UUIDS = [
 ]
 IRODS_TICKET_STR = 'ooChaa1t'
 EXT_LINK_PATH_INVALID = '/tmp/NON_EXISTING_EXT_LINK_FILE.json'
+DIFF_HEADER = ['Source Name', 'Characteristics[age]', 'Sample Name']
 
 
 class TestUtilsBase(
@@ -291,3 +299,110 @@ class TestGetExtLinkLabels(TestUtilsBase):
         """Test retrievint default labels"""
         labels = get_ext_link_labels()
         self.assertEqual(labels, DEFAULT_EXTERNAL_LINK_LABELS)
+
+
+class TestWriteExcelTable(TestUtilsBase):
+    """Tests for write_excel_table()"""
+
+    def test_write(self):
+        """Test writing a study table"""
+        table = self.tb.build_study_tables(self.study, ui=False)['study']
+        output = io.BytesIO()
+        write_excel_table(table, output, self.study.get_display_name())
+        output.seek(0)
+        ws = load_workbook(output).active
+        self.assertEqual(ws.max_row, len(table['table_data']) + 2)
+        self.assertEqual(ws.cell(row=1, column=1).value, 'Source')
+        self.assertEqual(
+            [c.value for c in ws[2]],
+            [h['value'] for h in table['field_header']],
+        )
+        self.assertEqual(
+            ws.cell(row=3, column=1).value, table['table_data'][0][0]['value']
+        )
+        # Assert column width from longest value in column
+        col_len = max(
+            [len(h['value']) for h in table['field_header'][:1]]
+            + [len(r[0]['value']) for r in table['table_data']]
+            + [len(table['top_header'][0]['value'])]
+        )
+        self.assertEqual(ws.column_dimensions['A'].width, col_len + 2)
+
+
+class TestGetSheetDiff(TestCase):
+    """Tests for get_sheet_diff()"""
+
+    def setUp(self):
+        self.rows = [DIFF_HEADER] + [
+            ['source{}'.format(i), str(i), 'sample{}'.format(i)]
+            for i in range(10)
+        ]
+
+    def test_diff_unchanged(self):
+        """Test diff with identical tables"""
+        header_rows, diff_rows, change_count = get_sheet_diff(
+            self.rows, self.rows
+        )
+        self.assertEqual(header_rows, [['@@'] + DIFF_HEADER])
+        self.assertEqual(diff_rows, [])
+        self.assertEqual(change_count, 0)
+
+    def test_diff_modified(self):
+        """Test diff with modified cell"""
+        target = [list(r) for r in self.rows]
+        target[6][1] = 'x'
+        header_rows, diff_rows, change_count = get_sheet_diff(
+            self.rows, target, context=1
+        )
+        self.assertEqual(change_count, 1)
+        self.assertEqual(
+            diff_rows,
+            [
+                ['...'] * 4,
+                ['', 'source4', '4', 'sample4'],
+                ['->', 'source5', '5->x', 'sample5'],
+                ['', 'source6', '6', 'sample6'],
+                ['...'] * 4,
+            ],
+        )
+
+    def test_diff_rows(self):
+        """Test diff with inserted and deleted rows"""
+        target = (
+            self.rows[:3] + self.rows[4:] + [['source10', '10', 'sample10']]
+        )
+        header_rows, diff_rows, change_count = get_sheet_diff(
+            self.rows, target, context=0
+        )
+        self.assertEqual(change_count, 2)
+        self.assertEqual(
+            diff_rows,
+            [
+                ['...'] * 4,
+                ['---', 'source2', '2', 'sample2'],
+                ['...'] * 4,
+                ['+++', 'source10', '10', 'sample10'],
+            ],
+        )
+
+    def test_diff_columns(self):
+        """Test diff with inserted column"""
+        target = [self.rows[0][:2] + ['Comment[x]'] + self.rows[0][2:]] + [
+            r[:2] + ['x'] + r[2:] for r in self.rows[1:]
+        ]
+        header_rows, diff_rows, change_count = get_sheet_diff(self.rows, target)
+        self.assertEqual(
+            header_rows,
+            [
+                ['!', '', '', '+++', ''],
+                ['@@'] + target[0],
+            ],
+        )
+        self.assertEqual(change_count, 0)
+
+    def test_get_tsv_rows(self):
+        """Test get_tsv_rows()"""
+        self.assertEqual(
+            get_tsv_rows('"Source Name"\tSample Name\ns1\tsa1\n'),
+            [['Source Name', 'Sample Name'], ['s1', 'sa1']],
+        )
@@ -1,9 +1,11 @@
 """Tests for UI views in the samplesheets app"""
 
+import io
 import json
 import os
 
 from cubi_tk.isa_tpl import _TEMPLATES as TK_TEMPLATES
+from openpyxl import load_workbook
 from urllib.parse import urlencode
 from zipfile import ZipFile
 
@@ -30,6 +32,7 @@ from projectroles.utils import build_secret
 
 from samplesheets.io import SampleSheetIO
 from samplesheets.models import Investigation, Assay, ISATab
+from samplesheets.rendering import SampleSheetTableBuilder
 from samplesheets.sheet_config import SheetConfigAPI
 from samplesheets.tests.test_io import (
     SampleSheetIOMixin,
@@ -699,6 +702,23 @@ class TestSheetExcelExportView(TestViewsBase):
                 )
             )
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.get('Content-Disposition'),
+            'attachment; filename="{}.xlsx"'.format(
+                self.study.file_name.split('.')[0]
+            ),
+        )
+        wb = load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        ws = wb.active
+        table = SampleSheetTableBuilder().build_study_tables(
+            self.study, ui=False
+        )['study']
+        self.assertEqual(ws.max_row, len(table['table_data']) + 2)
+        self.assertEqual(ws.max_column, len(table['field_header']))
+        self.assertEqual(
+            [c.value for c in ws[2]],
+            [h['value'] for h in table['field_header']],
+        )
         # Assert data in timeline event
         tl_event = self.timeline.get_project_events(
             self.project, classified=True
@@ -745,6 +765,26 @@ class TestSheetISAExportView(TestViewsBase):
             response.get('Content-Disposition'),
             'attachment; filename="{}"'.format(self.investigation.archive_name),
         )
+        # Consume streamed archive and assert contents
+        zf = ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(zf.testzip())
+        export_data = SampleSheetIO().export_isa(self.investigation)
+        inv_path = export_data['investigation']['path']
+        inv_dir = '/'.join(inv_path.split('/')[:-1])
+        self.assertEqual(
+            zf.read(inv_path).decode('utf-8'),
+            export_data['investigation']['tsv'],
+        )
+        for k in ['studies', 'assays']:
+            for path, v in export_data[k].items():
+                self.assertEqual(
+                    zf.read('{}/{}'.format(inv_dir, path)).decode('utf-8'),
+                    v['tsv'],
+                )
+        self.assertEqual(
+            len(zf.namelist()),
+            1 + len(export_data['studies']) + len(export_data['assays']),
+        )
         # Assert data in timeline event
         tl_event = self.timeline.get_project_events(
             self.project, classified=True
@@ -752,6 +792,23 @@ class TestSheetISAExportView(TestViewsBase):
         tl_status = tl_event.get_status()
         self.assertIsNotNone(tl_status.extra_data['warnings'])
 
+    def test_get_closed(self):
+        """Test closing an ISA-Tab export stream before it is complete"""
+        with self.login(self.user):
+            response = self.client.get(
+                reverse(
+                    'samplesheets:export_isa',
+                    kwargs={'project': self.project.sodar_uuid},
+                )
+            )
+        self.assertEqual(response.status_code, 200)
+        next(iter(response.streaming_content))
+        response.close()  # Closed by the server on client disconnect
+        tl_event = self.timeline.get_project_events(
+            self.project, classified=True
+        ).order_by('-pk')[0]
+        self.assertEqual(tl_event.get_status().status_type, 'FAILED')
+
     def test_get_no_investigation(self):
         """Test requesting an ISA-Tab export with no investigation provided"""
         self.investigation.delete()
@@ -787,6 +844,12 @@ class TestSheetISAExportView(TestViewsBase):
             response.get('Content-Disposition'),
             'attachment; filename="{}"'.format(filename),
         )
+        zf = ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        inv_path = isa_version.data['investigation']['path']
+        self.assertEqual(
+            zf.read(inv_path).decode('utf-8'),
+            isa_version.data['investigation']['tsv'],
+        )
 
 
 class TestSheetDeleteView(TestViewsBase):
@@ -1,12 +1,15 @@
 """Tests for Ajax API views in the samplesheets app"""
 
 import json
+import math
 import os
 
 import fastobo
 from altamisa.constants import table_headers as th
+from urllib.parse import urlencode
 
 from django.conf import settings
+from django.test import override_settings
 from django.urls import reverse
 
 # Projectroles dependency
@@ -31,6 +34,7 @@ from samplesheets.models import (
     IrodsAccessTicket,
     IrodsDataRequest,
 )
+from samplesheets.rendering import SampleSheetTableBuilder
 from samplesheets.sheet_config import SheetConfigAPI
 from samplesheets.tests.test_sheet_config import (
     SheetConfigMixin,
@@ -46,7 +50,12 @@ from samplesheets.tests.test_views import (
     CONFIG_DATA_DEFAULT,
     SHEET_PATH_SMALL2_ALT,
 )
-from samplesheets.utils import get_node_obj, get_ext_link_labels
+from samplesheets.utils import (
+    get_node_obj,
+    get_ext_link_labels,
+    get_sheet_diff,
+    get_tsv_rows,
+)
 from samplesheets.views import SheetImportMixin
 from samplesheets.views_ajax import ALERT_ACTIVE_REQS
 
@@ -637,6 +646,68 @@ class TestSheetCellEditAjaxView(TestViewsBase):
         obj.refresh_from_db()
         self.assertEqual(obj.name, new_name)
 
+    def test_edit_name_date_modified(self):
+        """Test editing name updates investigation modification time"""
+        date_modified = self.investigation.date_modified
+        obj = GenericMaterial.objects.get(study=self.study, name='0816')
+        self.values['updated_cells'].append(
+            {
+                'uuid': str(obj.sodar_uuid),
+                'header_name': 'name',
+                'header_type': 'name',
+                'obj_cls': 'GenericMaterial',
+                'value': '0816aaa',
+            }
+        )
+
+        with self.login(self.user):
+            response = self.client.post(
+                reverse(
+                    'samplesheets:ajax_edit_cell',
+                    kwargs={'project': self.project.sodar_uuid},
+                ),
+                json.dumps(self.values),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.investigation.refresh_from_db()
+        self.assertGreater(self.investigation.date_modified, date_modified)
+
+    @override_settings(SHEETS_TABLE_CACHE_ENABLE=True)
+    def test_edit_name_table_cache(self):
+        """Test editing name with cached study tables"""
+
+        def _get_names(tables):
+            return [r[0]['value'] for r in tables['study']['table_data']]
+
+        tb = SampleSheetTableBuilder()
+        self.assertIn('0816', _get_names(tb.build_study_tables(self.study)))
+        obj = GenericMaterial.objects.get(study=self.study, name='0816')
+        new_name = '0816aaa'
+        self.values['updated_cells'].append(
+            {
+                'uuid': str(obj.sodar_uuid),
+                'header_name': 'name',
+                'header_type': 'name',
+                'obj_cls': 'GenericMaterial',
+                'value': new_name,
+            }
+        )
+
+        with self.login(self.user):
+            response = self.client.post(
+                reverse(
+                    'samplesheets:ajax_edit_cell',
+                    kwargs={'project': self.project.sodar_uuid},
+                ),
+                json.dumps(self.values),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        names = _get_names(tb.build_study_tables(self.study))
+        self.assertNotIn('0816', names)
+        self.assertIn(new_name, names)
+
     def test_edit_name_empty(self):
         """Test setting an empty material name (should fail)"""
         obj = GenericMaterial.objects.get(study=self.study, name='0816')
@@ -806,6 +877,39 @@ class TestSheetCellEditAjaxView(TestViewsBase):
             {'unit': None, 'value': EDIT_NEW_VALUE_STR},
         )
 
+    def test_edit_invalid_item_fields(self):
+        """Test editing a material with invalid fields for its type"""
+        obj = GenericMaterial.objects.filter(
+            study=self.study, item_type='DATA'
+        ).first()
+        og_name = obj.name
+        # Set characteristics for a data file without validation
+        GenericMaterial.objects.filter(pk=obj.pk).update(
+            characteristics={'organism': EDIT_NEW_VALUE_STR}
+        )
+        self.values['updated_cells'].append(
+            {
+                'uuid': str(obj.sodar_uuid),
+                'header_name': 'name',
+                'header_type': 'name',
+                'obj_cls': 'GenericMaterial',
+                'item_type': 'DATA',
+                'value': og_name + 'aaa',
+            }
+        )
+        with self.login(self.user):
+            response = self.client.post(
+                reverse(
+                    'samplesheets:ajax_edit_cell',
+                    kwargs={'project': self.project.sodar_uuid},
+                ),
+                json.dumps(self.values),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 500)
+        obj.refresh_from_db()
+        self.assertEqual(obj.name, og_name)
+
     def test_edit_param_values_str(self):
         """Test editing a parameter values string value in a process"""
         obj = Process.objects.filter(study=self.study, assay=None).first()
@@ -840,6 +944,90 @@ class TestSheetCellEditAjaxView(TestViewsBase):
             {'unit': None, 'value': EDIT_NEW_VALUE_STR},
         )
 
+    def test_edit_multiple(self):
+        """Test editing multiple materials and processes in one request"""
+        objs = GenericMaterial.objects.filter(
+            study=self.study, item_type='SOURCE'
+        )
+        self.assertGreater(objs.count(), 1)
+        header_name = 'organism'
+        for obj in objs:
+            self.values['updated_cells'].append(
+                {
+                    'uuid': str(obj.sodar_uuid),
+                    'header_name': header_name,
+                    'header_type': 'characteristics',
+                    'obj_cls': 'GenericMaterial',
+                    'value': EDIT_NEW_VALUE_STR,
+                }
+            )
+        process = Process.objects.filter(study=self.study, assay=None).first()
+        self.values['updated_cells'].append(
+            {
+                'uuid': str(process.sodar_uuid),
+                'header_name': 'instrument',
+                'header_type': 'parameter_values',
+                'obj_cls': 'Process',
+                'value': EDIT_NEW_VALUE_STR,
+            }
+        )
+        with self.login(self.user):
+            response = self.client.post(
+                reverse(
+                    'samplesheets:ajax_edit_cell',
+                    kwargs={'project': self.project.sodar_uuid},
+                ),
+                json.dumps(self.values),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        for obj in GenericMaterial.objects.filter(
+            study=self.study, item_type='SOURCE'
+        ):
+            self.assertEqual(
+                obj.characteristics[header_name],
+                {'unit': None, 'value': EDIT_NEW_VALUE_STR},
+            )
+        process.refresh_from_db()
+        self.assertEqual(
+            process.parameter_values['instrument'],
+            {'unit': None, 'value': EDIT_NEW_VALUE_STR},
+        )
+
+    def test_edit_multiple_invalid(self):
+        """Test editing multiple cells with an invalid cell"""
+        obj = GenericMaterial.objects.get(study=self.study, name='0816')
+        obj2 = GenericMaterial.objects.get(study=self.study, name='0815')
+        self.values['updated_cells'] += [
+            {
+                'uuid': str(obj.sodar_uuid),
+                'header_name': 'name',
+                'header_type': 'name',
+                'obj_cls': 'GenericMaterial',
+                'value': '0816aaa',
+            },
+            {
+                'uuid': str(obj2.sodar_uuid),
+                'header_name': 'name',
+                'header_type': 'name',
+                'obj_cls': 'GenericMaterial',
+                'value': '',
+            },
+        ]
+        with self.login(self.user):
+            response = self.client.post(
+                reverse(
+                    'samplesheets:ajax_edit_cell',
+                    kwargs={'project': self.project.sodar_uuid},
+                ),
+                json.dumps(self.values),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 500)
+        # No cells should be saved
+        obj.refresh_from_db()
+        self.assertEqual(obj.name, '0816')
+
     def test_edit_protocol(self):
         """Test editing the protocol reference of a process"""
         obj = Process.objects.filter(
@@ -1918,56 +2106,50 @@ class TestSheetVersionCompareAjaxView(SheetImportMixin, TestViewsBase):
         )
         self.isa2.save()
 
+    def _get_expected(self, category, filename, page=1):
+        """Return expected diff data for a file"""
+        header_rows, diff_rows, change_count = get_sheet_diff(
+            get_tsv_rows(self.isa1.data[category][filename]['tsv']),
+            get_tsv_rows(self.isa2.data[category][filename]['tsv']),
+        )
+        page_size = settings.SHEETS_VERSION_DIFF_PAGINATION
+        return {
+            'diff': header_rows
+            + diff_rows[(page - 1) * page_size : page * page_size],
+            'change_count': change_count,
+            'page': page,
+            'page_count': max(math.ceil(len(diff_rows) / page_size), 1),
+        }
+
+    def _get_url(self, source, target, **kwargs):
+        """Return compare view URL with query parameters"""
+        return '{}?{}'.format(
+            reverse(
+                'samplesheets:ajax_version_compare',
+                kwargs={'project': self.project.sodar_uuid},
+            ),
+            urlencode(dict(source=source, target=target, **kwargs)),
+        )
+
     def test_get(self):
         """Test GET returning diff data"""
         expected = {
             'studies': {
-                's_small2.txt': [
-                    [
-                        line.split('\t')
-                        for line in self.isa1.data['studies']['s_small2.txt'][
-                            'tsv'
-                        ].split('\n')
-                    ],
-                    [
-                        line.split('\t')
-                        for line in self.isa2.data['studies']['s_small2.txt'][
-                            'tsv'
-                        ].split('\n')
-                    ],
-                ]
+                's_small2.txt': self._get_expected('studies', 's_small2.txt')
             },
             'assays': {
-                'a_small2.txt': [
-                    [
-                        line.split('\t')
-                        for line in self.isa1.data['assays']['a_small2.txt'][
-                            'tsv'
-                        ].split('\n')
-                    ],
-                    [
-                        line.split('\t')
-                        for line in self.isa2.data['assays']['a_small2.txt'][
-                            'tsv'
-                        ].split('\n')
-                    ],
-                ]
+                'a_small2.txt': self._get_expected('assays', 'a_small2.txt')
             },
         }
-
         with self.login(self.user):
             response = self.client.get(
-                '{}?source={}&target={}'.format(
-                    reverse(
-                        'samplesheets:ajax_version_compare',
-                        kwargs={'project': self.project.sodar_uuid},
-                    ),
-                    str(self.isa1.sodar_uuid),
-                    str(self.isa2.sodar_uuid),
-                )
+                self._get_url(self.isa1.sodar_uuid, self.isa2.sodar_uuid)
             )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), expected)
+        self.assertGreater(
+            response.json()['studies']['s_small2.txt']['change_count'], 0
+        )
 
     def test_get_no_permission(self):
         """Test GET without permission"""
@@ -1976,14 +2158,7 @@ class TestSheetVersionCompareAjaxView(SheetImportMixin, TestViewsBase):
         }
         with self.login(self.user_guest):
             response = self.client.get(
-                '{}?source={}&target={}'.format(
-                    reverse(
-                        'samplesheets:ajax_version_compare',
-                        kwargs={'project': self.project.sodar_uuid},
-                    ),
-                    str(self.isa1.sodar_uuid),
-                    str(self.isa2.sodar_uuid),
-                )
+                self._get_url(self.isa1.sodar_uuid, self.isa2.sodar_uuid)
             )
         self.assertEqual(response.status_code, 403)
         self.assertEqual(response.json(), expected)
@@ -1993,46 +2168,34 @@ class TestSheetVersionCompareAjaxView(SheetImportMixin, TestViewsBase):
         expected = {'detail': 'Sample sheet version(s) not found.'}
         with self.login(self.user):
             response = self.client.get(
-                '{}?source={}&target={}'.format(
-                    reverse(
-                        'samplesheets:ajax_version_compare',
-                        kwargs={'project': self.project.sodar_uuid},
-                    ),
-                    str(self.isa1.sodar_uuid),
-                    'aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa',
+                self._get_url(
+                    self.isa1.sodar_uuid, 'aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa'
                 )
             )
         self.assertEqual(response.status_code, 500)
         self.assertEqual(response.json(), expected)
 
+    def test_get_same_version(self):
+        """Test GET comparing a version to itself"""
+        with self.login(self.user):
+            response = self.client.get(
+                self._get_url(self.isa1.sodar_uuid, self.isa1.sodar_uuid)
+            )
+        self.assertEqual(response.status_code, 200)
+        study_data = response.json()['studies']['s_small2.txt']
+        self.assertEqual(study_data['change_count'], 0)
+        self.assertEqual(len(study_data['diff']), 1)  # Header only
+
     def test_get_studies_file(self):
         """Test GET returning diff data for studies file"""
-        expected = [
-            [
-                line.split('\t')
-                for line in self.isa1.data['studies']['s_small2.txt'][
-                    'tsv'
-                ].split('\n')
-            ],
-            [
-                line.split('\t')
-                for line in self.isa2.data['studies']['s_small2.txt'][
-                    'tsv'
-                ].split('\n')
-            ],
-        ]
-
+        expected = self._get_expected('studies', 's_small2.txt')
         with self.login(self.user):
             response = self.client.get(
-                '{}?source={}&target={}&filename={}&category={}'.format(
-                    reverse(
-                        'samplesheets:ajax_version_compare',
-                        kwargs={'project': self.project.sodar_uuid},
-                    ),
-                    str(self.isa1.sodar_uuid),
-                    str(self.isa2.sodar_uuid),
-                    's_small2.txt',
-                    'studies',
+                self._get_url(
+                    self.isa1.sodar_uuid,
+                    self.isa2.sodar_uuid,
+                    filename='s_small2.txt',
+                    category='studies',
                 )
             )
         self.assertEqual(response.status_code, 200)
@@ -2040,33 +2203,47 @@ class TestSheetVersionCompareAjaxView(SheetImportMixin, TestViewsBase):
 
     def test_get_assays_file(self):
         """Test GET returning diff data for assays file"""
-        expected = [
-            [
-                line.split('\t')
-                for line in self.isa1.data['assays']['a_small2.txt'][
-                    'tsv'
-                ].split('\n')
-            ],
-            [
-                line.split('\t')
-                for line in self.isa2.data['assays']['a_small2.txt'][
-                    'tsv'
-                ].split('\n')
-            ],
-        ]
+        expected = self._get_expected('assays', 'a_small2.txt')
+        with self.login(self.user):
+            response = self.client.get(
+                self._get_url(
+                    self.isa1.sodar_uuid,
+                    self.isa2.sodar_uuid,
+                    filename='a_small2.txt',
+                    category='assays',
+                )
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), expected)
 
+    @override_settings(SHEETS_VERSION_DIFF_PAGINATION=1)
+    def test_get_file_page(self):
+        """Test GET returning a page of diff data"""
+        expected = self._get_expected('assays', 'a_small2.txt', page=2)
         with self.login(self.user):
             response = self.client.get(
-                '{}?source={}&target={}&filename={}&category={}'.format(
-                    reverse(
-                        'samplesheets:ajax_version_compare',
-                        kwargs={'project': self.project.sodar_uuid},
-                    ),
-                    str(self.isa1.sodar_uuid),
-                    str(self.isa2.sodar_uuid),
-                    'a_small2.txt',
-                    'assays',
+                self._get_url(
+                    self.isa1.sodar_uuid,
+                    self.isa2.sodar_uuid,
+                    filename='a_small2.txt',
+                    category='assays',
+                    page=2,
                 )
             )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), expected)
+        self.assertGreater(expected['page_count'], 1)
+
+    def test_get_file_invalid_page(self):
+        """Test GET with invalid page"""
+        with self.login(self.user):
+            response = self.client.get(
+                self._get_url(
+                    self.isa1.sodar_uuid,
+                    self.isa2.sodar_uuid,
+                    filename='a_small2.txt',
+                    category='assays',
+                    page=9999,
+                )
+            )
+        self.assertEqual(response.status_code, 400)
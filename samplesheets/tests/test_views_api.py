@@ -1,6 +1,8 @@
 """Tests for REST API views in the samplesheets app"""
 
+import io
 import json
+from zipfile import ZipFile
 
 from django.test import override_settings
 from django.urls import reverse
@@ -86,6 +88,9 @@ class TestInvestigationRetrieveAPIView(TestSampleSheetAPIBase):
             'parser_version': self.investigation.parser_version,
             'archive_name': self.investigation.archive_name,
             'comments': self.investigation.comments,
+            'date_modified': self.get_drf_datetime(
+                self.investigation.date_modified
+            ),
             'studies': {
                 str(self.study.sodar_uuid): {
                     'identifier': self.study.identifier,
@@ -511,6 +516,8 @@ class TestSheetISAExportAPIView(TestSampleSheetAPIBase):
         response = self.request_knox(url)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['content-type'], 'application/zip')
+        zf = ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIn(self.investigation.file_name, zf.namelist())
 
     def test_get_no_investigation(self):
         """Test get() with no imported investigation"""
@@ -534,6 +541,63 @@ class TestSheetISAExportAPIView(TestSampleSheetAPIBase):
         expected['date_modified'] = str(self.investigation.date_modified)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data, expected)
+        self.assertIsNotNone(response.get('ETag'))
+        self.assertIsNotNone(response.get('Last-Modified'))
+
+    def test_get_json_not_modified(self):
+        """Test json export with ETag of unmodified sheets"""
+        self.investigation = self.import_isa_from_file(SHEET_PATH, self.project)
+        url = reverse(
+            'samplesheets:api_export_json',
+            kwargs={'project': self.project.sodar_uuid},
+        )
+        response = self.request_knox(url)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            url,
+            HTTP_AUTHORIZATION='token {}'.format(self.knox_token),
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_get_json_modified(self):
+        """Test json export with ETag of modified sheets"""
+        self.investigation = self.import_isa_from_file(SHEET_PATH, self.project)
+        url = reverse(
+            'samplesheets:api_export_json',
+            kwargs={'project': self.project.sodar_uuid},
+        )
+        response = self.request_knox(url)
+        etag = response['ETag']
+        self.investigation.save()
+        response = self.client.get(
+            url,
+            HTTP_AUTHORIZATION='token {}'.format(self.knox_token),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_get_json_modified_study(self):
+        """Test json export with ETag of sheets with edited study"""
+        self.investigation = self.import_isa_from_file(SHEET_PATH, self.project)
+        url = reverse(
+            'samplesheets:api_export_json',
+            kwargs={'project': self.project.sodar_uuid},
+        )
+        response = self.request_knox(url)
+        etag = response['ETag']
+        SampleSheetTableBuilder.clear_study_cache(
+            self.investigation.studies.first()
+        )
+        response = self.client.get(
+            url,
+            HTTP_AUTHORIZATION='token {}'.format(self.knox_token),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
 
 
 class TestSampleDataFileExistsAPIView(TestSampleSheetAPIBase):
@@ -614,3 +678,21 @@ class TestRemoteSheetGetAPIView(
         expected = sheet_io.export_isa(self.investigation)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.data, expected)
+
+    def test_get_isatab_not_modified(self):
+        """Test getting unmodified ISA-Tab with a conditional request"""
+        url = reverse(
+            'samplesheets:api_remote_get',
+            kwargs={
+                'project': self.project.sodar_uuid,
+                'secret': REMOTE_SITE_SECRET,
+            },
+        )
+        response = self.client.get(url, {'isa': '1'})
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self.client.get(url, {'isa': '1'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # ETag for rendered tables should differ
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -7,6 +7,7 @@ import os
 
 from irods.keywords import REG_CHKSUM_KW
 
+from django.test import override_settings
 from django.urls import reverse
 
 # Projectroles dependency
@@ -193,3 +194,96 @@ class TestSampleDataFileExistsAPIView(TestSampleSheetAPITaskflowBase):
         url = reverse('samplesheets:api_file_exists')
         response = self.request_knox(url, data={'checksum': 'Notvalid MD5!'})
         self.assertEqual(response.status_code, 400)
+
+
+class TestSampleDataFileExistsBatchAPIView(TestSampleSheetAPITaskflowBase):
+    """Tests for SampleDataFileExistsBatchAPIView"""
+
+    def setUp(self):
+        super().setUp()
+        self.make_irods_colls(self.investigation)
+        self.irods = self.irods_backend.get_session()
+        self.url = reverse('samplesheets:api_file_exists_batch')
+
+    def test_post(self):
+        """Test getting file existence info with no files uploaded"""
+        response = self.request_knox(
+            self.url, method='POST', data={'checksums': [IRODS_FILE_MD5]}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content),
+            {'checksums': {IRODS_FILE_MD5: {'status': False, 'paths': []}}},
+        )
+
+    def test_post_file(self):
+        """Test getting file existence info with an uploaded file"""
+        coll_path = self.irods_backend.get_sample_path(self.project) + '/sub'
+        self.irods.collections.create(coll_path)
+        self.irods.data_objects.put(
+            IRODS_FILE_PATH, coll_path + '/', **{REG_CHKSUM_KW: ''}
+        )
+        checksum_none = 'a' * 32
+        response = self.request_knox(
+            self.url,
+            method='POST',
+            data={'checksums': [IRODS_FILE_MD5, checksum_none]},
+        )
+        self.assertEqual(response.status_code, 200)
+        expected = {
+            'checksums': {
+                IRODS_FILE_MD5: {
+                    'status': True,
+                    'paths': [
+                        coll_path + '/' + os.path.basename(IRODS_FILE_PATH)
+                    ],
+                },
+                checksum_none: {'status': False, 'paths': []},
+            }
+        }
+        self.assertEqual(json.loads(response.content), expected)
+
+    def test_post_file_no_access(self):
+        """Test getting file existence info with no project access"""
+        coll_path = self.irods_backend.get_sample_path(self.project) + '/'
+        self.irods.data_objects.put(
+            IRODS_FILE_PATH, coll_path, **{REG_CHKSUM_KW: ''}
+        )
+        user_no_roles = self.make_user('user_no_roles')
+        response = self.request_knox(
+            self.url,
+            method='POST',
+            data={'checksums': [IRODS_FILE_MD5]},
+            token=self.get_token(user_no_roles),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content),
+            {'checksums': {IRODS_FILE_MD5: {'status': True, 'paths': []}}},
+        )
+
+    def test_post_no_checksums(self):
+        """Test getting file existence info with no checksums (should fail)"""
+        response = self.request_knox(
+            self.url, method='POST', data={'checksums': []}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_invalid_checksum(self):
+        """Test getting file existence info with an invalid checksum"""
+        response = self.request_knox(
+            self.url,
+            method='POST',
+            data={'checksums': [IRODS_FILE_MD5, 'Notvalid MD5!']},
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(SHEETS_API_FILE_EXISTS_LIMIT=1)
+    def test_post_limit(self):
+        """Test getting file existence info with too many checksums"""
+        response = self.request_knox(
+            self.url,
+            method='POST',
+            data={'checksums': [IRODS_FILE_MD5, 'a' * 32]},
+        )
+        self.assertEqual(response.status_code, 400)
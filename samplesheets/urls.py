@@ -188,6 +188,11 @@ urls_api = [
         view=samplesheets.views_api.SampleDataFileExistsAPIView.as_view(),
         name='api_file_exists',
     ),
+    url(
+        regex=r'^api/file/exists/batch$',
+        view=samplesheets.views_api.SampleDataFileExistsBatchAPIView.as_view(),
+        name='api_file_exists_batch',
+    ),
     url(
         regex=r'^api/remote/get/(?P<project>[0-9a-f-]+)/(?P<secret>[\w\-]+)$',
         view=samplesheets.views_api.RemoteSheetGetAPIView.as_view(),
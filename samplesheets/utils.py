@@ -5,8 +5,10 @@ import os
 import random
 import re
 import string
+from difflib import SequenceMatcher
 
 from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
 from openpyxl.workbook.child import INVALID_TITLE_REGEX
 
 from django.conf import settings
@@ -26,6 +28,10 @@ ALT_NAMES_COUNT = 3  # Needed for ArrayField hack
 CONFIG_LABEL_CREATE = 'Created With Configuration'
 CONFIG_LABEL_OPEN = 'Last Opened With Configuration'
 NAME_FIELDS = ['name', 'protocol']
+# Header suffixes for node columns used as row identity in sheet diffs
+DIFF_KEY_SUFFIXES = (' Name', ' File')
+# Number of unchanged context rows around changes in sheet diffs
+DIFF_CONTEXT_ROWS = 3
 
 
 def get_alt_names(name):
@@ -299,7 +305,13 @@ def get_config_name(config):
 
 def write_excel_table(table, output, display_name):
     """
-    Write an Excel 2010 file (.xlsx) from a rendered study/assay table.
+    Write an Excel 2010 file (.xlsx) from a rendered study/assay table. Rows are
+    written into a write-only worksheet, with column widths computed from the
+    table data beforehand.
+
+    :param table: Rendered table (dict)
+    :param output: File path or file-like object
+    :param display_name: Display name for the worksheet (string)
     """
 
     def _get_val(c_val):
@@ -311,29 +323,36 @@ def write_excel_table(table, output, display_name):
             return ';'.join([_get_val(x) for x in c_val])
         return ''
 
-    # Build Excel file
-    wb = Workbook()
-    ws = wb.active
-    ws.title = re.sub(INVALID_TITLE_REGEX, '_', display_name)
-    top_header_row = []
+    def _get_rows():
+        yield top_header_row
+        yield [c['value'] for c in table['field_header']]
+        for row in table['table_data']:
+            yield [_get_val(c['value']) for c in row]
 
+    top_header_row = []
     for c in table['top_header']:
         top_header_row.append(c['value'])
         if c['colspan'] > 1:
             top_header_row += [''] * (c['colspan'] - 1)
 
-    ws.append(top_header_row)
-    ws.append([c['value'] for c in table['field_header']])
-
-    for row in table['table_data']:
-        ws.append([_get_val(c['value']) for c in row])
-
-    # Resize columns (plus a little extra for padding)
+    # Get column widths (plus a little extra for padding)
     # NOTE: There is a "bestFit" attribute but it doesn't really work at all
-    for col_cells in ws.columns:
-        length = max(len(c.value) if c.value else 0 for c in col_cells) + 2
-        ws.column_dimensions[col_cells[0].column_letter].width = length
+    # NOTE: Widths must be set before writing rows in a write-only worksheet
+    widths = []
+    for row in _get_rows():
+        if len(row) > len(widths):
+            widths += [0] * (len(row) - len(widths))
+        for i, v in enumerate(row):
+            if v and len(v) > widths[i]:
+                widths[i] = len(v)
 
+    # Build Excel file
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=re.sub(INVALID_TITLE_REGEX, '_', display_name))
+    for i, w in enumerate(widths):
+        ws.column_dimensions[get_column_letter(i + 1)].width = w + 2
+    for row in _get_rows():
+        ws.append(row)
     wb.save(output)
 
 
@@ -405,3 +424,114 @@ def get_ext_link_labels():
         with open(ext_path, 'r') as f:
             return json.load(f)
     return DEFAULT_EXTERNAL_LINK_LABELS
+
+
+def get_tsv_rows(tsv):
+    """
+    Return ISA-Tab TSV file content split into rows and cells, omitting quotes
+    and empty lines.
+
+    :param tsv: File content (string)
+    :return: List of lists
+    """
+    return [
+        line.split('\t') for line in tsv.replace('"', '').split('\n') if line
+    ]
+
+
+def get_sheet_diff(source_rows, target_rows, context=DIFF_CONTEXT_ROWS):
+    """
+    Return a cell level diff between two versions of a study or assay table.
+    Columns are aligned by header and rows by their node names. The diff is
+    returned in the daff highlighter format, containing only changed rows and
+    their context, with skipped rows marked with "...".
+
+    :param source_rows: Source table rows including header (list of lists)
+    :param target_rows: Target table rows including header (list of lists)
+    :param context: Number of unchanged rows to include around changes (int)
+    :return: Header rows (list of lists), diff rows (list of lists), number of
+             changed rows (int)
+    """
+    s_header = source_rows[0] if source_rows else []
+    t_header = target_rows[0] if target_rows else []
+
+    def _get_val(row, idx):
+        return row[idx] if idx is not None and idx < len(row) else ''
+
+    # Align columns by header as (source index, target index)
+    cols = []
+    sm = SequenceMatcher(None, s_header, t_header, autojunk=False)
+    for tag, i1, i2, j1, j2 in sm.get_opcodes():
+        if tag == 'equal':
+            cols += [(i1 + k, j1 + k) for k in range(i2 - i1)]
+        else:
+            cols += [(i, None) for i in range(i1, i2)]
+            cols += [(None, j) for j in range(j1, j2)]
+    common_cols = [c for c in cols if c[0] is not None and c[1] is not None]
+
+    header_rows = []
+    if len(common_cols) < len(cols):
+        header_rows.append(
+            ['!']
+            + [
+                '+++' if i is None else '---' if j is None else ''
+                for i, j in cols
+            ]
+        )
+    header_rows.append(
+        ['@@'] + [s_header[i] if j is None else t_header[j] for i, j in cols]
+    )
+
+    # Use node names as row identity, the full row if no node columns exist
+    key_cols = [
+        c for c in common_cols if s_header[c[0]].endswith(DIFF_KEY_SUFFIXES)
+    ] or common_cols
+    s_data = source_rows[1:]
+    t_data = target_rows[1:]
+    s_keys = [tuple(_get_val(r, i) for i, _ in key_cols) for r in s_data]
+    t_keys = [tuple(_get_val(r, j) for _, j in key_cols) for r in t_data]
+
+    # Build rows as (changed, row)
+    rows = []
+    sm = SequenceMatcher(None, s_keys, t_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in sm.get_opcodes():
+        if tag == 'equal':
+            for s_row, t_row in zip(s_data[i1:i2], t_data[j1:j2]):
+                changed = False
+                row = ['']
+                for i, j in cols:
+                    s_val = _get_val(s_row, i)
+                    t_val = _get_val(t_row, j)
+                    if i is None or j is None:
+                        row.append(s_val or t_val)
+                    elif s_val != t_val:
+                        row.append('{}->{}'.format(s_val, t_val))
+                        changed = True
+                    else:
+                        row.append(s_val)
+                if changed:
+                    row[0] = '->'
+                rows.append((changed, row))
+            continue
+        for s_row in s_data[i1:i2]:
+            rows.append((True, ['---'] + [_get_val(s_row, i) for i, _ in cols]))
+        for t_row in t_data[j1:j2]:
+            rows.append((True, ['+++'] + [_get_val(t_row, j) for _, j in cols]))
+
+    # Only include changed rows with context
+    change_idx = [i for i, r in enumerate(rows) if r[0]]
+    include = set()
+    for i in change_idx:
+        include.update(
+            range(max(i - context, 0), min(i + context + 1, len(rows)))
+        )
+    diff_rows = []
+    prev_idx = -1
+    for i in sorted(include):
+        if i > prev_idx + 1:
+            diff_rows.append(['...'] * (len(cols) + 1))
+        diff_rows.append(rows[i][1])
+        prev_idx = i
+    if diff_rows and prev_idx < len(rows) - 1:
+        diff_rows.append(['...'] * (len(cols) + 1))
+    return header_rows, diff_rows, len(change_idx)
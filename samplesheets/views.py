@@ -6,6 +6,7 @@ import json
 import logging
 import os
 import requests
+import tempfile
 import zipfile
 from packaging import version
 
@@ -15,7 +16,7 @@ from cubi_tk.isa_tpl import _TEMPLATES as TK_TEMPLATES
 from django.conf import settings
 from django.contrib import messages
 from django.db.models.functions import Now
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.utils.safestring import mark_safe
@@ -71,6 +72,7 @@ from samplesheets.models import (
     Study,
     Assay,
     ISATab,
+    ISATabBlob,
     IrodsAccessTicket,
     IrodsDataRequest,
 )
@@ -99,6 +101,9 @@ REMOTE_LEVEL_READ_ROLES = SODAR_CONSTANTS['REMOTE_LEVEL_READ_ROLES']
 APP_NAME = 'samplesheets'
 WARNING_STATUS_MSG = 'OK with warnings, see extra data'
 TARGET_ALTAMISA_VERSION = '0.2.4'  # For warnings etc.
+EXCEL_CONTENT_TYPE = (
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+)
 MISC_FILES_COLL_ID = 'misc_files'
 MISC_FILES_COLL = 'MiscFiles'
 TRACK_HUBS_COLL = 'TrackHubs'
@@ -136,6 +141,30 @@ No data has been removed.
 '''.lstrip()
 
 
+class ZipStreamBuffer(io.RawIOBase):
+    """
+    Unseekable in-memory buffer for streaming a Zip archive in chunks. Written
+    data is returned and released from memory by calling pop().
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buffer.extend(b)
+        return len(b)
+
+    def pop(self):
+        """Return and clear currently buffered data"""
+        ret = bytes(self._buffer)
+        self._buffer.clear()
+        return ret
+
+
 # Mixins -----------------------------------------------------------------------
 
 
@@ -280,6 +309,8 @@ class SheetImportMixin:
                     if assay.get_name() in old_assay_uuids:
                         assay.sodar_uuid = old_assay_uuids[assay.get_name()]
                         assay.save()
+            # Studies now share UUIDs with replaced ones, clear cached tables
+            tb.clear_investigation_cache(investigation)
 
         return investigation
 
@@ -430,6 +461,8 @@ class SheetImportMixin:
             project=project,
         )
         logger.info('Sheet configurations updated')
+        # Clear rendered tables possibly cached with previous configurations
+        SampleSheetTableBuilder.clear_investigation_cache(investigation)
 
         # Update project cache if replacing sheets and iRODS collections exists
         if (
@@ -574,63 +607,115 @@ class SheetISAExportMixin:
 
         # Initiate export
         try:
-            if isa_version:
-                export_data = isa_version.data
-            else:
-                export_data = sheet_io.export_isa(investigation)
-            zip_io = None
-
             if format == 'zip':
-                # Build Zip archive
-                zip_io = io.BytesIO()
-                zf = zipfile.ZipFile(
-                    zip_io, mode='w', compression=zipfile.ZIP_DEFLATED
-                )
-                zf.writestr(
-                    export_data['investigation']['path'],
-                    export_data['investigation']['tsv'],
-                )
-                inv_dir = '/'.join(
-                    export_data['investigation']['path'].split('/')[:-1]
-                )
-                for k, v in export_data['studies'].items():
-                    zf.writestr('{}/{}'.format(inv_dir, k), v['tsv'])
-
-                for k, v in export_data['assays'].items():
-                    zf.writestr('{}/{}'.format(inv_dir, k), v['tsv'])
-                zf.close()
-
-            # Update timeline event
-            if tl_event:
-                export_warnings = sheet_io.get_warnings()
-                extra_data = (
-                    {'warnings': export_warnings}
-                    if not export_warnings['all_ok']
+                # Convert models before starting the response so that errors
+                # in database access are raised in the view
+                models = (
+                    sheet_io.get_isa_models(investigation)
+                    if not isa_version
                     else None
                 )
-                status_desc = WARNING_STATUS_MSG if extra_data else None
-                tl_event.set_status(
-                    'OK', status_desc=status_desc, extra_data=extra_data
-                )
-
-            # Set up response
-            if format == 'zip' and zip_io:
-                response = HttpResponse(
-                    zip_io.getvalue(), content_type='application/zip'
+                response = StreamingHttpResponse(
+                    self._stream_isa_zip(
+                        investigation, sheet_io, models, isa_version, tl_event
+                    ),
+                    content_type='application/zip',
                 )
                 response[
                     'Content-Disposition'
                 ] = 'attachment; filename="{}"'.format(file_name)
                 return response
-            elif format == 'json':
-                export_data['date_modified'] = str(investigation.date_modified)
-                return Response(export_data, status=200)
+
+            if isa_version:
+                export_data = isa_version.data
+            else:
+                export_data = sheet_io.export_isa(investigation)
+            self._set_export_status(sheet_io, tl_event)
+            export_data['date_modified'] = str(investigation.date_modified)
+            return Response(export_data, status=200)
 
         except Exception as ex:
             if tl_event:
                 tl_event.set_status('FAILED', str(ex))
             raise ex
 
+    @classmethod
+    def _set_export_status(cls, sheet_io, tl_event):
+        """Set timeline event status after successful export"""
+        if not tl_event:
+            return
+        export_warnings = sheet_io.get_warnings()
+        extra_data = (
+            {'warnings': export_warnings}
+            if not export_warnings['all_ok']
+            else None
+        )
+        status_desc = WARNING_STATUS_MSG if extra_data else None
+        tl_event.set_status(
+            'OK', status_desc=status_desc, extra_data=extra_data
+        )
+
+    @classmethod
+    def _stream_isa_zip(
+        cls, investigation, sheet_io, models, isa_version=None, tl_event=None
+    ):
+        """
+        Build a Zip archive of an ISA-Tab and yield it in chunks. Each file is
+        written and compressed directly into the archive, after which the
+        compressed data is yielded, so the full archive is never held in memory.
+
+        :param investigation: Investigation object
+        :param sheet_io: SampleSheetIO object
+        :param models: Models from SampleSheetIO.get_isa_models() or None
+        :param isa_version: ISATab object or None
+        :param tl_event: ProjectEvent object or None
+        :yield: bytes
+        """
+        stream = ZipStreamBuffer()
+        try:
+            zf = zipfile.ZipFile(
+                stream, mode='w', compression=zipfile.ZIP_DEFLATED
+            )
+            if isa_version:
+                export_data = isa_version.data
+                inv_path = export_data['investigation']['path']
+                inv_dir = '/'.join(inv_path.split('/')[:-1])
+                zf.writestr(inv_path, export_data['investigation']['tsv'])
+                yield stream.pop()
+                for k in ['studies', 'assays']:
+                    for path, v in export_data[k].items():
+                        zf.writestr('{}/{}'.format(inv_dir, path), v['tsv'])
+                        yield stream.pop()
+            else:
+                inv_dir = '/'.join(models[0].info.path.split('/')[:-1])
+
+                def _get_output(file_type, path):
+                    if file_type != 'investigation':
+                        path = '{}/{}'.format(inv_dir, path)
+                    return io.TextIOWrapper(
+                        zf.open(path, mode='w'), encoding='utf-8', newline=''
+                    )
+
+                for _, _, out in sheet_io.write_isa(
+                    investigation, _get_output, models
+                ):
+                    out.close()
+                    yield stream.pop()
+            zf.close()
+            yield stream.pop()
+            cls._set_export_status(sheet_io, tl_event)
+        except GeneratorExit:
+            # Response closed before the archive was complete
+            logger.warning('Streaming ISA-Tab export closed by client')
+            if tl_event:
+                tl_event.set_status('FAILED', 'Export cancelled by client')
+            raise
+        except Exception as ex:
+            logger.error('Exception in streaming ISA-Tab export: {}'.format(ex))
+            if tl_event:
+                tl_event.set_status('FAILED', str(ex))
+            raise ex
+
 
 class SheetCreateImportAccessMixin:
     """Mixin for additional sheet import/create view access control"""
@@ -872,20 +957,15 @@ class SheetRemoteSyncAPI(SheetImportMixin):
     NOTE: Not used as a mixin because it is also called from the periodic task
     """
 
-    def sync_sheets(self, project, user):
+    @classmethod
+    def get_sync_params(cls, project):
         """
-        Synchronize sample sheets from another project or site.
+        Return validated sheet sync parameters for a project.
 
-        :project: Project object of target project
-        :user: User performing the action
+        :param project: Project object of target project
+        :raise: ValueError if settings are unset or invalid
+        :return: Dict
         """
-        logger.debug(
-            'Sync sample sheets for project "{}" ({})'.format(
-                project.title, project.sodar_uuid
-            )
-        )
-
-        # Check input
         url = app_settings.get_app_setting(
             APP_NAME, 'sheet_sync_url', project=project
         )
@@ -904,23 +984,47 @@ class SheetRemoteSyncAPI(SheetImportMixin):
             raise ValueError('{}: {}'.format(SYNC_FAIL_INVALID_URL, url))
         if not token:
             raise ValueError(SYNC_FAIL_UNSET_TOKEN)
+        # Only send the stored ETag if we still have the synced sheets
+        etag = None
+        if project.investigations.exists():
+            etag = app_settings.get_app_setting(
+                APP_NAME, 'sheet_sync_etag', project=project
+            )
+        return {'url': url, 'token': token, 'etag': etag or None}
 
-        # Get remote sheet data (source)
+    @classmethod
+    def get_source_data(cls, url, token, etag=None):
+        """
+        Retrieve sheet data from the sync source. If an ETag from a previous
+        sync is provided, the request is made conditional and no data is
+        transferred if the source sheets have not changed.
+
+        NOTE: Does not access the database, can be called from worker threads.
+
+        :param url: Source API URL (string)
+        :param token: Source API token (string)
+        :param etag: ETag of previously synced data (string or None)
+        :raise: ConnectionError if the request fails
+        :raise: ValueError if response data can't be decoded
+        :return: Tuple of source data (dict or None if not modified) and ETag
+        """
+        headers = {'Authorization': 'token {}'.format(token)}
+        if etag:
+            headers['If-None-Match'] = etag
         try:
-            response = requests.get(
-                url, headers={'Authorization': 'token {}'.format(token)}
-            )
+            response = requests.get(url, headers=headers)
         except Exception:
             raise requests.exceptions.ConnectionError(
                 '{}: {}'.format(SYNC_FAIL_CONNECT, url)
             )
+        if etag and response.status_code == 304:
+            return None, etag
         if not response.status_code == 200:
             raise requests.exceptions.ConnectionError(
                 'Source API responded with status code: {}'.format(
                     response.status_code
                 )
             )
-
         try:
             source_data = response.json()
         except json.JSONDecodeError as ex:
@@ -928,6 +1032,31 @@ class SheetRemoteSyncAPI(SheetImportMixin):
                 'Error decoding JSON data: {}. Please check "sheet_sync_url" '
                 'setting.'.format(ex)
             )
+        return source_data, response.headers.get('ETag')
+
+    def sync_sheets(self, project, user, source=None):
+        """
+        Synchronize sample sheets from another project or site.
+
+        :project: Project object of target project
+        :user: User performing the action
+        :source: Result of get_source_data() if already retrieved (optional)
+        :return: True if sheets were updated, False if no changes were found
+        """
+        logger.debug(
+            'Sync sample sheets for project "{}" ({})'.format(
+                project.title, project.sodar_uuid
+            )
+        )
+
+        # Get remote sheet data (source)
+        if not source:
+            params = self.get_sync_params(project)
+            source = self.get_source_data(**params)
+        source_data, etag = source
+        if source_data is None:
+            logger.debug('Source sheets not modified, skipping sync')
+            return False
 
         source_date = datetime.datetime.strptime(
             source_data.pop('date_modified'),
@@ -937,6 +1066,7 @@ class SheetRemoteSyncAPI(SheetImportMixin):
         replace = bool(old_inv)
 
         if old_inv and source_date < old_inv.date_modified:
+            self._set_sync_etag(project, etag)
             logger.debug('No updates detected, skipping sync')
             return False
 
@@ -959,6 +1089,7 @@ class SheetRemoteSyncAPI(SheetImportMixin):
         # Activate investigation
         investigation.active = True
         investigation.save()
+        self._set_sync_etag(project, etag)
 
         # Update project cache if replacing sheets and iRODS collections exists
         if (
@@ -981,6 +1112,13 @@ class SheetRemoteSyncAPI(SheetImportMixin):
         )
         return True
 
+    @classmethod
+    def _set_sync_etag(cls, project, etag):
+        """Store source ETag for conditional requests in the next sync"""
+        app_settings.set_app_setting(
+            APP_NAME, 'sheet_sync_etag', etag or '', project=project
+        )
+
 
 # Views ------------------------------------------------------------------------
 
@@ -1326,16 +1464,25 @@ class SheetExcelExportView(
             input_name = study.file_name
             display_name = study.get_display_name()
 
-        # Set up response
-        response = HttpResponse(content_type='text/tab-separated-values')
-        response[
-            'Content-Disposition'
-        ] = 'attachment; filename="{}.xlsx"'.format(
-            input_name.split('.')[0]
-        )  # TODO: TBD: Output file name?
-
-        # Build Excel file
-        write_excel_table(table, response, display_name)
+        # Build Excel file into a temporary file and stream it in the response
+        excel_file = tempfile.TemporaryFile()
+        try:
+            write_excel_table(table, excel_file, display_name)
+            excel_file.seek(0)
+        except Exception as ex:
+            excel_file.close()
+            messages.error(
+                self.request, 'Unable to build Excel file: {}'.format(ex)
+            )
+            return redirect(redirect_url)
+        response = FileResponse(
+            excel_file,
+            as_attachment=True,
+            filename='{}.xlsx'.format(
+                input_name.split('.')[0]
+            ),  # TODO: TBD: Output file name?
+            content_type=EXCEL_CONTENT_TYPE,
+        )
 
         # TODO: Log anonymous export? (see #1164)
         if (
@@ -1517,6 +1664,7 @@ class SheetDeleteView(
             isa_versions = ISATab.objects.filter(project=project)
             v_count = isa_versions.count()
             isa_versions.delete()
+            ISATabBlob.objects.delete_orphans()
             logger.debug(
                 'Deleted {} ISA-Tab version{}'.format(
                     v_count, 's' if v_count != 1 else ''
@@ -1871,6 +2019,12 @@ class SheetVersionDeleteView(
         ).first()
         return context
 
+    def delete(self, request, *args, **kwargs):
+        """Override delete() to clean up blobs no longer in use"""
+        response = super().delete(request, *args, **kwargs)
+        ISATabBlob.objects.delete_orphans()
+        return response
+
     def get_success_url(self):
         timeline = get_backend_api('timeline_backend')
         project = self.get_project()
@@ -1948,6 +2102,7 @@ class SheetVersionDeleteBatchView(
                 )
 
         context['sheet_versions'].delete()
+        ISATabBlob.objects.delete_orphans()
         messages.success(
             request,
             'Deleted {} sample sheet version{}.'.format(
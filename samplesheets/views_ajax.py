@@ -7,6 +7,8 @@ from datetime import datetime as dt
 from packaging import version
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Paginator
 from django.db import transaction
 from django.middleware.csrf import get_token
 from django.urls import reverse
@@ -44,6 +46,8 @@ from samplesheets.utils import (
     get_node_obj,
     get_webdav_url,
     get_ext_link_labels,
+    get_sheet_diff,
+    get_tsv_rows,
 )
 from samplesheets.views import (
     IrodsRequestModifyMixin,
@@ -714,15 +718,14 @@ class SheetWarningsAjaxView(SODARBaseProjectAjaxView):
 class SheetCellEditAjaxView(BaseSheetEditAjaxView):
     """Ajax view to edit sample sheet cells"""
 
-    @transaction.atomic
-    def _update_cell(self, node_obj, cell, save=False):
+    def _update_cell(self, node_obj, cell, protocols=None):
         """
-        Update a single cell in an object.
+        Update a single cell in an object. The object is not saved.
 
         :param node_obj: GenericMaterial or Process object
         :param cell: Cell update data from the client (dict)
-        :param save: If True, save object after successful call (boolean)
-        :return: String
+        :param protocols: Protocol objects by UUID (dict, optional)
+        :return: List of updated field names
         :raise: SheetEditException if the operation fails.
         """
         ok_msg = None
@@ -740,6 +743,7 @@ class SheetCellEditAjaxView(BaseSheetEditAjaxView):
         # Plain fields
         if not header_type and header_name.lower() in EDIT_FIELD_MAP:
             attr_name = EDIT_FIELD_MAP[header_name.lower()]
+            fields = [attr_name]
             attr = getattr(node_obj, attr_name)
             if isinstance(attr, str):
                 setattr(node_obj, attr_name, cell['value'])
@@ -753,12 +757,14 @@ class SheetCellEditAjaxView(BaseSheetEditAjaxView):
             if len(cell['value']) == 0 and cell.get('item_type') != 'DATA':
                 self._raise_ex('Empty name not allowed for non-data node')
             node_obj.name = cell['value']
+            fields = ['name']
             # TODO: Update unique name here if needed
             ok_msg = 'Edited node name: {}'.format(cell['value'])
 
         # Process name and name type (special case)
         elif header_type == 'process_name':
             node_obj.name = cell['value']
+            fields = ['name', 'name_type']
             if cell['header_name'] in th.PROCESS_NAME_HEADERS:
                 node_obj.name_type = cell['header_name']
             ok_msg = 'Edited process name: {}{}'.format(
@@ -770,9 +776,12 @@ class SheetCellEditAjaxView(BaseSheetEditAjaxView):
 
         # Protocol field (special case)
         elif header_type == 'protocol':
-            protocol = Protocol.objects.filter(
-                sodar_uuid=cell['uuid_ref']
-            ).first()
+            if protocols is not None:
+                protocol = protocols.get(cell['uuid_ref'])
+            else:
+                protocol = Protocol.objects.filter(
+                    sodar_uuid=cell['uuid_ref']
+                ).first()
             if not protocol:
                 self._raise_ex(
                     'Protocol not found: "{}" ({})'.format(
@@ -780,6 +789,7 @@ class SheetCellEditAjaxView(BaseSheetEditAjaxView):
                     )
                 )
             node_obj.protocol = protocol
+            fields = ['protocol']
             ok_msg = 'Edited protocol ref: "{}" ({})'.format(
                 cell['value'], cell['uuid_ref']
             )
@@ -787,9 +797,11 @@ class SheetCellEditAjaxView(BaseSheetEditAjaxView):
         # Performer (special case)
         elif header_type == 'performer':
             node_obj.performer = cell['value']
+            fields = ['performer']
 
         # Perform date (special case)
         elif header_type == 'perform_date':
+            fields = ['perform_date']
             if cell['value']:
                 try:
                     node_obj.perform_date = dt.strptime(
@@ -803,9 +815,11 @@ class SheetCellEditAjaxView(BaseSheetEditAjaxView):
         # Extract label (special case)
         elif header_type == 'extract_label':
             node_obj.extract_label = cell['value']
+            fields = ['extract_label']
 
         # JSON Attributes
         elif header_type in MODEL_JSON_ATTRS:
+            fields = [header_type]
             attr = getattr(node_obj, header_type)
             # TODO: Is this actually a thing nowadays?
             if isinstance(attr[header_name], str):
@@ -833,23 +847,77 @@ class SheetCellEditAjaxView(BaseSheetEditAjaxView):
                 )
             )
 
-        if save:
-            node_obj.save()
-            if ok_msg:
-                logger.debug(ok_msg)
+        if ok_msg:
+            logger.debug(ok_msg)
+        return fields
+
+    @classmethod
+    def _validate_obj(cls, node_obj):
+        """
+        Run model validation for an edited object, as bulk updating does not
+        call save() for the objects.
+
+        :param node_obj: GenericMaterial or Process object
+        :raise: ValidationError if the object is not valid
+        """
+        node_obj._validate_parent()
+        if isinstance(node_obj, GenericMaterial):
+            node_obj._validate_item_fields()
+
+    @classmethod
+    def _clear_table_cache(cls, studies):
+        """
+        Clear cached tables for edited studies.
 
-        return ok_msg
+        :param studies: Iterable of Study objects
+        """
+        for study in studies:
+            SampleSheetTableBuilder.clear_study_cache(study)
+
+    @classmethod
+    def _get_node_objs(cls, uuids):
+        """
+        Return GenericMaterial and Process objects for node UUIDs.
+
+        :param uuids: Iterable of UUIDs (string)
+        :return: Dict of GenericMaterial and Process objects by UUID
+        """
+        ret = {}
+        uuids = set(uuids)
+        for model in [GenericMaterial, Process]:
+            for obj in model.objects.filter(
+                sodar_uuid__in=uuids - ret.keys()
+            ).select_related('study', 'assay__study'):
+                ret[str(obj.sodar_uuid)] = obj
+        return ret
 
     def post(self, request, *args, **kwargs):
         inv = Investigation.objects.filter(
             project=self.get_project(), active=True
         ).first()
         updated_cells = request.data.get('updated_cells', [])
+        edited_studies = {}
+        # Fields to update by model and object UUID
+        update_fields = {GenericMaterial: {}, Process: {}}
+
+        # Get all edited nodes and protocols with one query per model
+        # TODO: Make sure given objects actually belong in project etc.
+        node_objs = self._get_node_objs(c['uuid'] for c in updated_cells)
+        protocols = {
+            str(p.sodar_uuid): p
+            for p in Protocol.objects.filter(
+                sodar_uuid__in=[
+                    c['uuid_ref']
+                    for c in updated_cells
+                    if c.get('header_type') == 'protocol' and c.get('uuid_ref')
+                ]
+            )
+        }
 
+        # Update objects in memory
         for cell in updated_cells:
             logger.debug('Cell update: {}'.format(cell))
-            node_obj = get_node_obj(sodar_uuid=cell['uuid'])
-            # TODO: Make sure given object actually belongs in project etc.
+            node_obj = node_objs.get(cell['uuid'])
             if not node_obj:
                 err_msg = 'Object not found: {} ({})'.format(
                     cell['uuid'], cell['obj_cls']
@@ -857,12 +925,38 @@ class SheetCellEditAjaxView(BaseSheetEditAjaxView):
                 logger.error(err_msg)
                 # TODO: Return list of errors when processing in batch
                 return Response({'detail': err_msg}, status=500)
-
-            # Update cell, save immediately (now we are only editing one cell)
             try:
-                self._update_cell(node_obj, cell, save=True)
+                fields = self._update_cell(node_obj, cell, protocols)
+                self._validate_obj(node_obj)
             except self.SheetEditException as ex:
                 return Response({'detail': str(ex)}, status=500)
+            except ValidationError as ex:
+                return Response({'detail': ' '.join(ex.messages)}, status=500)
+            update_fields[node_obj.__class__].setdefault(
+                cell['uuid'], set()
+            ).update(fields)
+            study = node_obj.get_study()
+            edited_studies[study.pk] = study
+
+        # Save all updated objects in bulk
+        with transaction.atomic():
+            for model, obj_fields in update_fields.items():
+                if not obj_fields:
+                    continue
+                fields = set().union(*obj_fields.values())
+                model.objects.bulk_update(
+                    [node_objs[k] for k in obj_fields.keys()], list(fields)
+                )
+                logger.debug(
+                    'Updated {} {} object{}'.format(
+                        len(obj_fields),
+                        model.__name__,
+                        's' if len(obj_fields) != 1 else '',
+                    )
+                )
+            if edited_studies:
+                inv.save()  # Update date_modified
+        self._clear_table_cache(edited_studies.values())
 
         # Update investigation ontology refs
         if updated_cells:
@@ -873,7 +967,7 @@ class SheetCellEditAjaxView(BaseSheetEditAjaxView):
             except Exception as ex:
                 return Response({'detail': str(ex)}, status=500)
 
-        # TODO: Log edits in timeline here, once saving in bulk
+        # TODO: Log edits in timeline here
         return Response(self.ok_data, status=200)
 
 
@@ -1283,6 +1377,8 @@ class SheetRowInsertAjaxView(BaseSheetEditAjaxView):
                 parent.arcs.append(a)
 
         parent.save()
+        study.investigation.save()
+        SampleSheetTableBuilder.clear_study_cache(study)
 
         # Attempt to export investigation with altamISA
         try:
@@ -1451,6 +1547,7 @@ class SheetRowDeleteAjaxView(BaseSheetEditAjaxView):
             self._raise_ex('Did not find arcs to remove')
 
         study.investigation.save()
+        tb.clear_study_cache(study)
 
         # Attempt to export investigation with altamISA
         try:
@@ -1677,6 +1774,9 @@ class SheetEditConfigAjaxView(EditConfigMixin, SODARBaseProjectAjaxView):
             app_settings.set_app_setting(
                 APP_NAME, 'sheet_config', sheet_config, project=project
             )
+            study = Study.objects.filter(sodar_uuid=s_uuid).first()
+            if study:  # Column types depend on the config
+                SampleSheetTableBuilder.clear_study_cache(study)
             logger.info(
                 'Updated field config for "{}" ({}) in {} {}'.format(
                     c['name'],
@@ -1889,15 +1989,45 @@ class IrodsObjectListAjaxView(BaseIrodsAjaxView):
 
 
 class SheetVersionCompareAjaxView(SODARBaseProjectAjaxView):
-    """View for listing data objects in iRODS recursively"""
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.project = None
-        self.path = None
+    """
+    View for comparing sample sheet versions. Returns a paginated diff of one
+    file, or the first diff page of each study and assay file.
+    """
 
     permission_required = 'samplesheets.edit_sheet'
 
+    @classmethod
+    def _get_file_diff(cls, source, target, category, filename, page=1):
+        """
+        Return paginated diff for a study or assay file.
+
+        :param source: ISATab object
+        :param target: ISATab object
+        :param category: "studies" or "assays"
+        :param filename: File name (string)
+        :param page: Page number (int)
+        :return: Dict
+        :raise: InvalidPage if page is not found
+        """
+        header_rows, diff_rows, change_count = get_sheet_diff(
+            *[
+                get_tsv_rows(
+                    v.data.get(category, {}).get(filename, {}).get('tsv', '')
+                )
+                for v in [source, target]
+            ]
+        )
+        paginator = Paginator(
+            diff_rows, settings.SHEETS_VERSION_DIFF_PAGINATION
+        )
+        diff_page = paginator.page(page)
+        return {
+            'diff': header_rows + diff_page.object_list,
+            'change_count': change_count,
+            'page': diff_page.number,
+            'page_count': paginator.num_pages,
+        }
+
     def get(self, request, *args, **kwargs):
         category = request.GET.get('category')
         filename = request.GET.get('filename')
@@ -1909,70 +2039,33 @@ class SheetVersionCompareAjaxView(SODARBaseProjectAjaxView):
                 {'detail': 'Sample sheet version(s) not found.'}, status=500
             )
 
-        ret_data = {}
-
         # If category and filename are given, only return diff data for one file
         if category and filename:
-            ret_data = [
-                [
-                    line.split('\t')
-                    for line in source.data.get(category, {})
-                    .get(filename, {})
-                    .get('tsv', '')
-                    .replace('"', '')
-                    .split('\n')
-                ],
-                [
-                    line.split('\t')
-                    for line in target.data.get(category, {})
-                    .get(filename, {})
-                    .get('tsv', '')
-                    .replace('"', '')
-                    .split('\n')
-                ],
-            ]
+            try:
+                ret_data = self._get_file_diff(
+                    source,
+                    target,
+                    category,
+                    filename,
+                    request.GET.get('page', 1),
+                )
+            except InvalidPage as ex:
+                return Response({'detail': str(ex)}, status=400)
             return Response(ret_data, status=200)
 
         # If filename and/or category are missing, generate diff for
         # the whole samplesheet
-        categories = ('studies', 'assays')
-
-        for category in categories:
+        ret_data = {}
+        for category in ['studies', 'assays']:
             ret_data[category] = {}
-
-        for category in categories:
-            for filename, data in source.data.get(category, {}).items():
-                ret_data[category][filename] = [
-                    [
-                        line.split('\t')
-                        for line in data['tsv'].replace('"', '').split('\n')
-                    ],
-                    [
-                        line.split('\t')
-                        for line in target.data.get(category, {})
-                        .get(filename, {})
-                        .get('tsv', '')
-                        .replace('"', '')
-                        .split('\n')
-                    ],
-                ]
-
-        for category in categories:
-            for filename, data in target.data.get(category, {}).items():
-                if filename not in ret_data[category]:
-                    ret_data[category][filename] = [
-                        [
-                            line.split('\t')
-                            for line in data['tsv'].replace('"', '').split('\n')
-                        ],
-                        [
-                            line.split('\t')
-                            for line in target.data.get(category, {})
-                            .get(filename, {})
-                            .get('tsv', '')
-                            .replace('"', '')
-                            .split('\n')
-                        ],
-                    ]
-
+            filenames = list(source.data.get(category, {}).keys())
+            filenames += [
+                f
+                for f in target.data.get(category, {}).keys()
+                if f not in filenames
+            ]
+            for filename in filenames:
+                ret_data[category][filename] = self._get_file_diff(
+                    source, target, category, filename
+                )
         return Response(ret_data, status=200)
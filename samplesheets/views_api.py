@@ -3,11 +3,10 @@
 import logging
 import re
 
-from irods.exception import CAT_NO_ROWS_FOUND
-from irods.models import DataObject
-
 from django.conf import settings
 from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
 from rest_framework import status
 from rest_framework.exceptions import (
@@ -23,7 +22,7 @@ from rest_framework.views import APIView
 
 # Projectroles dependency
 from projectroles.app_settings import AppSettingAPI
-from projectroles.models import RemoteSite
+from projectroles.models import Project, RemoteSite
 from projectroles.plugins import get_backend_api
 from projectroles.views_api import (
     SODARAPIBaseMixin,
@@ -49,9 +48,75 @@ logger = logging.getLogger(__name__)
 
 
 MD5_RE = re.compile(r'([a-fA-F\d]{32})')
+UUID_RE = re.compile(r'[a-f0-9]{8}-([a-f0-9]{4}-){3}[a-f0-9]{12}$')
 APP_NAME = 'samplesheets'
 
 
+# Mixins -----------------------------------------------------------------------
+
+
+class SheetConditionalGetMixin:
+    """
+    Mixin for supporting conditional GET requests on sample sheet data using
+    ETag and Last-Modified headers, based on the investigation modification
+    time and the table cache stamps of its studies.
+    """
+
+    @classmethod
+    def get_sheet_etag(cls, investigation, variant=None):
+        """
+        Return ETag for the current state of an investigation.
+
+        :param investigation: Investigation object
+        :param variant: Data representation identifier (string, optional)
+        :return: String (quoted)
+        """
+        etag = '{}-{}-{}'.format(
+            investigation.sodar_uuid,
+            int(investigation.date_modified.timestamp() * 1000000),
+            SampleSheetTableBuilder.get_investigation_stamp(investigation),
+        )
+        if variant:
+            etag += '-{}'.format(variant)
+        return quote_etag(etag)
+
+    @classmethod
+    def get_not_modified_response(cls, request, investigation, variant=None):
+        """
+        Return a HTTP 304 response if the client's cached data matches the
+        current investigation.
+
+        :param request: Request object
+        :param investigation: Investigation object
+        :param variant: Data representation identifier (string, optional)
+        :return: HttpResponseNotModified or None
+        """
+        response = get_conditional_response(
+            request,
+            etag=cls.get_sheet_etag(investigation, variant),
+            last_modified=int(investigation.date_modified.timestamp()),
+        )
+        if response:
+            cls.set_conditional_headers(response, investigation, variant)
+        return response
+
+    @classmethod
+    def set_conditional_headers(cls, response, investigation, variant=None):
+        """
+        Set ETag and Last-Modified headers for a response.
+
+        :param response: Response object
+        :param investigation: Investigation object
+        :param variant: Data representation identifier (string, optional)
+        :return: Response object
+        """
+        response['ETag'] = cls.get_sheet_etag(investigation, variant)
+        response['Last-Modified'] = http_date(
+            investigation.date_modified.timestamp()
+        )
+        return response
+
+
 # API Views --------------------------------------------------------------------
 
 
@@ -62,7 +127,8 @@ class InvestigationRetrieveAPIView(
     Retrieve metadata of an investigation with its studies and assays.
 
     This view can be used to e.g. retrieve assay UUIDs for landing zone
-    operations.
+    operations, or to check for sheet modifications without exporting the
+    sheets.
 
     **URL:** ``/samplesheets/api/investigation/retrieve/{Project.sodar_uuid}``
 
@@ -72,6 +138,7 @@ class InvestigationRetrieveAPIView(
 
     - ``archive_name``: Original archive name if imported from a zip (string)
     - ``comments``: Investigation comments (JSON)
+    - ``date_modified``: Date of last investigation modification (string)
     - ``description``: Investigation description (string)
     - ``file_name``: Investigation file name (string)
     - ``identifier``: Locally unique investigation identifier (string)
@@ -137,7 +204,10 @@ class IrodsCollsCreateAPIView(
 
 
 class SheetISAExportAPIView(
-    SheetISAExportMixin, SODARAPIBaseProjectMixin, APIView
+    SheetISAExportMixin,
+    SheetConditionalGetMixin,
+    SODARAPIBaseProjectMixin,
+    APIView,
 ):
     """
     Export sample sheets as ISA-Tab TSV files, either packed in a zip archive or
@@ -148,6 +218,10 @@ class SheetISAExportAPIView(
     **URL for JSON export:** ``/samplesheets/api/export/json/{Project.sodar_uuid}``
 
     **Methods:** ``GET``
+
+    Supports conditional requests with the ``If-None-Match`` and
+    ``If-Modified-Since`` headers. If the sheets have not been modified, an
+    empty response with the status code ``304`` is returned.
     """
 
     http_method_names = ['get']
@@ -168,10 +242,18 @@ class SheetISAExportAPIView(
         ):
             export_format = 'zip'
 
+        not_modified = self.get_not_modified_response(
+            request, investigation, export_format
+        )
+        if not_modified:
+            return not_modified
         try:
-            return self.get_isa_export(project, request, export_format)
+            response = self.get_isa_export(project, request, export_format)
         except Exception as ex:
             raise APIException('Unable to export ISA-Tab: {}'.format(ex))
+        return self.set_conditional_headers(
+            response, investigation, export_format
+        )
 
 
 class SheetImportAPIView(SheetImportMixin, SODARAPIBaseProjectMixin, APIView):
@@ -297,7 +379,40 @@ class SheetImportAPIView(SheetImportMixin, SODARAPIBaseProjectMixin, APIView):
         return Response(ret_data, status=status.HTTP_200_OK)
 
 
-class SampleDataFileExistsAPIView(SODARAPIBaseMixin, APIView):
+class SampleDataFileExistsMixin:
+    """Helpers for sample data file existence queries"""
+
+    def get_checksum_paths(self, checksums):
+        """
+        Return paths of data objects in project sample data collections for
+        each checksum, queried in bulk.
+
+        :param checksums: List of MD5 checksums (strings)
+        :return: Dict of path lists by checksum
+        :raise: APIException if iRODS is not available or the query fails
+        """
+        irods_backend = get_backend_api('omics_irods')
+        if not irods_backend:
+            raise APIException('iRODS backend not enabled')
+        try:
+            return irods_backend.get_paths_by_checksum(
+                checksums, coll_name=settings.IRODS_SAMPLE_COLL
+            )
+        except Exception as ex:
+            logger.error(
+                '{} iRODS query exception: {}'.format(
+                    self.__class__.__name__, ex
+                )
+            )
+            raise APIException(
+                'iRODS query exception, please contact an admin if issue '
+                'persists'
+            )
+
+
+class SampleDataFileExistsAPIView(
+    SampleDataFileExistsMixin, SODARAPIBaseMixin, APIView
+):
     """
     Return status of data object existing in SODAR iRODS by MD5 checksum.
     Includes all projects in search regardless of user permissions.
@@ -322,56 +437,100 @@ class SampleDataFileExistsAPIView(SODARAPIBaseMixin, APIView):
     def get(self, request, *args, **kwargs):
         if not settings.ENABLE_IRODS:
             raise APIException('iRODS not enabled')
-        irods_backend = get_backend_api('omics_irods')
-        if not irods_backend:
-            raise APIException('iRODS backend not enabled')
         c = request.query_params.get('checksum')
-
         if not c or not re.match(MD5_RE, c):
             raise ParseError('Invalid MD5 checksum: "{}"'.format(c))
 
         ret = {'detail': 'File does not exist', 'status': False}
-        sql = (
-            'SELECT DISTINCT ON (data_id) data_name '
-            'FROM r_data_main JOIN r_coll_main USING (coll_id) '
-            'WHERE (coll_name LIKE \'%/{coll}\' '
-            'OR coll_name LIKE \'%/{coll}/%\') '
-            'AND r_data_main.data_checksum = \'{sum}\''.format(
-                coll=settings.IRODS_SAMPLE_COLL, sum=c
-            )
+        if self.get_checksum_paths([c])[c]:
+            ret['detail'] = 'File exists'
+            ret['status'] = True
+        return Response(ret, status=status.HTTP_200_OK)
+
+
+class SampleDataFileExistsBatchAPIView(
+    SampleDataFileExistsMixin, SODARAPIBaseMixin, APIView
+):
+    """
+    Return status of data objects existing in SODAR iRODS for multiple MD5
+    checksums. Includes all projects in search regardless of user permissions.
+    Paths of matching data objects are only returned for projects in which the
+    user has sample sheet view access.
+
+    **URL:** ``/samplesheets/api/file/exists/batch``
+
+    **Methods:** ``POST``
+
+    **Parameters:**
+
+    - ``checksums``: MD5 checksums (list of strings)
+
+    **Returns:**
+
+    - ``checksums``: Dict with checksum as key and the following values:
+
+        - ``status``: File existence (boolean)
+        - ``paths``: iRODS paths of files in accessible projects (list)
+    """
+
+    http_method_names = ['post']
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        if not settings.ENABLE_IRODS:
+            raise APIException('iRODS not enabled')
+        checksums = (
+            request.data.get('checksums')
+            if hasattr(request.data, 'get')
+            else None
         )
-        # print('QUERY: {}'.format(sql))  # DEBUG
-        columns = [DataObject.name]
-        query = irods_backend.get_query(sql, columns)
+        if not checksums or not isinstance(checksums, list):
+            raise ParseError('No checksums provided')
+        if len(checksums) > settings.SHEETS_API_FILE_EXISTS_LIMIT:
+            raise ParseError(
+                'Too many checksums provided ({} > {})'.format(
+                    len(checksums), settings.SHEETS_API_FILE_EXISTS_LIMIT
+                )
+            )
+        for c in checksums:
+            if not isinstance(c, str) or not MD5_RE.fullmatch(c):
+                raise ParseError('Invalid MD5 checksum: "{}"'.format(c))
 
-        try:
-            results = query.get_results()
-            if sum(1 for _ in results) > 0:
-                ret['detail'] = 'File exists'
-                ret['status'] = True
-        except CAT_NO_ROWS_FOUND:
-            pass  # No results, this is OK
-        except Exception as ex:
-            logger.error(
-                '{} iRODS query exception: {}'.format(
-                    self.__class__.__name__, ex
+        checksum_paths = self.get_checksum_paths(checksums)
+        # Get projects for result paths and check access in one query
+        irods_backend = get_backend_api('omics_irods', conn=False)
+        path_uuids = {}
+        for paths in checksum_paths.values():
+            for path in paths:
+                path_uuids[path] = irods_backend.get_uuid_from_path(
+                    path, 'project'
                 )
+        access = {
+            str(p.sodar_uuid): request.user.has_perm(
+                'samplesheets.view_sheet', p
             )
-            raise APIException(
-                'iRODS query exception, please contact an admin if issue '
-                'persists'
+            for p in Project.objects.filter(
+                sodar_uuid__in=set(
+                    u for u in path_uuids.values() if u and UUID_RE.match(u)
+                )
             )
-        finally:
-            query.remove()
-
+        }
+        ret = {'checksums': {}}
+        for c in checksums:
+            paths = checksum_paths.get(c, [])
+            ret['checksums'][c] = {
+                'status': len(paths) > 0,
+                'paths': [p for p in paths if access.get(path_uuids[p])],
+            }
         return Response(ret, status=status.HTTP_200_OK)
 
 
 # TODO: Temporary HACK, should be replaced by proper API view
-class RemoteSheetGetAPIView(APIView):
+class RemoteSheetGetAPIView(SheetConditionalGetMixin, APIView):
     """
     Temporary API view for retrieving the sample sheet as JSON by a target
-    site, either as rendered tables or the original ISA-Tab.
+    site, either as rendered tables or the original ISA-Tab. Supports
+    conditional requests with ETag and Last-Modified headers.
     """
 
     permission_classes = (AllowAny,)  # We check the secret in get()/post()
@@ -408,9 +567,16 @@ class RemoteSheetGetAPIView(APIView):
                 'No ISA investigation found for project', status=404
             )
 
-        # All OK so far, return data
+        # All OK so far, return data unless not modified
+        variant = 'isa' if isa and int(isa) == 1 else 'tables'
+        not_modified = self.get_not_modified_response(
+            request, investigation, variant
+        )
+        if not_modified:
+            return not_modified
+
         # Rendered tables
-        if not isa or int(isa) != 1:
+        if variant == 'tables':
             ret = {'studies': {}}
             tb = SampleSheetTableBuilder()
 
@@ -430,4 +596,6 @@ class RemoteSheetGetAPIView(APIView):
             except Exception as ex:
                 return Response(str(ex), status=500)
 
-        return Response(ret, status=200)
+        return self.set_conditional_headers(
+            Response(ret, status=200), investigation, variant
+        )
@@ -5,10 +5,6 @@ import landingzones.tasks_taskflow as lz_tasks
 from landingzones.models import LandingZone
 
 from taskflowbackend.flows.base_flow import BaseLinearFlow
-from taskflowbackend.irods_utils import (
-    get_subcoll_obj_paths,
-    get_subcoll_paths,
-)
 from taskflowbackend.tasks import irods_tasks
 
 
@@ -43,9 +39,11 @@ class Flow(BaseLinearFlow):
             ),
         )
 
-        # Get landing zone file paths (without .md5 files) from iRODS
+        # Get landing zone file and collection paths from iRODS
         zone_coll = self.irods.collections.get(zone_path)
-        zone_objects = get_subcoll_obj_paths(zone_coll)
+        zone_objects, zone_colls = self.irods_backend.get_paths_recursively(
+            zone_coll
+        )
         zone_objects_nomd5 = list(
             set(
                 [
@@ -56,13 +54,19 @@ class Flow(BaseLinearFlow):
             )
         )
         zone_objects_md5 = list(
-            set([p for p in zone_objects if p not in zone_objects_nomd5])
+            set(
+                [
+                    p
+                    for p in zone_objects
+                    if p[p.rfind('.') + 1 :].lower() == 'md5'
+                ]
+            )
         )
         file_count = len(zone_objects_nomd5)
 
         # Get all collections with root path
         zone_all_colls = [zone_path]
-        zone_all_colls += get_subcoll_paths(zone_coll)
+        zone_all_colls += zone_colls
         # Get list of collections containing files (ignore empty colls)
         zone_object_colls = list(set([p[: p.rfind('/')] for p in zone_objects]))
         # Convert these to collections inside sample collection
@@ -5,15 +5,23 @@ import os
 import random
 import re
 import string
+import threading
 
 from irods.access import iRODSAccess
 from irods.exception import (
+    DataObjectDoesNotExist,
     UserDoesNotExist,
     UserGroupDoesNotExist,
+    CAT_NO_ROWS_FOUND,
     CAT_SUCCESS_BUT_WITH_NO_INFO,
 )
 from irods.models import Collection
 
+from django.conf import settings
+
+# Projectroles dependency
+from projectroles.plugins import get_backend_api
+
 from taskflowbackend.tasks.base_task import BaseTask
 
 
@@ -56,6 +64,34 @@ class IrodsBaseTask(BaseTask):
         logger.error(desc)
         raise Exception(desc)
 
+    def _run_batch(self, func, items):
+        """
+        Call func(irods, item) for each item in a list. Items are run
+        concurrently on pooled iRODS sessions with IrodsAPI.run_jobs(), up to
+        the limit set in TASKFLOW_IRODS_CONCURRENCY. On failure, remaining
+        items are skipped and the first exception is raised once all running
+        calls have finished.
+
+        :param func: Function taking an iRODS session and an item
+        :param items: List
+        :raise: Exception raised by func
+        """
+        irods_backend = None
+        if settings.TASKFLOW_IRODS_CONCURRENCY > 1 and len(items) > 1:
+            irods_backend = get_backend_api('omics_irods')
+        if not irods_backend:
+            for item in items:
+                func(self.irods, item)
+            return
+        try:
+            irods_backend.run_jobs(
+                lambda backend, item: func(backend.get_session(), item),
+                items,
+                settings.TASKFLOW_IRODS_CONCURRENCY,
+            )
+        finally:
+            irods_backend.release()
+
 
 class CreateCollectionTask(IrodsBaseTask):
     """
@@ -507,11 +543,13 @@ class BatchCheckFilesTask(IrodsBaseTask):
 
     def execute(self, file_paths, md5_paths, zone_path, *args, **kwargs):
         err_paths = []
+        file_lookup = set(file_paths)
+        md5_lookup = set(md5_paths)
         for p in file_paths:
-            if p + '.md5' not in md5_paths:
+            if p + '.md5' not in md5_lookup:
                 err_paths.append(p + '.md5')
         for p in md5_paths:
-            if p[:-4] not in file_paths:
+            if p[:-4] not in file_lookup:
                 err_paths.append(p[:-4])
         err_len = len(err_paths)
         if err_len > 0:
@@ -531,51 +569,91 @@ class BatchValidateChecksumsTask(IrodsBaseTask):
     """Batch validate checksums of a given list of data object paths"""
 
     @classmethod
-    def _compare_checksums(cls, data_obj, checksum):
+    def _compare_checksums(cls, path, replicas, checksum):
         """
         Compares object replicate checksums to expected sum. Raises exception if
         checksums do not match.
 
-        :param data_obj: Data object
+        :param path: Data object path (string)
+        :param replicas: List of (resource name, checksum) tuples
         :param checksum: Expected checksum (string)
         :raises: Exception if checksums do not match
         """
-        for replica in data_obj.replicas:
-            if checksum != replica.checksum:
+        for resc_name, replica_checksum in replicas:
+            if checksum != replica_checksum:
                 msg = (
                     'Checksums do not match for "{}" in resource "{}" '
                     '(File: {}; iRODS: {})'.format(
-                        os.path.basename(data_obj.path),
-                        replica.resource_name,
+                        os.path.basename(path),
+                        resc_name,
                         checksum,
-                        replica.checksum,
+                        replica_checksum,
                     )
                 )
                 logger.error(msg)
                 raise Exception(msg)
 
+    def _get_checksums(self, zone_path):
+        """
+        Return replica checksums for all data objects under a collection with
+        a single catalog query.
+
+        :param zone_path: Root collection path (string)
+        :return: Dict of (resource name, checksum) tuple lists by object path
+        """
+        irods_backend = get_backend_api('omics_irods')
+        if not irods_backend:
+            raise Exception('Irodsbackend not enabled')
+        ret = {}
+        sql_path, like_path = irods_backend.get_sql_paths(zone_path)
+        sql = (
+            'SELECT coll_name, data_name, resc_name, data_checksum '
+            'FROM r_data_main JOIN r_coll_main USING (coll_id) '
+            'JOIN r_resc_main USING (resc_id) '
+            'WHERE (coll_name = \'{sql_path}\' '
+            'OR coll_name LIKE \'{like_path}/%\') '
+            'AND data_name NOT LIKE \'%.md5\''.format(
+                sql_path=sql_path, like_path=like_path
+            )
+        )
+        query = irods_backend.get_query(sql)
+        try:
+            for row in query.get_results():
+                ret.setdefault(row[0] + '/' + row[1], []).append(
+                    (row[2], row[3] or None)
+                )
+        except CAT_NO_ROWS_FOUND:
+            pass
+        finally:
+            query.remove()
+            irods_backend.release()
+        return ret
+
     def execute(self, paths, zone_path, *args, **kwargs):
         zone_path_len = len(zone_path.split('/'))
+        try:
+            checksums = self._get_checksums(zone_path)
+        except Exception as ex:
+            self._raise_irods_exception(ex, 'Unable to query checksums')
 
-        for path in paths:
+        def _validate(irods, path):
             try:
                 md5_path = path + '.md5'
                 try:
-                    md5_file = self.irods.data_objects.open(md5_path, mode='r')
-                    file_sum = re.split(
-                        MD5_RE, md5_file.read().decode('utf-8')
-                    )[0]
+                    with irods.data_objects.open(md5_path, mode='r') as f:
+                        file_sum = re.split(MD5_RE, f.read().decode('utf-8'))[0]
                 except Exception as ex:
                     msg = 'Unable to read checksum file "{}"'.format(
                         '/'.join(md5_path.split('/')[zone_path_len:])
                     )
                     self._raise_irods_exception(ex, msg)
-                self._compare_checksums(
-                    self.irods.data_objects.get(path), file_sum
-                )
+                if path not in checksums:
+                    raise DataObjectDoesNotExist(path)
+                self._compare_checksums(path, checksums[path], file_sum)
             except Exception as ex:
                 self._raise_irods_exception(ex)
 
+        self._run_batch(_validate, paths)
         super().execute(*args, **kwargs)
 
     def revert(self, paths, zone_path, *args, **kwargs):
@@ -620,6 +698,72 @@ class BatchMoveDataObjectsTask(IrodsBaseTask):
             + src_path.split('/')[-1]
         )
 
+    def _use_coll_access(self, src_root, src_paths, user_name):
+        """
+        Return True if access can be set for the whole source collection
+        instead of each data object. This is the case if all objects in the
+        collection are moved and the user has no existing access to the
+        collection, its subcollections or objects.
+
+        :param src_root: Source root collection path (string)
+        :param src_paths: Source object paths (list)
+        :param user_name: User or group name (string)
+        :return: Boolean
+        """
+        irods_backend = get_backend_api('omics_irods')
+        if not irods_backend:
+            return False
+        sql_root, like_root = irods_backend.get_sql_paths(src_root)
+        coll_filter = (
+            'coll_name = \'{root}\' OR coll_name LIKE \'{like_root}/%\''.format(
+                root=sql_root, like_root=like_root
+            )
+        )
+        sql = (
+            'SELECT (SELECT COUNT(DISTINCT data_id) FROM r_data_main '
+            'JOIN r_coll_main USING (coll_id) WHERE {coll_filter}) '
+            'AS obj_count, '
+            '(SELECT COUNT(*) FROM r_objt_access '
+            'JOIN r_user_main USING (user_id) '
+            'WHERE user_name = \'{user_name}\' AND object_id IN ('
+            'SELECT data_id FROM r_data_main '
+            'JOIN r_coll_main USING (coll_id) WHERE {coll_filter} '
+            'UNION SELECT coll_id FROM r_coll_main WHERE {coll_filter})) '
+            'AS access_count'.format(
+                coll_filter=coll_filter,
+                user_name=user_name.replace('\'', '\'\''),
+            )
+        )
+        query = irods_backend.get_query(sql)
+        try:
+            result = next(query.get_results())
+            return int(result[0]) == len(set(src_paths)) and int(result[1]) == 0
+        except Exception as ex:
+            logger.error(
+                'Exception in collection access query: {}'.format(
+                    ex.__class__.__name__
+                )
+            )
+            return False
+        finally:
+            query.remove()
+            irods_backend.release()
+
+    def _set_coll_access(self, access_name, path, user_name):
+        """Set access recursively for a collection"""
+        acl = iRODSAccess(
+            access_name=access_name,
+            path=path,
+            user_name=user_name,
+            user_zone=self.irods.zone,
+        )
+        try:
+            self.irods.permissions.set(acl, recursive=True)
+        except Exception as ex:
+            self._raise_irods_exception(
+                ex, 'Error setting permission for "{}"'.format(path)
+            )
+
     def execute(
         self,
         src_root,
@@ -631,15 +775,24 @@ class BatchMoveDataObjectsTask(IrodsBaseTask):
         **kwargs
     ):
         self.execute_data['moved_objects'] = []
+        self.execute_data['coll_access'] = self._use_coll_access(
+            src_root, src_paths, user_name
+        )
+        lock = threading.Lock()
 
-        for src_path in src_paths:
+        # Set access once for the source collection if possible, the access is
+        # retained by the objects when moved
+        if self.execute_data['coll_access']:
+            self._set_coll_access(access_name, src_root, user_name)
+
+        def _move(irods, src_path):
             dest_coll_path = self.get_dest_coll_path(
                 src_path, src_root, dest_root
             )
             dest_obj_path = self.get_dest_obj_path(src_path, dest_coll_path)
 
             try:
-                self.irods.data_objects.move(
+                irods.data_objects.move(
                     src_path=src_path, dest_path=dest_obj_path
                 )
             except Exception as ex:
@@ -651,10 +804,17 @@ class BatchMoveDataObjectsTask(IrodsBaseTask):
                     )
                 self._raise_irods_exception(ex, msg)
 
+            if self.execute_data['coll_access']:
+                with lock:
+                    self.execute_data['moved_objects'].append(
+                        (src_path, 'null')
+                    )
+                return
+
             modifying_access = False
 
             try:
-                target = self.irods.data_objects.get(dest_obj_path)
+                target = irods.data_objects.get(dest_obj_path)
             except Exception as ex:
                 self._raise_irods_exception(
                     ex,
@@ -664,7 +824,7 @@ class BatchMoveDataObjectsTask(IrodsBaseTask):
                 )
 
             try:
-                target_access = self.irods.permissions.get(target=target)
+                target_access = irods.permissions.get(target=target)
             except Exception as ex:
                 self._raise_irods_exception(
                     ex,
@@ -686,17 +846,20 @@ class BatchMoveDataObjectsTask(IrodsBaseTask):
                 prev_access = 'null'
                 modifying_access = True
 
-            self.execute_data['moved_objects'].append((src_path, prev_access))
+            with lock:
+                self.execute_data['moved_objects'].append(
+                    (src_path, prev_access)
+                )
 
             if modifying_access:
                 acl = iRODSAccess(
                     access_name=access_name,
                     path=dest_obj_path,
                     user_name=user_name,
-                    user_zone=self.irods.zone,
+                    user_zone=irods.zone,
                 )
                 try:
-                    self.irods.permissions.set(acl, recursive=False)
+                    irods.permissions.set(acl, recursive=False)
                 except Exception as ex:
                     self._raise_irods_exception(
                         ex,
@@ -705,12 +868,18 @@ class BatchMoveDataObjectsTask(IrodsBaseTask):
                         ),
                     )
 
+        self._run_batch(_move, src_paths)
+        # Remove access from the now empty source collections
+        if self.execute_data['coll_access']:
+            self._set_coll_access('null', src_root, user_name)
         super().execute(*args, **kwargs)
 
     def revert(
         self, src_root, dest_root, access_name, user_name, *args, **kwargs
     ):
-        for moved_object in self.execute_data['moved_objects']:
+        coll_access = self.execute_data.get('coll_access')
+
+        def _move_back(irods, moved_object):
             src_path = moved_object[0]
             prev_access = moved_object[1]
             dest_path = self.get_dest_coll_path(src_path, src_root, dest_root)
@@ -722,12 +891,18 @@ class BatchMoveDataObjectsTask(IrodsBaseTask):
             new_dest = '/'.join(src_path.split('/')[:-1])
             new_dest_obj = new_dest + '/' + src_path.split('/')[-1]
 
-            self.irods.data_objects.move(src_path=new_src, dest_path=new_dest)
+            irods.data_objects.move(src_path=new_src, dest_path=new_dest)
+            if coll_access:
+                return
 
             acl = iRODSAccess(
                 access_name=prev_access,
                 path=new_dest_obj,
                 user_name=user_name,
-                user_zone=self.irods.zone,
+                user_zone=irods.zone,
             )
-            self.irods.permissions.set(acl, recursive=False)
+            irods.permissions.set(acl, recursive=False)
+
+        self._run_batch(_move_back, self.execute_data['moved_objects'])
+        if coll_access:
+            self._set_coll_access('null', src_root, user_name)
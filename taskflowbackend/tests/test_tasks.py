@@ -1,15 +1,19 @@
 """Tests for Taskflow tasks in the taskflowbackend app"""
 
+import hashlib
 import uuid
 
 from irods.collection import iRODSCollection
 from irods.data_object import iRODSDataObject
 from irods.exception import CollectionDoesNotExist, DataObjectDoesNotExist
+from irods.keywords import REG_CHKSUM_KW
 from irods.meta import iRODSMeta
+from irods.test.helpers import make_object
 from irods.ticket import Ticket
 from irods.user import iRODSUser, iRODSUserGroup
 
 from django.conf import settings
+from django.test import override_settings
 
 # Projectroles dependency
 from projectroles.models import SODAR_CONSTANTS
@@ -54,6 +58,7 @@ BATCH_SRC_NAME = '/batch_src'
 BATCH_DEST_NAME = '/batch_dest'
 BATCH_OBJ_NAME = '/batch_obj'
 BATCH_OBJ2_NAME = '/batch_obj2'
+INVALID_MD5 = '11111111111111111111111111111111'
 
 
 class IRODSTestBase(TaskflowbackendTestBase):
@@ -1713,7 +1718,100 @@ class TestMoveDataObjectTask(IRODSTestBase):
         self.assertEqual(new_obj.checksum, new_obj2.checksum)
 
 
-# TODO: Test Checksum verifying
+class TestBatchValidateChecksumsTask(IRODSTestBase):
+    """Tests for BatchValidateChecksumsTask"""
+
+    def _make_object(self, path, md5=None):
+        obj = make_object(self.irods, path, 'x' * 1024, **{REG_CHKSUM_KW: ''})
+        if not md5:
+            with obj.open() as obj_fp:
+                md5 = hashlib.md5(obj_fp.read()).hexdigest()
+        make_object(self.irods, path + '.md5', md5)
+        return obj
+
+    def setUp(self):
+        super().setUp()
+        self.obj_path = self.test_coll_path + BATCH_OBJ_NAME
+        self.sub_coll = self.irods.collections.create(
+            self.test_coll_path + SUB_COLL_NAME
+        )
+        self.obj2_path = self.sub_coll.path + BATCH_OBJ2_NAME
+
+    def test_execute(self):
+        """Test validating checksums"""
+        self._make_object(self.obj_path)
+        self._make_object(self.obj2_path)
+        self._add_task(
+            cls=BatchValidateChecksumsTask,
+            name='Validate checksums',
+            inject={
+                'paths': [self.obj_path, self.obj2_path],
+                'zone_path': self.test_coll_path,
+            },
+        )
+        result = self._run_flow()
+        self.assertEqual(result, True)
+
+    def test_execute_invalid(self):
+        """Test validating checksums with an invalid checksum"""
+        self._make_object(self.obj_path)
+        self._make_object(self.obj2_path, md5=INVALID_MD5)
+        self._add_task(
+            cls=BatchValidateChecksumsTask,
+            name='Validate checksums',
+            inject={
+                'paths': [self.obj_path, self.obj2_path],
+                'zone_path': self.test_coll_path,
+            },
+        )
+        with self.assertRaises(Exception):
+            self._run_flow()
+
+    def test_execute_no_md5(self):
+        """Test validating checksums with a missing checksum file"""
+        self._make_object(self.obj_path)
+        make_object(self.irods, self.obj2_path, 'x' * 1024)
+        self._add_task(
+            cls=BatchValidateChecksumsTask,
+            name='Validate checksums',
+            inject={
+                'paths': [self.obj_path, self.obj2_path],
+                'zone_path': self.test_coll_path,
+            },
+        )
+        with self.assertRaises(Exception):
+            self._run_flow()
+
+    def test_execute_special_chars(self):
+        """Test validating checksums with special characters in zone path"""
+        zone_coll = self.irods.collections.create(
+            self.test_coll_path + '/zone_o\'coll%'
+        )
+        obj_path = zone_coll.path + BATCH_OBJ_NAME
+        self._make_object(obj_path)
+        self._add_task(
+            cls=BatchValidateChecksumsTask,
+            name='Validate checksums',
+            inject={'paths': [obj_path], 'zone_path': zone_coll.path},
+        )
+        result = self._run_flow()
+        self.assertEqual(result, True)
+
+    @override_settings(TASKFLOW_IRODS_CONCURRENCY=1)
+    def test_execute_no_concurrency(self):
+        """Test validating checksums without concurrency"""
+        self._make_object(self.obj_path)
+        self._make_object(self.obj2_path)
+        self._add_task(
+            cls=BatchValidateChecksumsTask,
+            name='Validate checksums',
+            inject={
+                'paths': [self.obj_path, self.obj2_path],
+                'zone_path': self.test_coll_path,
+            },
+        )
+        result = self._run_flow()
+        self.assertEqual(result, True)
 
 
 class TestBatchCreateCollectionsTask(IRODSTestBase):
@@ -2106,3 +2204,113 @@ class TestBatchMoveDataObjectsTask(IRODSTestBase):
         self.assertEqual(self.batch_obj.checksum, move_obj.checksum)
         existing_obj = self.irods.data_objects.get(new_obj_path)
         self.assertEqual(new_obj.checksum, existing_obj.checksum)
+
+    def test_use_coll_access_wildcard(self):
+        """Test _use_coll_access() with sibling matching LIKE wildcards"""
+        # "_" in "batch_src" must not match this collection
+        sibling = self.irods.collections.create(
+            self.test_coll_path + '/batchXsrc'
+        )
+        self.irods.data_objects.create(sibling.path + BATCH_OBJ_NAME)
+        task = BatchMoveDataObjectsTask(
+            name='Move data objects', irods=self.irods, verbose=False
+        )
+        self.assertTrue(
+            task._use_coll_access(
+                self.batch_src_path,
+                [self.batch_obj_path, self.batch_obj2_path],
+                DEFAULT_USER_GROUP,
+            )
+        )
+
+    def test_execute_existing_access(self):
+        """Test moving data objects with existing access for an object"""
+        acl = iRODSAccess(
+            access_name=TEST_ACCESS_WRITE_IN,
+            path=self.batch_obj_path,
+            user_name=DEFAULT_USER_GROUP,
+            user_zone=self.irods.zone,
+        )
+        self.irods.permissions.set(acl)
+        self._add_task(
+            cls=BatchMoveDataObjectsTask,
+            name='Move data objects',
+            inject={
+                'src_root': self.batch_src_path,
+                'dest_root': self.batch_dest_path,
+                'src_paths': [self.batch_obj_path, self.batch_obj2_path],
+                'access_name': TEST_ACCESS_READ_IN,
+                'user_name': DEFAULT_USER_GROUP,
+            },
+        )
+        result = self._run_flow()
+
+        self.assertEqual(result, True)
+        for obj_name in ['batch_obj', 'batch_obj2']:
+            obj_access = self._get_user_access(
+                target=self.irods.data_objects.get(
+                    '{}/{}'.format(self.batch_dest_path, obj_name)
+                ),
+                user_name=DEFAULT_USER_GROUP,
+            )
+            self.assertEqual(obj_access.access_name, TEST_ACCESS_READ_OUT)
+
+    def test_revert_existing_access(self):
+        """Test reverting the moving of data objects with existing access"""
+        acl = iRODSAccess(
+            access_name=TEST_ACCESS_WRITE_IN,
+            path=self.batch_obj_path,
+            user_name=DEFAULT_USER_GROUP,
+            user_zone=self.irods.zone,
+        )
+        self.irods.permissions.set(acl)
+        self._add_task(
+            cls=BatchMoveDataObjectsTask,
+            name='Move data objects',
+            inject={
+                'src_root': self.batch_src_path,
+                'dest_root': self.batch_dest_path,
+                'src_paths': [self.batch_obj_path, self.batch_obj2_path],
+                'access_name': TEST_ACCESS_READ_IN,
+                'user_name': DEFAULT_USER_GROUP,
+            },
+            force_fail=True,
+        )  # FAILS
+        result = self._run_flow()
+
+        self.assertNotEqual(result, True)
+        obj_access = self._get_user_access(
+            target=self.irods.data_objects.get(self.batch_obj_path),
+            user_name=DEFAULT_USER_GROUP,
+        )
+        self.assertEqual(obj_access.access_name, TEST_ACCESS_WRITE_OUT)
+        obj_access = self._get_user_access(
+            target=self.irods.data_objects.get(self.batch_obj2_path),
+            user_name=DEFAULT_USER_GROUP,
+        )
+        self.assertIsNone(obj_access)
+
+    @override_settings(TASKFLOW_IRODS_CONCURRENCY=1)
+    def test_execute_no_concurrency(self):
+        """Test moving data objects without concurrency"""
+        self._add_task(
+            cls=BatchMoveDataObjectsTask,
+            name='Move data objects',
+            inject={
+                'src_root': self.batch_src_path,
+                'dest_root': self.batch_dest_path,
+                'src_paths': [self.batch_obj_path, self.batch_obj2_path],
+                'access_name': TEST_ACCESS_READ_IN,
+                'user_name': DEFAULT_USER_GROUP,
+            },
+        )
+        result = self._run_flow()
+
+        self.assertEqual(result, True)
+        for obj_name in ['batch_obj', 'batch_obj2']:
+            self.assertIsInstance(
+                self.irods.data_objects.get(
+                    '{}/{}'.format(self.batch_dest_path, obj_name)
+                ),
+                iRODSDataObject,
+            )